@@ -40,6 +40,8 @@ VIDEO_SET_CURSOR_ATTR = 6
 VIDEO_SET_BORDER_ATTR = 7
 # put character glyph
 VIDEO_PUT_GLYPH = 8
+# put a run of character glyphs on a row
+VIDEO_PUT_TEXT = 9
 # clear rows
 VIDEO_CLEAR_ROWS = 10
 # scroll
@@ -61,6 +63,8 @@ VIDEO_FILL_INTERVAL = 19
 # put rect
 VIDEO_PUT_RECT = 20
 VIDEO_FILL_RECT = 21
+# share pixel buffer
+VIDEO_SHARE_PIXELS = 22
 # copy page
 VIDEO_COPY_PAGE = 28
 # set caption message
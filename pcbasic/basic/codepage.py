@@ -199,6 +199,14 @@ class Converter(object):
                 unistr += self._flush()
             return unistr
 
+    def get_state(self):
+        """Return the buffer and box-drawing state, to be able to resume marking later."""
+        return self._buf, self._bset, self._last
+
+    def set_state(self, state):
+        """Resume from a state returned by get_state."""
+        self._buf, self._bset, self._last = state
+
     def to_unicode(self, s, flush=False):
         """Process codepage string, returning unicode string when ready."""
         return u''.join([(seq.decode('ascii', errors='ignore')
@@ -201,6 +201,28 @@ class DebugSession(api.Session):
         for s in str(self._impl.program).split('\n'):
             logging.debug(s)
 
+    def showstats(self):
+        """Write performance counters to the log."""
+        statements = max(1, self._impl.interpreter.statement_count)
+        value_stats = self._impl.values.get_stats()
+        logging.debug(
+            'values: %d allocated, %d recycled, %d pooled; %.2f allocated per statement',
+            value_stats['allocated'], value_stats['recycled'], value_stats['pooled'],
+            value_stats['allocated'] / float(statements))
+        logging.debug(
+            'function cache: %d hits, %d misses, %d entries',
+            value_stats['float_cache_hits'], value_stats['float_cache_misses'],
+            value_stats['float_cache_size'])
+        gc_stats = self._impl.strings.get_stats()
+        logging.debug(
+            'string gc: %d collections, %d bytes moved; pauses %.4fs total, %.4fs max, %.4fs last',
+            gc_stats['gc_count'], gc_stats['gc_bytes_moved'], gc_stats['gc_pause_total'],
+            gc_stats['gc_pause_max'], gc_stats['gc_pause_last'])
+        video_stats = self._impl.queues.get_stats()
+        logging.debug(
+            'video events: %d issued, %d merged',
+            video_stats['video_events'], video_stats['video_events_merged'])
+
     def showplatform(self):
         """Show platform info."""
         logging.debug(get_platform_info())
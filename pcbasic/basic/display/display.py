@@ -130,9 +130,11 @@ class Display(object):
 
     def __init__(self, queues, values, input_methods, memory,
                 initial_width, video_mem_size, capabilities, monitor, sound, io_streams,
-                low_intensity, screen_aspect, codepage, fonts):
+                low_intensity, screen_aspect, codepage, fonts, shared_pixels=False):
         """Initialise the display."""
         self.queues = queues
+        # let the interface read the pixel buffers rather than sending it pixels
+        self._shared_pixels = shared_pixels
         self._values = values
         self._memory = memory
         # low level settings
@@ -241,9 +243,11 @@ class Display(object):
         # initialise pixel buffers
         if not self.mode.is_text_mode:
             self.pixels = PixelBuffer(self.mode.pixel_width, self.mode.pixel_height,
-                                    self.mode.num_pages, self.mode.bitsperpixel)
+                                    self.mode.num_pages, self.mode.bitsperpixel,
+                                    self._shared_pixels)
         else:
             self.pixels = None
+        self._share_pixels()
         # set active page & visible page, counting from 0.
         self.set_page(new_vpagenum, new_apagenum)
         # initialise text screen
@@ -256,6 +260,11 @@ class Display(object):
         self.drawing.init_mode(self.mode, self.text_screen.text, self.pixels)
         self.drawing.set_attr(self.attr)
 
+    def _share_pixels(self):
+        """Hand the interface a reference to the new pixel buffer."""
+        if self._shared_pixels:
+            self.queues.video.put(signals.Event(signals.VIDEO_SHARE_PIXELS, (self.pixels,)))
+
     def set_width(self, to_width):
         """Set the character width of the screen, reset pages and change modes."""
         # raise an error if the width value doesn't make sense
@@ -340,6 +349,7 @@ class Display(object):
         """Completely resubmit the screen to the interface."""
         # set the screen mode
         self.queues.video.put(signals.Event(signals.VIDEO_SET_MODE, (self.mode,)))
+        self._share_pixels()
         # set the visible and active pages
         self.queues.video.put(signals.Event(signals.VIDEO_SET_PAGE, (self.vpagenum, self.apagenum)))
         # rebuild palette
@@ -117,7 +117,7 @@ class Font(object):
     def set_byte(self, charvalue, offset, byte):
         """Set byte sequency for character."""
         old = self._fontdict[chr(charvalue)]
-        self._fontdict[chr(charvalue)] = old[:offset%8] + byte + old[offset%8+1:]
+        self._fontdict[chr(charvalue)] = old[:offset%8] + chr(byte) + old[offset%8+1:]
         #self.screen.rebuild_glyph(charvalue)
 
     def build_glyph(self, c, req_width, req_height):
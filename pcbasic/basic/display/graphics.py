@@ -110,6 +110,8 @@ class Drawing(object):
         self._queues = queues
         self._values = values
         self._memory = memory
+        # parse results of DRAW strings
+        self._gml_cache = mlparser.MLCache(memory, values)
         # for wait() in paint_
         self._input_methods = input_methods
         # memebers set on mode switch
@@ -179,17 +181,80 @@ class Drawing(object):
         # use attr = 0 ? pagenum parameter? are we actually sending anything to the queue?
         self._text.clear_area(self._apagenum, row0, col0, row1, col1, self._attr)
 
+    def _clear_text_cells(self, cells):
+        """Remove the characters at a collection of (row, col) text positions."""
+        fore, back, blink, underline = self._mode.split_attr(self._attr)
+        for row, col in cells:
+            if col >= 1 and row >= 1 and col <= self._mode.width and row <= self._mode.height:
+                self._text.put_char_attr(self._apagenum, row, col, b' ', self._attr)
+                self._queues.video.put(signals.Event(signals.VIDEO_PUT_GLYPH,
+                        (self._apagenum, row, col, u' ', False, fore, back, blink, underline)))
+
     ### graphics primitives
 
+    def _submit(self, pagenum, x0, y0, x1, y1, signal):
+        """Notify the interface of changed pixels; only send them if the buffer is not shared."""
+        if self._pixels.shared:
+            self._pixels.pages[pagenum].mark_dirty(x0, y0, x1, y1)
+        else:
+            self._queues.video.put(signal)
+
     def put_pixel(self, x, y, index, pagenum=None):
         """Put a pixel on the screen; empty character buffer."""
         if pagenum is None:
             pagenum = self._apagenum
         if self.graph_view.contains(x, y):
             self._pixels.pages[pagenum].put_pixel(x, y, index)
-            self._queues.video.put(signals.Event(signals.VIDEO_PUT_PIXEL, (pagenum, x, y, index)))
+            self._submit(pagenum, x, y, x, y,
+                    signals.Event(signals.VIDEO_PUT_PIXEL, (pagenum, x, y, index)))
             self.clear_text_at(x, y)
 
+    def put_pixel_runs(self, points, index):
+        """Put a sequence of pixels in one attribute on the active page, in horizontal and vertical runs."""
+        vx0, vy0, vx1, vy1 = self.graph_view.get()
+        # text cells covered by the pixels, to be cleared once each
+        cells = set()
+        run = None
+        for x, y in points:
+            if not (vx0 <= x <= vx1 and vy0 <= y <= vy1):
+                continue
+            if run:
+                rx0, ry0, rx1, ry1 = run
+                if rx0 <= x <= rx1 and ry0 <= y <= ry1:
+                    continue
+                elif ry0 == ry1 == y and (x == rx0-1 or x == rx1+1):
+                    run = min(x, rx0), y, max(x, rx1), y
+                    continue
+                elif rx0 == rx1 == x and (y == ry0-1 or y == ry1+1):
+                    run = x, min(y, ry0), x, max(y, ry1)
+                    continue
+                self._fill_run(run, index, cells)
+            run = x, y, x, y
+        if run:
+            self._fill_run(run, index, cells)
+        self._clear_text_cells(cells)
+
+    def _fill_run(self, run, index, cells):
+        """Fill a horizontal or vertical run of pixels on the active page; record covered text cells."""
+        x0, y0, x1, y1 = run
+        page = self._pixels.pages[self._apagenum]
+        if (x0, y0) == (x1, y1):
+            page.put_pixel(x0, y0, index)
+            signal = signals.Event(signals.VIDEO_PUT_PIXEL, (self._apagenum, x0, y0, index))
+        elif y0 == y1:
+            page.fill_interval(x0, x1, y0, index)
+            signal = signals.Event(signals.VIDEO_FILL_INTERVAL, (self._apagenum, x0, x1, y0, index))
+        else:
+            page.fill_rect(x0, y0, x1, y1, index)
+            signal = signals.Event(signals.VIDEO_FILL_RECT, (self._apagenum, x0, y0, x1, y1, index))
+        self._submit(self._apagenum, x0, y0, x1, y1, signal)
+        row0, col0 = self._mode.pixel_to_text_pos(x0, y0)
+        row1, col1 = self._mode.pixel_to_text_pos(x1, y1)
+        if (row0, col0) == (row1, col1):
+            cells.add((row0, col0))
+        else:
+            cells.update((row, col) for row in range(row0, row1+1) for col in range(col0, col1+1))
+
     def get_pixel(self, x, y, pagenum=None):
         """Return the attribute a pixel on the screen."""
         if pagenum is None:
@@ -204,21 +269,30 @@ class Drawing(object):
         """Write a list of attributes to a scanline interval."""
         x, y, colours = self.graph_view.clip_list(x, y, colours)
         newcolours = self._pixels.pages[pagenum].put_interval(x, y, colours, mask)
-        self._queues.video.put(signals.Event(signals.VIDEO_PUT_INTERVAL, (pagenum, x, y, newcolours)))
+        self._submit(pagenum, x, y, x+len(colours)-1, y,
+                signals.Event(signals.VIDEO_PUT_INTERVAL, (pagenum, x, y, newcolours)))
         self.clear_text_area(x, y, x+len(colours), y)
 
+    def put_pixel_block(self, pagenum, xs, ys, colours, masks):
+        """Write arrays of pixels to the screen in one go; arrays must broadcast together."""
+        vx0, vy0, vx1, vy1 = self.graph_view.get()
+        inside = (xs >= vx0) & (xs <= vx1) & (ys >= vy0) & (ys <= vy1)
+        if not inside.any():
+            return
+        x0, y0, x1, y1 = self._pixels.pages[pagenum].put_pixel_block(
+                xs, ys, colours, masks, inside)
+        self._submit(pagenum, x0, y0, x1, y1, signals.Event(signals.VIDEO_PUT_RECT,
+                (pagenum, x0, y0, x1, y1, self._pixels.pages[pagenum].buffer[y0:y1+1, x0:x1+1])))
+        self.clear_text_area(x0, y0, x1, y1)
+
     def fill_interval(self, x0, x1, y, index):
         """Fill a scanline interval in a solid attribute."""
         x0, x1, y = self.graph_view.clip_interval(x0, x1, y)
         self._pixels.pages[self._apagenum].fill_interval(x0, x1, y, index)
-        self._queues.video.put(signals.Event(signals.VIDEO_FILL_INTERVAL,
+        self._submit(self._apagenum, x0, y, x1, y, signals.Event(signals.VIDEO_FILL_INTERVAL,
                         (self._apagenum, x0, x1, y, index)))
         self.clear_text_area(x0, y, x1, y)
 
-    def get_until(self, x0, x1, y, c):
-        """Get the attribute values of a scanline interval."""
-        return self._pixels.pages[self._apagenum].get_until(x0, x1, y, c)
-
     def get_rect(self, x0, y0, x1, y1):
         """Read a screen rect into an [y][x] array of attributes."""
         return self._pixels.pages[self._apagenum].get_rect(x0, y0, x1, y1)
@@ -228,7 +302,7 @@ class Drawing(object):
         x0, y0, x1, y1, sprite = self.graph_view.clip_area(x0, y0, x1, y1, sprite)
         rect = self._pixels.pages[self._apagenum].put_rect(x0, y0, x1, y1,
                                                         sprite, operation_token)
-        self._queues.video.put(signals.Event(signals.VIDEO_PUT_RECT,
+        self._submit(self._apagenum, x0, y0, x1, y1, signals.Event(signals.VIDEO_PUT_RECT,
                               (self._apagenum, x0, y0, x1, y1, rect)))
         self.clear_text_area(x0, y0, x1, y1)
 
@@ -236,7 +310,7 @@ class Drawing(object):
         """Fill a rectangle in a solid attribute."""
         x0, y0, x1, y1 = self.graph_view.clip_rect(x0, y0, x1, y1)
         self._pixels.pages[self._apagenum].fill_rect(x0, y0, x1, y1, index)
-        self._queues.video.put(signals.Event(signals.VIDEO_FILL_RECT,
+        self._submit(self._apagenum, x0, y0, x1, y1, signals.Event(signals.VIDEO_FILL_RECT,
                                 (self._apagenum, x0, y0, x1, y1, index)))
         self.clear_text_area(x0, y0, x1, y1)
 
@@ -452,13 +526,14 @@ class Drawing(object):
         sy = 1 if y1 > y0 else -1
         mask = 0x8000
         line_error = dx / 2
+        points = []
         x, y = x0, y0
         for x in xrange(x0, x1+sx, sx):
             if pattern & mask != 0:
                 if steep:
-                    self.put_pixel(y, x, c)
+                    points.append((y, x))
                 else:
-                    self.put_pixel(x, y, c)
+                    points.append((x, y))
             mask >>= 1
             if mask == 0:
                 mask = 0x8000
@@ -466,6 +541,7 @@ class Drawing(object):
             if line_error < 0:
                 y += sy
                 line_error += dx
+        self.put_pixel_runs(points, c)
 
     def draw_box_filled(self, x0, y0, x1, y1, c):
         """Draw a filled box between the given corner points."""
@@ -497,15 +573,17 @@ class Drawing(object):
         else:
             p0, p1, q, direction = x0, x1, y0, 'x'
         sp = 1 if p1 > p0 else -1
+        points = []
         for p in range(p0, p1+sp, sp):
             if pattern & mask != 0:
                 if direction == 'x':
-                    self.put_pixel(p, q, c)
+                    points.append((p, q))
                 else:
-                    self.put_pixel(q, p, c)
+                    points.append((q, p))
             mask >>= 1
             if mask == 0:
                 mask = 0x8000
+        self.put_pixel_runs(points, c)
         return mask
 
     ### CIRCLE: circle, ellipse, sectors
@@ -624,6 +702,8 @@ class Drawing(object):
         # if oct1==oct0:
         # ----|.....|--- : coo1 lt coo0 : print if y in [0,coo1] or in [coo0, r]
         # ....|-----|... ; coo1 gte coo0: print if y in [coo0,coo1]
+        # collect points per octant, so that they form runs
+        points = [[] for _ in range(8)]
         x, y = r, 0
         bres_error = 1-r
         while x >= y:
@@ -646,7 +726,7 @@ class Drawing(object):
                         # (don't draw if y is between coo's)
                         if _octant_gt(oct0, y, coo1) and _octant_gt(oct0, coo0, y):
                             continue
-                self.put_pixel(*_octant_coord(octant, x0, y0, x, y), index=c)
+                points[octant].append(_octant_coord(octant, x0, y0, x, y))
             # remember endpoints for pie sectors
             if y == coo0:
                 coo0x = x
@@ -659,6 +739,8 @@ class Drawing(object):
             else:
                 x -= 1
                 bres_error += 2*(y-x+1)
+        for octant_points in points:
+            self.put_pixel_runs(octant_points, c)
         # draw pie-slice lines
         if line0:
             self.draw_line(x0, y0, *_octant_coord(oct0, x0, y0, coo0x, coo0), c=c)
@@ -684,6 +766,8 @@ class Drawing(object):
         ddx = 32 * ry * ry
         # error for first step
         err = dx + dy
+        # collect points per quadrant, so that they form runs
+        points = [[] for _ in range(4)]
         x, y = rx, 0
         while True:
             for quadrant in range(0,4):
@@ -701,7 +785,7 @@ class Drawing(object):
                     else:
                         if _quadrant_gt(qua0, x, y, x1, y1) and _quadrant_gt(qua0, x0, y0, x, y):
                             continue
-                self.put_pixel(*_quadrant_coord(quadrant, cx, cy, x, y), index=c)
+                points[quadrant].append(_quadrant_coord(quadrant, cx, cy, x, y))
             # bresenham error step
             e2 = 2 * err
             if (e2 <= dy):
@@ -715,12 +799,12 @@ class Drawing(object):
             # NOTE - err changes sign at the change from y increase to x increase
             if (x < 0):
                 break
+        for quadrant_points in points:
+            self.put_pixel_runs(quadrant_points, c)
         # too early stop of flat vertical ellipses
         # finish tip of ellipse
-        while (y < ry):
-            self.put_pixel(cx, cy+y, c)
-            self.put_pixel(cx, cy-y, c)
-            y += 1
+        self.put_pixel_runs(((cx, cy+tip_y) for tip_y in xrange(y, ry)), c)
+        self.put_pixel_runs(((cx, cy-tip_y) for tip_y in xrange(y, ry)), c)
         # draw pie-slice lines
         if line0:
             self.draw_line(cx, cy, *_quadrant_coord(qua0, cx, cy, x0, y0), c=c)
@@ -780,6 +864,7 @@ class Drawing(object):
             tile, back = [[c]*8], None
         bound_x0, bound_y0, bound_x1, bound_y1 = self.graph_view.get()
         x, y = self.graph_view.coords(*self.get_window_physical(*lcoord))
+        page = self._pixels.pages[self._apagenum]
         line_seed = [(x, x, y, 0)]
         # paint nothing if seed is out of bounds
         if x < bound_x0 or x > bound_x1 or y < bound_y0 or y > bound_y1:
@@ -792,8 +877,8 @@ class Drawing(object):
             # consider next interval
             x_start, x_stop, y, ydir = line_seed.pop()
             # extend interval as far as it goes to left and right
-            x_left = x_start - len(self.get_until(x_start-1, bound_x0-1, y, border))
-            x_right = x_stop + len(self.get_until(x_stop+1, bound_x1+1, y, border))
+            x_left = x_start - page.count_until(x_start-1, bound_x0-1, y, border)
+            x_right = x_stop + page.count_until(x_stop+1, bound_x1+1, y, border)
             # check next scanlines and add intervals to the list
             if ydir == 0:
                 if y + 1 <= bound_y1:
@@ -815,9 +900,9 @@ class Drawing(object):
             else:
                 interval = tile_to_interval(x_left, x_right, y, tile)
                 self.put_interval(self._apagenum, x_left, y, interval)
-            # allow interrupting the paint
+            # allow interrupting the paint; don't sleep, the interface catches up on its own
             if y%4 == 0:
-                self._input_methods.wait()
+                self._input_methods.check_events()
         self.last_attr = c
 
     def check_scanline(self, line_seed, x_start, x_stop, y,
@@ -825,31 +910,11 @@ class Drawing(object):
         """Append all subintervals between border colours to the scanning stack."""
         if x_stop < x_start:
             return line_seed
-        x_start_next = x_start
-        x_stop_next = x_start_next-1
         rtile = tile[y%len(tile)]
-        if back:
-            rback = back[y%len(back)]
-        x = x_start
-        while x <= x_stop:
-            # scan horizontally until border colour found, then append interval & continue scanning
-            pattern = self.get_until(x, x_stop+1, y, border)
-            x_stop_next = x + len(pattern) - 1
-            x = x_stop_next + 1
-            # never match zero pattern (special case)
-            has_same_pattern = (rtile != [0]*8)
-            for pat_x in range(len(pattern)):
-                if not has_same_pattern:
-                    break
-                tile_x = (x_start_next + pat_x) % 8
-                has_same_pattern &= (pattern[pat_x] == rtile[tile_x])
-                has_same_pattern &= (not back or pattern[pat_x] != rback[tile_x])
-            # we've reached a border colour, append our interval & start a new one
-            # don't append if same fill colour/pattern, to avoid infinite loops over bits already painted (eg. 00 shape)
-            if x_stop_next >= x_start_next and not has_same_pattern:
-                line_seed.append([x_start_next, x_stop_next, y, ydir])
-            x_start_next = x + 1
-            x += 1
+        rback = back[y%len(back)] if back else None
+        intervals = self._pixels.pages[self._apagenum].get_fill_intervals(
+                x_start, x_stop, y, border, rtile, rback)
+        line_seed.extend([x0, x1, y, ydir] for x0, x1 in intervals)
         return line_seed
 
     ### PUT and GET: Sprite operations
@@ -949,7 +1014,7 @@ class Drawing(object):
     def draw(self, gml):
         """Execute a Graphics Macro Language string."""
         # don't convert to uppercase as VARPTR$ elements are case sensitive
-        gmls = mlparser.MLParser(gml, self._memory, self._values)
+        gmls = self._gml_cache.get_parser(gml)
         plot, goback = True, False
         while True:
             c = gmls.skip_blank_read().upper()
@@ -16,6 +16,9 @@ import struct
 from .. import values
 from ..base import error
 
+# minimum number of bytes for which a block transfer is converted in one go
+BLOCK_THRESHOLD = 64
+
 # SCREEN 10 EGA pseudocolours, blink state 0 and 1
 INTENSITY_EGA_MONO_0 = (0x00, 0x00, 0x00, 0xaa, 0xaa, 0xaa, 0xff, 0xff, 0xff)
 INTENSITY_EGA_MONO_1 = (0x00, 0xaa, 0xff, 0x00, 0xaa, 0xff, 0x00, 0xaa, 0xff)
@@ -574,57 +577,86 @@ class MonoTextMode(TextMode):
 
 # helper functions: convert between attribute lists and byte arrays
 
+def _get_shifts(pixels_per_byte):
+    """Bit shifts of the pixels within a byte, from the left."""
+    bpp = 8//pixels_per_byte
+    return range(8-bpp, -1, -bpp)
+
 if numpy:
+    # attributes encoded in each byte value [byte][pixel], by number of pixels per byte
+    _UNPACK_TABLES = {
+        _ppb: (numpy.arange(256)[:, None] >> _get_shifts(_ppb)) & ((1 << 8//_ppb) - 1)
+        for _ppb in (1, 2, 4, 8)
+    }
+    # value of the lowest attribute bit of each pixel in a byte, by number of pixels per byte
+    _PACK_WEIGHTS = {
+        _ppb: numpy.left_shift(1, _get_shifts(_ppb))
+        for _ppb in (1, 2, 4, 8)
+    }
+
     def bytes_to_interval(byte_array, pixels_per_byte, mask=1):
         """Convert masked attributes packed into bytes to a scanline interval."""
-        bpp = 8//pixels_per_byte
-        attrmask = (1<<bpp) - 1
-        bitval = numpy.array([128, 64, 32, 16, 8, 4, 2, 1], dtype=numpy.uint8)
-        bitmask = bitval[0::bpp]
-        for i in xrange(1, bpp):
-            bitmask |= bitval[i::bpp]
-        pre_mask = numpy.tile(bitmask, len(byte_array))
-        post_shift = numpy.tile(
-                        numpy.array([7, 6, 5, 4, 3, 2, 1, 0])[(bpp-1)::bpp],
-                        len(byte_array))
-        attrs = numpy.right_shift(
-                    numpy.repeat(numpy.array(byte_array).astype(int),
-                                 pixels_per_byte) & pre_mask,
-                    post_shift) & attrmask
-        return numpy.array(attrs) * mask
+        attrs = _UNPACK_TABLES[pixels_per_byte][bytearray(byte_array)].ravel()
+        if mask != 1:
+            attrs *= mask
+        return attrs
 
     def interval_to_bytes(colours, pixels_per_byte, plane=0):
         """Convert a scanline interval into masked attributes packed into bytes."""
         num_pixels = len(colours)
-        num_bytes, odd_out = divmod(num_pixels, pixels_per_byte)
-        if odd_out:
-            num_bytes += 1
+        num_bytes = -(-num_pixels // pixels_per_byte)
+        attrmask = (1 << 8//pixels_per_byte) - 1
+        fields = numpy.zeros(num_bytes * pixels_per_byte, dtype=int)
+        fields[:num_pixels] = (numpy.asarray(colours, dtype=int) >> plane) & attrmask
+        packed = fields.reshape(num_bytes, pixels_per_byte).dot(_PACK_WEIGHTS[pixels_per_byte])
+        return bytearray(packed.astype(numpy.uint8).tobytes())
+
+    def rows_to_bytes(attrs, pixels_per_byte, planes=1):
+        """Pack a 2D array of attributes into an array of bytes [y][plane][x]."""
         bpp = 8//pixels_per_byte
-        attrmask = (1<<bpp) - 1
-        colours = numpy.array(colours).astype(int)
-        if odd_out:
-            colours.resize(len(colours)+pixels_per_byte-odd_out)
-        shift = numpy.tile(numpy.array([7, 6, 5, 4, 3, 2, 1, 0])[(bpp-1)::bpp],
-                           num_bytes)
-        attrs = numpy.right_shift(colours, plane)
-        attrs = numpy.left_shift(attrs & attrmask, shift)
-        # below is much faster than:
-        #   return list([ sum(attrs[i:i+pixels_per_byte])
-        #                 for i in xrange(0, len(attrs), pixels_per_byte) ])
-        # and anything involving numpy.array_split or numpy.dot is even slower.
-        # numpy.roll is ok but this is the fastest I've found:
-        nattrs = attrs[0::pixels_per_byte]
-        for i in xrange(1, pixels_per_byte):
-            nattrs |= attrs[i::pixels_per_byte]
-        return bytearray(list(nattrs))
+        attrs = numpy.asarray(attrs, dtype=int)
+        num_rows, width = attrs.shape
+        row_bytes = -(-width // pixels_per_byte)
+        fields = numpy.zeros((num_rows, planes, row_bytes*pixels_per_byte), dtype=int)
+        fields[:, :, :width] = (
+                attrs[:, None, :] >> (bpp * numpy.arange(planes))[:, None]
+            ) & ((1<<bpp) - 1)
+        fields = fields.reshape(num_rows, planes, row_bytes, pixels_per_byte)
+        fields <<= _get_shifts(pixels_per_byte)
+        return numpy.bitwise_or.reduce(fields, axis=3).astype(numpy.uint8)
+
+    def bytes_to_rows(byte_array, pixels_per_byte, width, num_rows, row_bytes, planes=1):
+        """Unpack bytes [y][plane][x] into a 2D array of attributes."""
+        bpp = 8//pixels_per_byte
+        size = num_rows * planes * row_bytes
+        data = numpy.zeros(size, dtype=numpy.uint8)
+        # bytes beyond the end of the array are taken as zero
+        packed = numpy.frombuffer(bytes(bytearray(byte_array[:size])), dtype=numpy.uint8)
+        data[:len(packed)] = packed
+        fields = (
+                data.astype(int).reshape(num_rows, planes, row_bytes, 1)
+                >> _get_shifts(pixels_per_byte)
+            ) & ((1<<bpp) - 1)
+        fields = fields.reshape(num_rows, planes, row_bytes*pixels_per_byte)
+        fields <<= (bpp * numpy.arange(planes))[:, None]
+        return numpy.bitwise_or.reduce(fields, axis=1)[:, :width]
 
 else:
+    # attributes encoded in each byte value [byte][pixel], by number of pixels per byte
+    _UNPACK_TABLES = {
+        _ppb: [
+            tuple((_byte >> _shift) & ((1 << 8//_ppb) - 1) for _shift in _get_shifts(_ppb))
+            for _byte in range(256)
+        ]
+        for _ppb in (1, 2, 4, 8)
+    }
+
     def bytes_to_interval(byte_array, pixels_per_byte, mask=1):
         """Convert masked attributes packed into bytes to a scanline interval."""
-        bpp = 8//pixels_per_byte
-        attrmask = (1<<bpp) - 1
-        return [((byte >> (8-bpp-shift)) & attrmask) * mask
-                    for byte in byte_array for shift in xrange(0, 8, bpp)]
+        unpack = _UNPACK_TABLES[pixels_per_byte]
+        if mask == 1:
+            return [attr for byte in bytearray(byte_array) for attr in unpack[byte]]
+        return [attr * mask for byte in bytearray(byte_array) for attr in unpack[byte]]
 
     def interval_to_bytes(colours, pixels_per_byte, plane=0):
         """Convert a scanline interval into masked attributes packed into bytes."""
@@ -645,6 +677,12 @@ else:
             shift -= bpp
         return byte_list
 
+def _pages_in_block(page, valid):
+    """Page numbers occurring in a block transfer."""
+    if not valid.any():
+        return ()
+    return xrange(page[valid].min(), page[valid].max() + 1)
+
 def walk_memory(self, addr, num_bytes, factor=1):
     """Yield parts of graphics memory corresponding to pixels."""
     # factor supports tandy-6 mode, which has 8 pixels per 2 bytes
@@ -688,45 +726,65 @@ def record_to_sprite_size_ega(self, byte_array):
     """Read 4-byte record of sprite size in EGA modes."""
     return struct.unpack('<HH', byte_array[0:4])
 
-def sprite_to_array_ega(self, attrs, dx, dy, byte_array, offs):
-    """Build the sprite byte array in EGA modes."""
-    # for EGA modes, sprites have 8 pixels per byte
-    # with colour planes in consecutive rows
-    # each new row is aligned on a new byte
-    #
-    # this is much faster for wide selections
-    # but for narrow selections storing in an array and indexing take longer
-    # than just getting each pixel separately
-    row_bytes = (dx+7) // 8
-    length = dy * self.bitsperpixel * row_bytes
-    if offs+length > len(byte_array):
-        raise ValueError('Sprite exceeds array byte size')
-    byte_array[offs:offs+length] = '\0'*length
-    for row in attrs:
-        for plane in range(self.bitsperpixel):
-            byte_array[offs:offs+row_bytes] = interval_to_bytes(row, 8, plane)
-            offs += row_bytes
-
-# elementwise OR, in-place if possible
 if numpy:
-    or_i = numpy.ndarray.__ior__
+    def sprite_to_array_ega(self, attrs, dx, dy, byte_array, offs):
+        """Build the sprite byte array in EGA modes."""
+        # for EGA modes, sprites have 8 pixels per byte
+        # with colour planes in consecutive rows
+        # each new row is aligned on a new byte
+        row_bytes = (dx+7) // 8
+        length = dy * self.bitsperpixel * row_bytes
+        if offs+length > len(byte_array):
+            raise ValueError('Sprite exceeds array byte size')
+        byte_array[offs:offs+length] = '\0'*length
+        packed = rows_to_bytes(attrs, 8, self.bitsperpixel)
+        if packed.shape[2] != row_bytes:
+            raise ValueError('Sprite rows do not match record size')
+        byte_array[offs:offs+length] = packed.tobytes()
+
+    def array_to_sprite_ega(self, byte_array, offset, dx, dy):
+        """Build sprite from byte_array in EGA modes."""
+        row_bytes = (dx+7) // 8
+        return bytes_to_rows(
+            byte_array[offset:], 8, dx, dy, row_bytes, self.bitsperpixel)
+
 else:
+    def sprite_to_array_ega(self, attrs, dx, dy, byte_array, offs):
+        """Build the sprite byte array in EGA modes."""
+        # for EGA modes, sprites have 8 pixels per byte
+        # with colour planes in consecutive rows
+        # each new row is aligned on a new byte
+        #
+        # this is much faster for wide selections
+        # but for narrow selections storing in an array and indexing take longer
+        # than just getting each pixel separately
+        row_bytes = (dx+7) // 8
+        length = dy * self.bitsperpixel * row_bytes
+        if offs+length > len(byte_array):
+            raise ValueError('Sprite exceeds array byte size')
+        byte_array[offs:offs+length] = '\0'*length
+        for row in attrs:
+            for plane in range(self.bitsperpixel):
+                byte_array[offs:offs+row_bytes] = interval_to_bytes(row, 8, plane)
+                offs += row_bytes
+
     def or_i(list0, list1):
+        """Elementwise OR."""
         return [ x | y for x, y in zip(list0, list1) ]
 
-def array_to_sprite_ega(self, byte_array, offset, dx, dy):
-    """Build sprite from byte_array in EGA modes."""
-    row_bytes = (dx+7) // 8
-    attrs = []
-    for y in range(dy):
-        row = bytes_to_interval(byte_array[offset:offset+row_bytes], 8, 1)
-        offset += row_bytes
-        for plane in range(1, self.bitsperpixel):
-            row = or_i(row, bytes_to_interval(
-                            byte_array[offset:offset+row_bytes], 8, 1 << plane))
+    def array_to_sprite_ega(self, byte_array, offset, dx, dy):
+        """Build sprite from byte_array in EGA modes."""
+        row_bytes = (dx+7) // 8
+        attrs = []
+        for y in range(dy):
+            row = bytes_to_interval(byte_array[offset:offset+row_bytes], 8, 1)
             offset += row_bytes
-        attrs.append(row[:dx])
-    return attrs
+            for plane in range(1, self.bitsperpixel):
+                row = or_i(row, bytes_to_interval(
+                                byte_array[offset:offset+row_bytes], 8, 1 << plane))
+                offset += row_bytes
+            attrs.append(row[:dx])
+        return attrs
 
 def build_tile_cga(self, pattern):
     """Build a flood-fill tile for CGA screens."""
@@ -806,6 +864,51 @@ class GraphicsMode(VideoMode):
         """Set the current colour plane mask (EGA only)."""
         pass
 
+    if numpy:
+        # each byte encodes pixels_per_byte pixels of field_bits bits each
+        # subclasses define the address-to-pixel layout in _get_coords_array
+        # and the colour planes affected in _get_write_masks and _get_read_planes
+
+        def _get_block_layout(self, addr, num_bytes):
+            """Get arrays of page, x, y and validity for each byte in a block."""
+            rel = numpy.arange(num_bytes) + (int(addr) - self.video_segment*0x10)
+            page, x, y = self._get_coords_array(rel)
+            valid = ((page >= 0) & (page < self.num_pages) &
+                     (x < self.pixel_width) & (y < self.pixel_height))
+            return rel, page, x, y, valid
+
+        def _get_block_shifts(self):
+            """Bit shifts of the pixels within a byte."""
+            return numpy.arange(8-self.field_bits, -1, -self.field_bits)
+
+        def _set_memory_block(self, screen, addr, byte_array):
+            """Set a block of bytes in graphics memory, converting all at once."""
+            rel, page, x, y, valid = self._get_block_layout(addr, len(byte_array))
+            multiplier, masks = self._get_write_masks(rel)
+            fields = numpy.frombuffer(bytes(bytearray(byte_array)), dtype=numpy.uint8)
+            fields = fields.astype(int)[:, None] >> self._get_block_shifts()
+            fields &= (1 << self.field_bits) - 1
+            colours = fields * multiplier[:, None]
+            xs = x[:, None] + numpy.arange(self.pixels_per_byte)
+            for pagenum in _pages_in_block(page, valid):
+                sel = valid & (page == pagenum)
+                screen.drawing.put_pixel_block(int(pagenum),
+                    xs[sel], y[sel, None], colours[sel], masks[sel, None])
+
+        def _get_memory_block(self, screen, addr, num_bytes):
+            """Retrieve a block of bytes from graphics memory, converting all at once."""
+            rel, page, x, y, valid = self._get_block_layout(addr, num_bytes)
+            planes = self._get_read_planes(rel)
+            colours = numpy.zeros((num_bytes, self.pixels_per_byte), dtype=int)
+            xs = x[:, None] + numpy.arange(self.pixels_per_byte)
+            for pagenum in _pages_in_block(page, valid):
+                sel = valid & (page == pagenum)
+                colours[sel] = screen.pixels.pages[pagenum].buffer[y[sel, None], xs[sel]]
+            fields = (colours >> planes[:, None]) & ((1 << self.field_bits) - 1)
+            return bytearray(
+                numpy.bitwise_or.reduce(fields << self._get_block_shifts(), axis=1
+                ).astype(numpy.uint8).tobytes())
+
 
 class CGAMode(GraphicsMode):
     """Default settings for a CGA graphics mode."""
@@ -822,14 +925,44 @@ class CGAMode(GraphicsMode):
         y = bank + self.interleave_times * row
         return page, x, y
 
+    @property
+    def field_bits(self):
+        """Number of bits per pixel in a byte."""
+        return self.bitsperpixel
+
+    @property
+    def pixels_per_byte(self):
+        """Number of pixels encoded in a byte."""
+        return self.ppb
+
+    if numpy:
+        def _get_coords_array(self, rel):
+            """Get video pages and coordinates for an array of relative addresses."""
+            page, rel = rel // self.page_size, rel % self.page_size
+            bank, offset = rel // self.bank_size, rel % self.bank_size
+            row, col = offset // self.bytes_per_row, offset % self.bytes_per_row
+            return page, col * self.ppb, bank + self.interleave_times * row
+
+        def _get_write_masks(self, rel):
+            """Colour multipliers and plane masks for an array of relative addresses."""
+            return numpy.ones(len(rel), dtype=int), numpy.full(len(rel), 0xff, dtype=int)
+
+        def _get_read_planes(self, rel):
+            """Lowest attribute bit read for an array of relative addresses."""
+            return numpy.zeros(len(rel), dtype=int)
+
     def set_memory(self, screen, addr, byte_array):
         """Set bytes in CGA memory."""
+        if numpy and len(byte_array) >= BLOCK_THRESHOLD:
+            return self._set_memory_block(screen, addr, byte_array)
         for page, x, y, ofs, length in walk_memory(self, addr, len(byte_array)):
             screen.drawing.put_interval(page, x, y,
                 bytes_to_interval(byte_array[ofs:ofs+length], self.ppb))
 
     def get_memory(self, screen, addr, num_bytes):
         """Retrieve bytes from CGA memory."""
+        if numpy and num_bytes >= BLOCK_THRESHOLD:
+            return self._get_memory_block(screen, addr, num_bytes)
         byte_array = bytearray(num_bytes)
         for page, x, y, ofs, length in walk_memory(self, addr, num_bytes):
             byte_array[ofs:ofs+length] = interval_to_bytes(
@@ -844,31 +977,50 @@ class CGAMode(GraphicsMode):
         """Read 4-byte record of sprite size."""
         return struct.unpack('<HH', byte_array[0:4])
 
-    def sprite_to_array(self, attrs, dx, dy, byte_array, offs):
-        """Build the sprite byte array."""
-        row_bytes = (dx * self.bitsperpixel + 7) // 8
-        length = row_bytes*dy
-        if offs+length > len(byte_array):
-            # NOTE: if we use memoryviews instead of bytearrays, we won't need
-            # this check as the assignment will fail with ValueError anyway
-            raise ValueError('Sprite exceeds array byte size')
-        byte_array[offs:offs+length] = '\0'*length
-        for row in attrs:
-            byte_array[offs:offs+row_bytes] = interval_to_bytes(
-                                                row, 8//self.bitsperpixel, 0)
-            offs += row_bytes
-
-    def array_to_sprite(self, byte_array, offset, dx, dy):
-        """Build sprite from byte_array."""
-        row_bytes = (dx * self.bitsperpixel + 7) // 8
-        # illegal fn call if outside screen boundary
-        attrs = []
-        for y in range(dy):
-            row = bytes_to_interval(byte_array[offset:offset+row_bytes],
-                                      8//self.bitsperpixel, 1)
-            offset += row_bytes
-            attrs.append(row[:dx])
-        return attrs
+    if numpy:
+        def sprite_to_array(self, attrs, dx, dy, byte_array, offs):
+            """Build the sprite byte array."""
+            row_bytes = (dx * self.bitsperpixel + 7) // 8
+            length = row_bytes*dy
+            if offs+length > len(byte_array):
+                raise ValueError('Sprite exceeds array byte size')
+            byte_array[offs:offs+length] = '\0'*length
+            packed = rows_to_bytes(attrs, self.ppb)
+            if packed.shape[2] != row_bytes:
+                raise ValueError('Sprite rows do not match record size')
+            byte_array[offs:offs+length] = packed.tobytes()
+
+        def array_to_sprite(self, byte_array, offset, dx, dy):
+            """Build sprite from byte_array."""
+            row_bytes = (dx * self.bitsperpixel + 7) // 8
+            return bytes_to_rows(byte_array[offset:], self.ppb, dx, dy, row_bytes)
+
+    else:
+        def sprite_to_array(self, attrs, dx, dy, byte_array, offs):
+            """Build the sprite byte array."""
+            row_bytes = (dx * self.bitsperpixel + 7) // 8
+            length = row_bytes*dy
+            if offs+length > len(byte_array):
+                # NOTE: if we use memoryviews instead of bytearrays, we won't need
+                # this check as the assignment will fail with ValueError anyway
+                raise ValueError('Sprite exceeds array byte size')
+            byte_array[offs:offs+length] = '\0'*length
+            for row in attrs:
+                byte_array[offs:offs+row_bytes] = interval_to_bytes(
+                                                    row, 8//self.bitsperpixel, 0)
+                offs += row_bytes
+
+        def array_to_sprite(self, byte_array, offset, dx, dy):
+            """Build sprite from byte_array."""
+            row_bytes = (dx * self.bitsperpixel + 7) // 8
+            # illegal fn call if outside screen boundary
+            attrs = []
+            for y in range(dy):
+                row = bytes_to_interval(byte_array[offset:offset+row_bytes],
+                                          8//self.bitsperpixel, 1)
+                offset += row_bytes
+                attrs.append(row[:dx])
+            return attrs
 
     build_tile = build_tile_cga
 
@@ -919,12 +1071,33 @@ class EGAMode(GraphicsMode):
         x, y = (addr%self.bytes_per_row)*8, addr//self.bytes_per_row
         return page, x, y
 
+    # planar: one bit per pixel in each byte
+    field_bits = 1
+    pixels_per_byte = 8
+
+    if numpy:
+        def _get_coords_array(self, rel):
+            """Get video pages and coordinates for an array of relative addresses."""
+            page, rel = rel // self.page_size, rel % self.page_size
+            return page, (rel % self.bytes_per_row) * 8, rel // self.bytes_per_row
+
+        def _get_write_masks(self, rel):
+            """Colour multipliers and plane masks for an array of relative addresses."""
+            mask = numpy.full(len(rel), self.plane_mask & self.master_plane_mask, dtype=int)
+            return mask, mask
+
+        def _get_read_planes(self, rel):
+            """Lowest attribute bit read for an array of relative addresses."""
+            return numpy.full(len(rel), self.plane % (max(self.planes_used)+1), dtype=int)
+
     def get_memory(self, screen, addr, num_bytes):
         """Retrieve bytes from EGA memory."""
         plane = self.plane % (max(self.planes_used)+1)
         byte_array = bytearray(num_bytes)
         if plane not in self.planes_used:
             return byte_array
+        if numpy and num_bytes >= BLOCK_THRESHOLD:
+            return self._get_memory_block(screen, addr, num_bytes)
         for page, x, y, ofs, length in walk_memory(self, addr, num_bytes):
             byte_array[ofs:ofs+length] = interval_to_bytes(
                 screen.pixels.pages[page].get_interval(x, y, length*self.ppb),
@@ -941,6 +1114,8 @@ class EGAMode(GraphicsMode):
         # return immediately for unused colour planes
         if mask == 0:
             return
+        if numpy and len(byte_array) >= BLOCK_THRESHOLD:
+            return self._set_memory_block(screen, addr, byte_array)
         for page, x, y, ofs, length in walk_memory(self, addr, len(byte_array)):
             screen.drawing.put_interval(page, x, y,
                 bytes_to_interval(byte_array[ofs:ofs+length], self.ppb, mask), mask)
@@ -998,10 +1173,33 @@ class Tandy6Mode(GraphicsMode):
         y = bank + 4 * row
         return page, x, y
 
+    # even bytes hold the low attribute bit, odd bytes the high bit, for 8 pixels
+    field_bits = 1
+    pixels_per_byte = 8
+
+    if numpy:
+        def _get_coords_array(self, rel):
+            """Get video pages and coordinates for an array of relative addresses."""
+            page, rel = rel // self.page_size, rel % self.page_size
+            bank, offset = rel // self.bank_size, rel % self.bank_size
+            row, col = offset // self.bytes_per_row, offset % self.bytes_per_row
+            return page, (col // 2) * 8, bank + 4 * row
+
+        def _get_write_masks(self, rel):
+            """Colour multipliers and plane masks for an array of relative addresses."""
+            mask = 1 << (rel % 2)
+            return mask, mask
+
+        def _get_read_planes(self, rel):
+            """Lowest attribute bit read for an array of relative addresses."""
+            return rel % 2
+
     def get_memory(self, screen, addr, num_bytes):
         """Retrieve bytes from Tandy 640x200x4 """
         # 8 pixels per 2 bytes
         # low attribute bits stored in even bytes, high bits in odd bytes.
+        if numpy and num_bytes >= BLOCK_THRESHOLD:
+            return self._get_memory_block(screen, addr, num_bytes)
         half_len = (num_bytes+1) // 2
         hbytes = bytearray(half_len), bytearray(half_len)
         for parity in (0, 1):
@@ -1014,6 +1212,8 @@ class Tandy6Mode(GraphicsMode):
 
     def set_memory(self, screen, addr, byte_array):
         """Set bytes in Tandy 640x200x4 memory."""
+        if numpy and len(byte_array) >= BLOCK_THRESHOLD:
+            return self._set_memory_block(screen, addr, byte_array)
         hbytes = byte_array[0::2], byte_array[1::2]
         # Tandy-6 encodes 8 pixels per byte, alternating colour planes.
         # I.e. even addresses are 'colour plane 0', odd ones are 'plane 1'
@@ -6,6 +6,8 @@ Graphics buffer operations
 This file is released under the GNU GPL version 3 or later.
 """
 
+import threading
+
 try:
     import numpy
 except ImportError:
@@ -19,21 +21,27 @@ from .. import values
 class PixelBuffer(object):
     """Buffer for graphics on all screen pages."""
 
-    def __init__(self, bwidth, bheight, bpages, bitsperpixel):
+    def __init__(self, bwidth, bheight, bpages, bitsperpixel, shared=False):
         """Initialise the graphics buffer to given pages and dimensions."""
-        self.pages = [PixelPage(bwidth, bheight, num, bitsperpixel) for num in range(bpages)]
+        # the interface can only read the buffer directly if it's a numpy array
+        self.shared = shared and numpy is not None
+        self.pages = [
+            PixelPage(bwidth, bheight, num, bitsperpixel, self.shared)
+            for num in range(bpages)
+        ]
         self.width = bwidth
         self.height = bheight
 
     def copy_page(self, src, dst):
         """Copy source to destination page."""
         self.pages[dst].buffer[:] = self.pages[src].buffer[:]
+        self.pages[dst].mark_dirty(0, 0, self.width-1, self.height-1)
 
 
 class PixelPage(object):
     """Buffer for a screen page."""
 
-    def __init__(self, bwidth, bheight, pagenum, bitsperpixel):
+    def __init__(self, bwidth, bheight, pagenum, bitsperpixel, shared=False):
         """Initialise the screen buffer to given dimensions."""
         if numpy:
             self.buffer = numpy.zeros((bheight, bwidth), dtype=numpy.int8)
@@ -43,20 +51,54 @@ class PixelPage(object):
         self.height = bheight
         self.pagenum = pagenum
         self.bitsperpixel = bitsperpixel
+        # if shared, the interface reads changed areas directly from the buffer
+        self.shared = shared
+        # incremented on every change, so that the interface can skip unchanged pages
+        self.generation = 0
+        # bounding rect of changes not yet picked up by the interface
+        self._dirty = None
+        self._lock = threading.Lock()
         self.init_operations()
+        self.mark_dirty(0, 0, bwidth-1, bheight-1)
 
     def __getstate__(self):
         """Pickle the page."""
         pagedict = self.__dict__.copy()
         # lambdas can't be pickled
         pagedict['operations'] = None
+        # neither can locks
+        pagedict['_lock'] = None
         return pagedict
 
     def __setstate__(self, pagedict):
         """Initialise from pickled page."""
         self.__dict__.update(pagedict)
+        self._lock = threading.Lock()
         self.init_operations()
 
+    def mark_dirty(self, x0, y0, x1, y1):
+        """Record that an area of a shared buffer has changed."""
+        if not self.shared:
+            return
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(self.width-1, x1), min(self.height-1, y1)
+        if x1 < x0 or y1 < y0:
+            return
+        # pixels must be written before the change is recorded
+        # so that the interface never drops a change it hasn't seen
+        with self._lock:
+            if self._dirty:
+                dx0, dy0, dx1, dy1 = self._dirty
+                x0, y0, x1, y1 = min(x0, dx0), min(y0, dy0), max(x1, dx1), max(y1, dy1)
+            self._dirty = x0, y0, x1, y1
+            self.generation += 1
+
+    def take_dirty(self):
+        """Retrieve and reset the bounding rect of changes to a shared buffer."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, None
+        return dirty
+
     def put_pixel(self, x, y, attr):
         """Put a pixel in the buffer."""
         try:
@@ -91,12 +133,14 @@ class PixelPage(object):
 
         def put_interval(self, x, y, colours, mask=0xff):
             """Write a list of attributes to a scanline interval."""
-            colours = numpy.array(colours).astype(int)
-            inv_mask = 0xff ^ mask
-            colours &= mask
+            colours = numpy.array(colours, dtype=int)
             try:
-                self.buffer[y, x:x+len(colours)] &= inv_mask
-                self.buffer[y, x:x+len(colours)] |= colours
+                if mask == 0xff:
+                    self.buffer[y, x:x+len(colours)] = colours
+                else:
+                    colours &= mask
+                    self.buffer[y, x:x+len(colours)] &= 0xff ^ mask
+                    self.buffer[y, x:x+len(colours)] |= colours
                 return self.buffer[y, x:x+len(colours)]
             except IndexError:
                 return numpy.zeros(len(colours), dtype=numpy.int8)
@@ -108,6 +152,28 @@ class PixelPage(object):
             except IndexError:
                 return numpy.zeros(length, dtype=numpy.int8)
 
+        def put_pixel_block(self, xs, ys, colours, masks, selection):
+            """Write masked attributes to selected pixels at arrays of coordinates; return bounding rect."""
+            shape = numpy.broadcast(xs, ys, colours, masks, selection).shape
+            selection = numpy.broadcast_to(selection, shape)
+            xs = numpy.broadcast_to(xs, shape)[selection]
+            ys = numpy.broadcast_to(ys, shape)[selection]
+            masks = numpy.broadcast_to(masks, shape)[selection]
+            colours = numpy.broadcast_to(colours, shape)[selection]
+            # bytes for different planes may address the same pixel, so write one mask at a time
+            mask_values = numpy.unique(masks)
+            for mask in mask_values:
+                if len(mask_values) > 1:
+                    sel = (masks == mask)
+                    mxs, mys, mcolours = xs[sel], ys[sel], colours[sel]
+                else:
+                    mxs, mys, mcolours = xs, ys, colours
+                if mask == 0xff:
+                    self.buffer[mys, mxs] = mcolours
+                else:
+                    self.buffer[mys, mxs] = (self.buffer[mys, mxs] & ~mask) | (mcolours & mask)
+            return xs.min(), ys.min(), xs.max(), ys.max()
+
         def fill_rect(self, x0, y0, x1, y1, attr):
             """Apply solid attribute to an area."""
             if (x1 < x0) or (y1 < y0):
@@ -139,7 +205,7 @@ class PixelPage(object):
             """Move pixels from an area to another, replacing with attribute 0."""
             w, h = sx1-sx0+1, sy1-sy0+1
             area = numpy.array(self.buffer[sy0:sy1+1, sx0:sx1+1])
-            self.buffer[sy0:sy1+1, sx0:sx1+1] = numpy.zeros((h, w), dtype=numpy.int8)
+            self.buffer[sy0:sy1+1, sx0:sx1+1].fill(0)
             self.buffer[ty0:ty0+h, tx0:tx0+w] = area
 
         def get_until(self, x0, x1, y, c):
@@ -161,6 +227,50 @@ class PixelPage(object):
                     arr = arr[found[0][-1]+1:]
             return list(arr.flatten())
 
+        def count_until(self, x0, x1, y, c):
+            """Count the pixels in a scanline interval [x0, x1-1] up to attribute c."""
+            if x0 == x1:
+                return 0
+            toright = x1 > x0
+            if not toright:
+                x0, x1 = x1+1, x0+1
+            try:
+                arr = self.buffer[y, x0:x1]
+            except IndexError:
+                return 0
+            found = numpy.flatnonzero(arr == c)
+            if not len(found):
+                return len(arr)
+            elif toright:
+                return int(found[0])
+            return len(arr) - int(found[-1]) - 1
+
+        def get_fill_intervals(self, x0, x1, y, border, rtile, rback):
+            """Split a scanline interval [x0, x1] at the border attribute;
+            return the subintervals that do not already show the fill pattern."""
+            try:
+                arr = self.buffer[y, x0:x1+1]
+            except IndexError:
+                return []
+            # subintervals between border pixels, as [starts, stops)
+            borders = numpy.flatnonzero(arr == border)
+            starts = numpy.concatenate(([0], borders + 1))
+            stops = numpy.concatenate((borders, [len(arr)]))
+            wanted = stops > starts
+            # never match zero pattern (special case)
+            if any(rtile):
+                tile_xs = numpy.arange(x0, x1+1) % 8
+                matches = (arr == numpy.array(rtile)[tile_xs])
+                if rback:
+                    matches &= (arr != numpy.array(rback)[tile_xs])
+                # number of pixels not matching the pattern up to each position
+                misses = numpy.concatenate(([0], numpy.cumsum(~matches)))
+                wanted &= (misses[stops] > misses[starts])
+            return [
+                (x0 + int(start), x0 + int(stop) - 1)
+                for start, stop in zip(starts[wanted], stops[wanted])
+            ]
+
     else:
         def init_operations(self):
             """Initialise operations closures."""
@@ -237,3 +347,34 @@ class PixelPage(object):
             except ValueError:
                 index = x1-x0
             return self.buffer[y][x0:x0+index]
+
+        def count_until(self, x0, x1, y, c):
+            """Count the pixels in a scanline interval [x0, x1-1] up to attribute c."""
+            return len(self.get_until(x0, x1, y, c))
+
+        def get_fill_intervals(self, x0, x1, y, border, rtile, rback):
+            """Split a scanline interval [x0, x1] at the border attribute;
+            return the subintervals that do not already show the fill pattern."""
+            intervals = []
+            x_start_next = x0
+            x = x0
+            while x <= x1:
+                # scan horizontally until border colour found, then append interval & continue scanning
+                pattern = self.get_until(x, x1+1, y, border)
+                x_stop_next = x + len(pattern) - 1
+                x = x_stop_next + 1
+                # never match zero pattern (special case)
+                has_same_pattern = (rtile != [0]*8)
+                for pat_x in range(len(pattern)):
+                    if not has_same_pattern:
+                        break
+                    tile_x = (x_start_next + pat_x) % 8
+                    has_same_pattern &= (pattern[pat_x] == rtile[tile_x])
+                    has_same_pattern &= (not rback or pattern[pat_x] != rback[tile_x])
+                # we've reached a border colour, append our interval & start a new one
+                # don't append if same fill colour/pattern, to avoid infinite loops over bits already painted (eg. 00 shape)
+                if x_stop_next >= x_start_next and not has_same_pattern:
+                    intervals.append((x_start_next, x_stop_next))
+                x_start_next = x + 1
+                x += 1
+            return intervals
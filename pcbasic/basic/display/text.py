@@ -15,58 +15,194 @@ class TextRow(object):
     def __init__(self, attr, width, conv, dbcs_enabled):
         """Set up screen row empty and unwrapped."""
         self.width = width
+        self._dbcs_enabled = dbcs_enabled
+        self._conv = conv
         self.clear(attr)
         # line continues on next row (either LF or word wrap happened)
         self.wrap = False
-        self._dbcs_enabled = dbcs_enabled
-        self._conv = conv
 
     def clear(self, attr):
         """Clear the screen row buffer. Leave wrap untouched."""
         # screen buffer, initialised to spaces
-        self.buf = [(b' ', attr)] * self.width
+        self.chars = bytearray(b' ' * self.width)
+        self.attrs = bytearray(chr(attr) * self.width)
         # character is part of double width char; 0 = no; 1 = lead, 2 = trail
-        self.double = [0] * self.width
+        self.double = bytearray(self.width)
+        # converter state before each column; None if it needs to be recomputed
+        self._states = None
         # last non-whitespace character
         self.end = 0
 
     def clear_from(self, scol, attr):
         """Clear characters from given position till end of row."""
-        self.buf = self.buf[:scol-1] + [(b' ', attr)] * (self.width - scol + 1)
-        self.double = self.double[:scol-1] + [0] * (self.width - scol + 1)
+        self.chars[scol-1:] = b' ' * (self.width - scol + 1)
+        self.attrs[scol-1:] = chr(attr) * (self.width - scol + 1)
+        self.double[scol-1:] = bytearray(self.width - scol + 1)
+        self._states = None
         self.end = min(self.end, scol-1)
 
+    def clear_area(self, col0, col1, attr):
+        """Clear characters on a range of columns, leaving DBCS marks untouched."""
+        self.chars[col0-1:col1] = b' ' * (col1 - col0 + 1)
+        self.attrs[col0-1:col1] = chr(attr) * (col1 - col0 + 1)
+        self._states = None
+
+    def copy_from(self, other):
+        """Copy contents of another row."""
+        self.chars[:] = other.chars
+        self.attrs[:] = other.attrs
+        self.double[:] = other.double
+        self._states = other._states and list(other._states)
+
+    def insert_char_attr(self, col, c, attr):
+        """Insert a byte, shifting the rest of the row right; return the byte and attr pushed off."""
+        pushed = chr(self.chars[-1]), self.attrs[-1]
+        self.chars[col-1:] = c + self.chars[col-1:-1]
+        self.attrs[col-1:] = chr(attr) + self.attrs[col-1:-1]
+        self.double[col-1:] = b'\0' + self.double[col-1:-1]
+        self._states = None
+        return pushed
+
     def put_char_attr(self, col, c, attr):
         """Put a byte to the screen, reinterpreting SBCS and DBCS as necessary."""
         # update the screen buffer
-        self.buf[col-1] = (c, attr)
-        self.double[col-1] = 0
+        self.chars[col-1] = ord(c)
+        self.attrs[col-1] = attr
         # for sbcs codepages we're done now
         if not self._dbcs_enabled:
             return col, col
-        # mark out replaced char and changed following dbcs characters to be redrawn
-        sequences = self._conv.mark(b''.join(entry[0] for entry in self.buf), flush=True)
-        flags = ((0,) if len(seq) == 1 else (1, 2) for seq in sequences)
-        old_double = self.double
-        self.double = [entry for flag in flags for entry in flag]
-        # find the first and last changed columns, to be able to redraw
-        diff = [old != new for old, new in zip(old_double, self.double)]
-        if True in diff:
-            start, stop = diff.index(True) + 1, len(diff) - diff[::-1].index(True)
+        if self._states is None:
+            start, stop = self._mark(0)
         else:
+            start, stop = self._mark(col-1)
+        if start is None:
             start, stop = col, col
         # if the tail byte has changed, the lead byte needs to be redrawn as well
         if self.double[start-1] == 2:
             start -= 1
         return min(col, start), max(col, stop)
 
+    def put_chars_attr(self, col, s, attr):
+        """Put a run of bytes on the row, reinterpreting SBCS and DBCS as necessary."""
+        last = col + len(s) - 1
+        self.chars[col-1:last] = s
+        self.attrs[col-1:last] = chr(attr) * len(s)
+        if not self._dbcs_enabled:
+            return col, last
+        if self._states is None:
+            start, stop = self._mark(0)
+        else:
+            start, stop = self._mark(col-1, last-1)
+        if start is None:
+            start, stop = col, last
+        start, stop = min(col, start), max(last, stop)
+        # if the tail byte has changed, the lead byte needs to be redrawn as well
+        if self.double[start-1] == 2:
+            start -= 1
+        return start, stop
+
+    def _mark(self, first, last=None):
+        """Redo DBCS marking from a column until the converter state is as before.
+        Marking does not stop before the column last, if given."""
+        if last is None:
+            last = first
+        old_states = self._states
+        if old_states is None:
+            self._states = [None] * self.width
+            self._states[0] = (b'', -1, b'')
+        self._conv.set_state(self._states[first])
+        # pending bytes before the first column get marked again
+        pos = first - len(self._states[first][0])
+        start, stop = None, None
+        for i in xrange(first, self.width+1):
+            if i == self.width:
+                sequences = self._conv.mark(b'', flush=True)
+            else:
+                state = self._conv.get_state()
+                if old_states and i > last and state == old_states[i]:
+                    # from here on, marking is the same as before
+                    break
+                self._states[i] = state
+                sequences = self._conv.mark(chr(self.chars[i]))
+            for seq in sequences:
+                flags = (0,) if len(seq) == 1 else (1, 2)
+                for flag in flags:
+                    if self.double[pos] != flag:
+                        self.double[pos] = flag
+                        if start is None:
+                            start = pos + 1
+                        stop = pos + 1
+                    pos += 1
+        return start, stop
+
+
+class RowRing(object):
+    """Circular buffer of screen rows with a moving origin."""
+
+    def __init__(self, rows):
+        """Set up the ring with the given rows, top row first."""
+        self._rows = rows
+        self._origin = 0
+
+    def __len__(self):
+        """Number of rows."""
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        """Retrieve a row, or a list of rows, by index on the screen."""
+        if isinstance(index, slice):
+            return [self[i] for i in xrange(*index.indices(len(self._rows)))]
+        if index < 0:
+            index += len(self._rows)
+        return self._rows[(self._origin + index) % len(self._rows)]
+
+    def __setitem__(self, index, row):
+        """Place a row at an index on the screen."""
+        if index < 0:
+            index += len(self._rows)
+        self._rows[(self._origin + index) % len(self._rows)] = row
+
+    def __iter__(self):
+        """Iterate over the rows, top row first."""
+        for index in xrange(len(self._rows)):
+            yield self[index]
+
+    def rotate(self, top, bottom, step):
+        """Move rows top..bottom (0-based, inclusive) by one place up (step 1) or down (step -1).
+        Return the row that was moved from one end of the range to the other."""
+        height = len(self._rows)
+        if bottom - top + 1 <= height // 2:
+            # range is small: shift the rows within the range
+            if step > 0:
+                freed = self[top]
+                for index in xrange(top, bottom):
+                    self[index] = self[index+1]
+                self[bottom] = freed
+            else:
+                freed = self[bottom]
+                for index in xrange(bottom, top, -1):
+                    self[index] = self[index-1]
+                self[top] = freed
+            return freed
+        # range is large: move the origin and put back the rows outside the range
+        outside = [
+            (index, self[index])
+            for index in xrange(height) if index < top or index > bottom
+        ]
+        freed = self[top] if step > 0 else self[bottom]
+        self._origin = (self._origin + step) % height
+        for index, row in outside:
+            self[index] = row
+        self[bottom if step > 0 else top] = freed
+        return freed
+
 
 class TextPage(object):
     """Buffer for a screen page."""
 
     def __init__(self, attr, width, height, conv, dbcs_enabled):
         """Initialise the screen buffer to given dimensions."""
-        self.row = [TextRow(attr, width, conv, dbcs_enabled) for _ in xrange(height)]
+        self.row = RowRing([TextRow(attr, width, conv, dbcs_enabled) for _ in xrange(height)])
         self.width = width
         self.height = height
 
@@ -91,13 +227,12 @@ class TextBuffer(object):
         for num, page in enumerate(self.pages):
             row_strs += [horiz_bar]
             for i, row in enumerate(page.row):
-                s = [ c[0] for c in row.buf ]
                 outstr = '{0:2}'.format(i)
                 if lastwrap:
                     outstr += ('\\')
                 else:
                     outstr += ('|')
-                outstr += (''.join(s))
+                outstr += str(row.chars)
                 if row.wrap:
                     row_strs.append(outstr + '\\ {0:2}'.format(row.end))
                 else:
@@ -111,38 +246,43 @@ class TextBuffer(object):
         for x in range(self.height):
             dstrow = self.pages[dst].row[x]
             srcrow = self.pages[src].row[x]
-            dstrow.buf[:] = srcrow.buf[:]
+            dstrow.copy_from(srcrow)
             dstrow.end = srcrow.end
             dstrow.wrap = srcrow.wrap
 
     def clear_area(self, pagenum, row0, col0, row1, col1, attr):
         """Clear a rectangular area of the screen."""
         for r in range(row0-1, row1):
-            self.pages[pagenum].row[r].buf[col0-1:col1] = [(b' ', attr)] * (col1 - col0 + 1)
+            self.pages[pagenum].row[r].clear_area(col0, col1, attr)
 
     def put_char_attr(self, pagenum, row, col, c, attr):
         """Put a byte to the screen, reinterpreting SBCS and DBCS as necessary."""
         return self.pages[pagenum].row[row-1].put_char_attr(col, c, attr)
 
+    def put_chars_attr(self, pagenum, row, col, s, attr):
+        """Put a run of bytes on a row, reinterpreting SBCS and DBCS as necessary."""
+        return self.pages[pagenum].row[row-1].put_chars_attr(col, s, attr)
+
     def scroll_up(self, pagenum, from_line, bottom, attr):
         """Scroll up."""
-        self.pages[pagenum].row.insert(bottom,
-                TextRow(attr, self.width, self._conv, self._dbcs_enabled))
-        del self.pages[pagenum].row[from_line-1]
+        # recycle the row scrolled off the top as the new bottom row
+        therow = self.pages[pagenum].row.rotate(from_line-1, bottom-1, 1)
+        therow.clear(attr)
+        therow.wrap = False
 
     def scroll_down(self, pagenum, from_line, bottom, attr):
         """Scroll down."""
-        self.pages[pagenum].row.insert(from_line - 1,
-                TextRow(attr, self.width, self._conv, self._dbcs_enabled))
-        del self.pages[pagenum].row[bottom-1]
+        therow = self.pages[pagenum].row.rotate(from_line-1, bottom-1, -1)
+        therow.clear(attr)
+        therow.wrap = False
 
     def get_char(self, pagenum, row, col):
         """Retrieve a byte from the screen (SBCS or DBCS half-char)."""
-        return ord(self.pages[pagenum].row[row-1].buf[col-1][0])
+        return self.pages[pagenum].row[row-1].chars[col-1]
 
     def get_attr(self, pagenum, row, col):
         """Retrieve attribute from the screen."""
-        return self.pages[pagenum].row[row-1].buf[col-1][1]
+        return self.pages[pagenum].row[row-1].attrs[col-1]
 
     def get_charwidth(self, pagenum, row, col):
         """Retrieve DBCS character width in bytes."""
@@ -157,12 +297,9 @@ class TextBuffer(object):
         """Retrieve SBCS or DBCS character."""
         therow = self.pages[pagenum].row[row-1]
         if therow.double[col-1] == 1:
-            ca = therow.buf[col-1]
-            da = therow.buf[col]
-            char, attr = ca[0] + da[0], da[1]
+            char, attr = bytes(therow.chars[col-1:col+1]), therow.attrs[col]
         elif therow.double[col-1] == 0:
-            ca = therow.buf[col-1]
-            char, attr = ca[0], ca[1]
+            char, attr = chr(therow.chars[col-1]), therow.attrs[col-1]
         else:
             char, attr = '\0', 0
             logging.debug('DBCS buffer corrupted at %d, %d (%d)', row, col, therow.double[col-1])
@@ -171,7 +308,7 @@ class TextBuffer(object):
     def get_text_raw(self, pagenum):
         """Retrieve all raw text on a page."""
         return tuple(
-            b''.join(c for c, _ in self.pages[pagenum].row[row_index].buf)
+            bytes(self.pages[pagenum].row[row_index].chars)
             for row_index in range(self.pages[pagenum].height)
         )
 
@@ -190,7 +327,7 @@ class TextBuffer(object):
         full = []
         clip = []
         while r < stop_row or (r == stop_row and c < stop_col):
-            clip.append(self.pages[pagenum].row[r-1].buf[c-1][0])
+            clip.append(chr(self.pages[pagenum].row[r-1].chars[c-1]))
             c += 1
             if c > self.pages[pagenum].row[r-1].end:
                 if not self.pages[pagenum].row[r-1].wrap:
@@ -226,7 +363,7 @@ class TextBuffer(object):
         # add all rows of the logical line
         for row in range(srow, self.height+1):
             therow = self.pages[pagenum].row[row-1]
-            line += bytearray(pair[0] for pair in therow.buf[scol-1:therow.end])
+            line += therow.chars[scol-1:therow.end]
             # continue so long as the line wraps
             if not therow.wrap:
                 break
@@ -253,11 +390,9 @@ class TextBuffer(object):
                 therow = self.pages[pagenum].row[row-1]
                 # exclude prompt, if any; only go from furthest_left to furthest_right
                 if row == prompt_row:
-                    rowpairs = therow.buf[:therow.end][left-1:right-1]
+                    line += therow.chars[:therow.end][left-1:right-1]
                 else:
-                    rowpairs = therow.buf[:therow.end]
-                # get characters from char/attr pairs and convert to bytearray
-                line += bytearray(pair[0] for pair in rowpairs)
+                    line += therow.chars[:therow.end]
                 if not therow.wrap:
                     break
                 # wrap before end of line means LF
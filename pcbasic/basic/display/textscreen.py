@@ -7,6 +7,7 @@ This file is released under the GNU GPL version 3 or later.
 """
 
 import logging
+import re
 
 from ..base import signals
 from ..base import error
@@ -17,6 +18,11 @@ from .text import TextBuffer, TextRow
 from .textbase import BottomBar, Cursor, ScrollArea
 
 
+# characters with a special effect in TextScreen.write
+_CONTROL_CHARS = b'\t\n\r\a\x0B\x0C\x1C\x1D\x1E\x1F'
+_CONTROL_RE = re.compile(b'([%s])' % (re.escape(_CONTROL_CHARS),))
+
+
 class TextScreen(object):
     """Text screen."""
 
@@ -85,6 +91,10 @@ class TextScreen(object):
                             mode.font_height, mode.name)
             raise error.BASICError(error.IFC)
 
+    def rebuild_glyph(self, ordval):
+        """Rebuild a text-mode character after POKE."""
+        self._glyphs.rebuild_glyph(ordval)
+
     def rebuild(self):
         """Completely resubmit the text screen to the interface."""
         # send the glyph dict to interface if necessary
@@ -108,9 +118,13 @@ class TextScreen(object):
                 self.refresh_range(pagenum, row+1, 1, self.mode.width, text_only=True)
             # redraw graphics
             if not self.mode.is_text_mode:
-                self.queues.video.put(signals.Event(signals.VIDEO_PUT_RECT, (pagenum, 0, 0,
-                                self.mode.pixel_width-1, self.mode.pixel_height-1,
-                                self.pixels.pages[pagenum].buffer)))
+                if self.pixels.shared:
+                    self.pixels.pages[pagenum].mark_dirty(
+                            0, 0, self.mode.pixel_width-1, self.mode.pixel_height-1)
+                else:
+                    self.queues.video.put(signals.Event(signals.VIDEO_PUT_RECT, (pagenum, 0, 0,
+                                    self.mode.pixel_width-1, self.mode.pixel_height-1,
+                                    self.pixels.pages[pagenum].buffer)))
 
     def __str__(self):
         """Return a string representation of the screen buffer (for debugging)."""
@@ -120,19 +134,28 @@ class TextScreen(object):
 
     def write(self, s, scroll_ok=True, do_echo=True):
         """Write a string to the screen at the current position."""
+        if isinstance(s, unicode):
+            s = self.codepage.str_from_unicode(s)
         if do_echo:
             # CR -> CRLF, CRLF -> CRLF LF
             self._io_streams.write(''.join([ ('\r\n' if c == '\r' else c) for c in s ]))
         last = ''
         # if our line wrapped at the end before, it doesn't anymore
         self.text.pages[self.apagenum].row[self.current_row-1].wrap = False
-        for c in s:
+        # runs of printable characters are written in bulk, control characters one by one
+        for run in _CONTROL_RE.split(s):
+            if not run:
+                continue
+            if run[0] not in _CONTROL_CHARS:
+                self._write_run(run)
+                last = run[-1]
+                continue
+            c = run
             row, col = self.current_row, self.current_col
             if c == '\t':
                 # TAB
                 num = (8 - (col - 1 - 8 * int((col-1) / 8)))
-                for _ in range(num):
-                    self.write_char(' ')
+                self._write_run(b' ' * num)
             elif c == '\n':
                 # LF
                 # exclude CR/LF
@@ -165,11 +188,36 @@ class TextScreen(object):
             elif c == '\x1F':
                 # DOWN
                 self.set_pos(row + 1, col, scroll_ok)
-            else:
-                # includes \b, \0, and non-control chars
-                self.write_char(c)
             last = c
 
+    def _write_run(self, s):
+        """Write a run of printable characters at the current position."""
+        while s:
+            # check if scroll& repositioning needed
+            if self.overflow:
+                self.current_col += 1
+                self.overflow = False
+            # see if we need to wrap
+            self._check_wrap(do_scroll_down=False)
+            self._check_pos(scroll_ok=True)
+            # put as many characters as fit on the current row in one go
+            row, col = self.current_row, self.current_col
+            chunk, s = s[:self.mode.width-col+1], s[self.mode.width-col+1:]
+            last_col = col + len(chunk) - 1
+            self.put_chars_attr(self.apagenum, row, col, chunk, self.attr)
+            # adjust end of line marker
+            therow = self.text.pages[self.apagenum].row[row-1]
+            if last_col > therow.end:
+                therow.end = last_col
+            # move cursor. if on col 80, only move cursor to the next row
+            # when the char is printed
+            if last_col < self.mode.width:
+                self.current_col = last_col + 1
+            else:
+                self.current_col = self.mode.width
+                self.overflow = True
+            self._check_pos(scroll_ok=True)
+
     def write_line(self, s=b'', scroll_ok=True, do_echo=True):
         """Write a string to the screen and end with a newline."""
         self.write(b'%s\r' % (s,), scroll_ok, do_echo)
@@ -347,29 +395,50 @@ class TextScreen(object):
         # update the screen
         self.refresh_range(pagenum, row, start, stop)
 
+    def put_chars_attr(self, pagenum, row, col, s, attr):
+        """Put a run of bytes on a row, redrawing as necessary."""
+        if not self.mode.is_text_mode:
+            attr = attr & 0xf
+        start, stop = self.text.put_chars_attr(pagenum, row, col, s, attr)
+        self.refresh_range(pagenum, row, start, stop)
+
     ###########################################################################
 
     def refresh_range(self, pagenum, row, start, stop, text_only=False):
         """Redraw a section of a screen row, assuming DBCS buffer has been set."""
-        therow = self.text.pages[pagenum].row[row-1]
+        draw_pixels = not self.mode.is_text_mode and not text_only
+        glyphs = []
         col = start
         while col <= stop:
-            r, c = row, col
+            c = col
             char, attr = self.text.get_fullchar_attr(pagenum, row, col)
             col += len(char)
             # ensure glyph is stored
             self._glyphs.check_char(char)
             fore, back, blink, underline = self.mode.split_attr(attr)
-            self.queues.video.put(signals.Event(signals.VIDEO_PUT_GLYPH, (
-                    pagenum, r, c, self.codepage.to_unicode(char, u'\0'),
+            glyphs.append((
+                    self.codepage.to_unicode(char, u'\0'),
                     len(char) > 1, fore, back, blink, underline,
-            )))
-            if not self.mode.is_text_mode and not text_only:
+            ))
+            if draw_pixels:
                 # update pixel buffer
-                x0, y0, x1, y1, sprite = self._glyphs.get_sprite(r, c, char, fore, back)
+                x0, y0, x1, y1, sprite = self._glyphs.get_sprite(row, c, char, fore, back)
                 self.pixels.pages[self.apagenum].put_rect(x0, y0, x1, y1, sprite, tk.PSET)
-                self.queues.video.put(signals.Event(
-                        signals.VIDEO_PUT_RECT, (self.apagenum, x0, y0, x1, y1, sprite)))
+                if not self.pixels.shared:
+                    self.queues.video.put(signals.Event(
+                            signals.VIDEO_PUT_RECT, (self.apagenum, x0, y0, x1, y1, sprite)))
+        if not glyphs:
+            return
+        # send the whole run as one event
+        if len(glyphs) == 1:
+            self.queues.video.put(signals.Event(
+                    signals.VIDEO_PUT_GLYPH, (pagenum, row, start) + glyphs[0]))
+        else:
+            self.queues.video.put(signals.Event(
+                    signals.VIDEO_PUT_TEXT, (pagenum, row, start, glyphs)))
+        if draw_pixels and self.pixels.shared:
+            x0, y0, x1, y1 = self.mode.text_to_pixel_area(row, start, row, col-1)
+            self.pixels.pages[self.apagenum].mark_dirty(x0, y0, x1, y1)
 
     def _redraw_row(self, start, row, wrap=True):
         """Draw the screen row, wrapping around and reconstructing DBCS buffer."""
@@ -421,6 +490,7 @@ class TextScreen(object):
             x0, y0, x1, y1 = self.mode.text_to_pixel_area(start, 1, stop, self.mode.width)
             # background attribute must be 0 in graphics mode
             self.pixels.pages[self.apagenum].fill_rect(x0, y0, x1, y1, 0)
+            self.pixels.pages[self.apagenum].mark_dirty(x0, y0, x1, y1)
         _, back, _, _ = self.mode.split_attr(self.attr)
         self.queues.video.put(signals.Event(signals.VIDEO_CLEAR_ROWS, (back, start, stop)))
 
@@ -475,6 +545,8 @@ class TextScreen(object):
             tx0, ty0, _, _ = self.mode.text_to_pixel_area(from_line, 1,
                 self.scroll_area.bottom-1, self.mode.width)
             self.pixels.pages[self.apagenum].move_rect(sx0, sy0, sx1, sy1, tx0, ty0)
+            self.pixels.pages[self.apagenum].mark_dirty(
+                    min(sx0, tx0), min(sy0, ty0), max(sx1, tx0+sx1-sx0), max(sy1, ty0+sy1-sy0))
 
     def scroll_down(self, from_line):
         """Scroll the scroll region down by one line, starting at from_line."""
@@ -491,6 +563,8 @@ class TextScreen(object):
             tx0, ty0, _, _ = self.mode.text_to_pixel_area(from_line+1, 1,
                 self.scroll_area.bottom, self.mode.width)
             self.pixels.pages[self.apagenum].move_rect(sx0, sy0, sx1, sy1, tx0, ty0)
+            self.pixels.pages[self.apagenum].mark_dirty(
+                    min(sx0, tx0), min(sy0, ty0), max(sx1, tx0+sx1-sx0), max(sy1, ty0+sy1-sy0))
 
     ###########################################################################
     # console operations
@@ -550,9 +624,8 @@ class TextScreen(object):
         for c in sequence:
             while True:
                 therow = self.text.pages[self.apagenum].row[row-1]
-                therow.buf.insert(col-1, (c, attr))
+                pushed = therow.insert_char_attr(col, c, attr)
                 if therow.end < self.mode.width:
-                    therow.buf.pop()
                     if therow.end > col-1:
                         therow.end += 1
                     else:
@@ -565,7 +638,7 @@ class TextScreen(object):
                     if not therow.wrap and row < self.mode.height:
                         self.scroll_down(row+1)
                         therow.wrap = True
-                    c, attr = therow.buf.pop()
+                    c, attr = pushed
                     row += 1
                     col = 1
             col += 1
@@ -94,6 +94,157 @@ class NullQueue(object):
         pass
 
 
+# mergeable video events and their merge slot
+# glyph events only affect text buffers and are ignored in graphics mode;
+# pixel events only affect graphics. So the two can be merged independently.
+_TEXT, _GRAPHICS = 0, 1
+_MERGE_SLOTS = {
+    signals.VIDEO_PUT_GLYPH: _TEXT,
+    signals.VIDEO_PUT_TEXT: _TEXT,
+    signals.VIDEO_PUT_PIXEL: _GRAPHICS,
+    signals.VIDEO_PUT_INTERVAL: _GRAPHICS,
+    signals.VIDEO_FILL_INTERVAL: _GRAPHICS,
+}
+
+
+class VideoQueue(object):
+    """Video queue wrapper that merges adjacent drawing events before they are queued."""
+
+    def __init__(self, queue):
+        """Wrap a video queue."""
+        self._queue = queue
+        # events being built up from merged events, as lists [event_type, params...]
+        self._pending = [None, None]
+        # time the oldest pending event was started
+        self._pending_since = None
+        # counters
+        self.events_received = 0
+        self.events_merged = 0
+
+    def put(self, signal, block=True, timeout=None):
+        """Put an event on the queue, merging it with the previous one if possible."""
+        self.events_received += 1
+        slot = _MERGE_SLOTS.get(signal.event_type)
+        if slot is None:
+            self.flush()
+            self._queue.put(signal, block, timeout)
+            return
+        pending = self._pending[slot]
+        if pending and self._merge(pending, signal):
+            self.events_merged += 1
+            return
+        if pending:
+            self._queue.put(signals.Event(pending[0], tuple(pending[1:])))
+        self._pending[slot] = [signal.event_type] + list(signal.params)
+        if self._pending_since is None:
+            self._pending_since = time.time()
+
+    def put_nowait(self, signal):
+        """Put an event on the queue without blocking."""
+        self.put(signal, False)
+
+    def _merge(self, pending, signal):
+        """Try to merge an event into a pending event."""
+        params = signal.params
+        if signal.event_type in (signals.VIDEO_PUT_GLYPH, signals.VIDEO_PUT_TEXT):
+            # glyphs directly to the right of the previous ones on the same row
+            if pending[0] == signals.VIDEO_PUT_GLYPH:
+                glyphs = [tuple(pending[4:])]
+            else:
+                glyphs = pending[4]
+            next_col = pending[3] + sum(2 if glyph[1] else 1 for glyph in glyphs)
+            last_col = next_col - (2 if glyphs[-1][1] else 1)
+            if signal.event_type == signals.VIDEO_PUT_GLYPH:
+                new_glyphs = [tuple(params[3:])]
+                if params[:3] == (pending[1], pending[2], last_col) and params[3:] == glyphs[-1]:
+                    # repeat of the last glyph, e.g. when drawing pixels clears a text cell
+                    return True
+            else:
+                new_glyphs = params[3]
+            if params[:3] != (pending[1], pending[2], next_col):
+                return False
+            glyphs.extend(new_glyphs)
+            pending[:] = [signals.VIDEO_PUT_TEXT] + pending[1:4] + [glyphs]
+            return True
+        elif signal.event_type in (signals.VIDEO_PUT_PIXEL, signals.VIDEO_PUT_INTERVAL):
+            # pixels directly to the right of the previous ones on the same scanline
+            if pending[0] == signals.VIDEO_PUT_PIXEL:
+                colours = [pending[4]]
+            elif pending[0] == signals.VIDEO_PUT_INTERVAL:
+                # intervals may be views of the pixel buffer, so take a copy
+                colours = pending[4] if isinstance(pending[4], list) else list(pending[4])
+            else:
+                return False
+            pagenum, x, y = params[:3]
+            if (pagenum, x, y) != (pending[1], pending[2] + len(colours), pending[3]):
+                return False
+            if signal.event_type == signals.VIDEO_PUT_PIXEL:
+                colours.append(params[3])
+            else:
+                colours.extend(params[3])
+            pending[:] = [signals.VIDEO_PUT_INTERVAL] + pending[1:4] + [colours]
+            return True
+        elif signal.event_type == signals.VIDEO_FILL_INTERVAL:
+            pagenum, x0, x1, y, index = params
+            if pending[0] == signals.VIDEO_FILL_INTERVAL:
+                _, p_pagenum, p_x0, p_x1, p_y, p_index = pending
+                if (pagenum, y, index, x0) == (p_pagenum, p_y, p_index, p_x1+1):
+                    # solid interval directly to the right of the previous one
+                    pending[3] = x1
+                    return True
+                if (pagenum, x0, x1, index, y) == (p_pagenum, p_x0, p_x1, p_index, p_y+1):
+                    # solid interval of the same extent directly below the previous one
+                    pending[:] = [signals.VIDEO_FILL_RECT, pagenum, x0, p_y, x1, y, index]
+                    return True
+            elif pending[0] == signals.VIDEO_FILL_RECT:
+                _, p_pagenum, p_x0, _, p_x1, p_y1, p_index = pending
+                if (pagenum, x0, x1, index, y) == (p_pagenum, p_x0, p_x1, p_index, p_y1+1):
+                    pending[5] = y
+                    return True
+        return False
+
+    def flush(self):
+        """Pass on the pending merged events."""
+        for slot, pending in enumerate(self._pending):
+            if pending:
+                self._queue.put(signals.Event(pending[0], tuple(pending[1:])))
+                self._pending[slot] = None
+        self._pending_since = None
+
+    def flush_if_due(self, tick):
+        """Pass on the pending merged events if they have been waiting for at least a tick."""
+        if self._pending_since is not None and time.time() - self._pending_since >= tick:
+            self.flush()
+
+    def get_stats(self):
+        """Return event merging statistics."""
+        return {
+            'video_events': self.events_received,
+            'video_events_merged': self.events_merged,
+        }
+
+    # pass-through to the wrapped queue
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def empty(self):
+        return self._pending_since is None and self._queue.empty()
+
+    def full(self):
+        return self._queue.full()
+
+    def get(self, block=True, timeout=None):
+        return self._queue.get(block, timeout)
+
+    def task_done(self):
+        self._queue.task_done()
+
+    def join(self):
+        self.flush()
+        self._queue.join()
+
+
 class EventQueues(object):
     """Manage interface queues."""
 
@@ -117,7 +268,8 @@ class EventQueues(object):
     def set(self, inputs=None, video=None, audio=None):
         """Set; default is NullQueues."""
         self.inputs = inputs or NullQueue()
-        self.video = video or NullQueue()
+        # merge drawing events going to a real interface
+        self.video = VideoQueue(video) if video else NullQueue()
         self.audio = audio or NullQueue()
 
     def __getstate__(self):
@@ -139,15 +291,30 @@ class EventQueues(object):
 
     def wait(self):
         """Wait and check events."""
+        self.flush_video()
         time.sleep(self.tick)
         self.check_events()
 
+    def flush_video(self):
+        """Pass any merged video events on to the interface."""
+        if isinstance(self.video, VideoQueue):
+            self.video.flush()
+
+    def get_stats(self):
+        """Return video event statistics."""
+        if isinstance(self.video, VideoQueue):
+            return self.video.get_stats()
+        return {'video_events': 0, 'video_events_merged': 0}
+
     def check_events(self, event_check_input=()):
         """Main event cycle."""
         # check input first to avoid hang if the interface plugin has crashed
         # and we have put a lot of work on the queue
         # this works because Interface will send KEYB_QUIT on termination
         self._check_input(event_check_input)
+        # merged video events go out once per tick
+        if isinstance(self.video, VideoQueue):
+            self.video.flush_if_due(self.tick)
         # avoid screen lockups if video queue fills up
         if self.video.qsize() > self.max_video_qsize:
             # note that this really slows down screen writing
@@ -48,7 +48,7 @@ class Implementation(object):
     """Interpreter session, implementation class."""
 
     def __init__(self,
-            syntax=u'advanced', double=False, term=u'', shell=u'',
+            syntax=u'advanced', double=False, fast_float=False, term=u'', shell=u'',
             output_streams=sys.stdout, input_streams=sys.stdin,
             codepage=None, box_protect=True, font=None, text_width=80,
             video=u'cga', monitor=u'rgb', aspect_ratio=(4, 3), low_intensity=False,
@@ -56,8 +56,8 @@ class Implementation(object):
             keys=u'', check_keybuffer_full=True, ctrl_c_is_break=True,
             hide_listing=None, hide_protected=False,
             peek_values=None, allow_code_poke=False, rebuild_offsets=True,
-            max_memory=65534, reserved_memory=3429, video_memory=262144,
-            serial_buffer_size=128, max_reclen=128, max_files=3,
+            max_memory=65534, reserved_memory=3429, video_memory=262144, shared_pixels=False,
+            serial_buffer_size=128, max_reclen=128, max_files=3, string_gc_budget=0,
             extension=None, greeting=True,
             ):
         """Initialise the interpreter session."""
@@ -82,7 +82,8 @@ class Implementation(object):
         # set up variables and memory model state
         # initialise the data segment
         self.memory = memory.DataSegment(
-                    max_memory, reserved_memory, max_reclen, max_files, double)
+                    max_memory, reserved_memory, max_reclen, max_files, double, fast_float,
+                    string_gc_budget)
         # values and variables
         self.strings = self.memory.strings
         self.values = self.memory.values
@@ -120,7 +121,7 @@ class Implementation(object):
                 self.memory, text_width, video_memory, video, monitor,
                 self.sound, self.io_streams,
                 low_intensity, aspect_ratio,
-                self.codepage, font)
+                self.codepage, font, shared_pixels)
         self.screen = self.display.text_screen
         self.drawing = self.display.drawing
         # initilise floating-point error message stream
@@ -53,6 +53,8 @@ class Interpreter(object):
         self.set_parse_mode(False)
         # additional operations on program step (debugging)
         self.step = lambda token: None
+        # number of statements executed in this session
+        self.statement_count = 0
 
     def __getstate__(self):
         """Pickle."""
@@ -106,6 +108,10 @@ class Interpreter(object):
                 elif c not in (b':', tk.THEN, tk.ELSE, tk.GOTO):
                     # new statement or branch of an IF statement allowed, nothing else
                     raise error.BASICError(error.STX)
+                self.statement_count += 1
+                # collect garbage between statements, where no unreferenced strings are in use
+                if self._memory.strings.gc_step_pending:
+                    self._memory.collect_garbage_step()
                 self.parser.parse_statement(ins)
             except error.BASICError as e:
                 self.trap_error(e)
@@ -126,6 +132,8 @@ class Interpreter(object):
         self.set_pointer(False, 0)
         # return control to user
         self.set_parse_mode(False)
+        # show everything that was drawn
+        self._queues.flush_video()
 
     def set_parse_mode(self, on):
         """Enter or exit parse mode."""
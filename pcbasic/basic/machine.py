@@ -8,6 +8,7 @@ This file is released under the GNU GPL version 3 or later.
 
 import struct
 import logging
+import bisect
 
 from ..metadata import NAME, VERSION, COPYRIGHT
 from .base import error
@@ -239,6 +240,22 @@ class MachinePorts(object):
 ###############################################################################
 # Memory
 
+def _per_byte_reader(get_byte):
+    """Make a block reader out of a single-byte reader."""
+    def get_block(addr, length):
+        """Retrieve a contiguous block of bytes, reading each byte separately."""
+        return bytearray(max(0, get_byte(a)) for a in xrange(addr, addr+length))
+    return get_block
+
+def _per_byte_writer(set_byte):
+    """Make a block writer out of a single-byte writer."""
+    def set_block(addr, buf):
+        """Set a contiguous block of bytes, writing each byte separately."""
+        for a, value in enumerate(buf, addr):
+            set_byte(a, value)
+    return set_block
+
+
 class Memory(object):
     """Memory model."""
 
@@ -281,6 +298,19 @@ class Memory(object):
         self._peek_values = peek_values
         # tandy syntax
         self._syntax = syntax
+        self._build_regions()
+
+    def __getstate__(self):
+        """Pickle the memory model."""
+        pickle_dict = self.__dict__.copy()
+        # closures and bound methods can't be pickled
+        del pickle_dict['_regions']
+        return pickle_dict
+
+    def __setstate__(self, pickle_dict):
+        """Unpickle the memory model."""
+        self.__dict__.update(pickle_dict)
+        self._build_regions()
 
     def peek_(self, args):
         """PEEK: Retrieve the value at an emulated memory location."""
@@ -376,68 +406,84 @@ class Memory(object):
     ###########################################################################
     # IMPLEMENTATION
 
+    def _build_regions(self):
+        """Build the address-range dispatch table."""
+        # each region is (start address, block reader, block writer), sorted by start address
+        # the last region extends to the end of the address space
+        self._regions = [
+            (0, _per_byte_reader(self._get_low_memory),
+                _per_byte_writer(self._set_low_memory)),
+            (self._memory.data_segment*0x10, self._get_data_memory_block,
+                self._set_data_memory_block),
+            (self.video_segment*0x10, self._get_video_memory_block,
+                self._set_video_memory_block),
+            (self.ram_font_segment*0x10, _per_byte_reader(self._get_font_memory),
+                self._set_font_memory_block),
+            # ROM includes font memory; writes are ignored
+            (self.rom_segment*0x10, _per_byte_reader(self._get_rom_memory),
+                lambda addr, buf: None),
+        ]
+        self._region_starts = [_region[0] for _region in self._regions]
+
+    def _split_regions(self, addr, length):
+        """Split an address range into (region, start, length) runs."""
+        end = addr + length
+        if addr < 0:
+            addr = 0
+        index = bisect.bisect_right(self._region_starts, addr) - 1
+        while addr < end:
+            if index + 1 < len(self._regions):
+                run_end = min(end, self._region_starts[index+1])
+            else:
+                run_end = end
+            yield self._regions[index], addr, run_end - addr
+            addr = run_end
+            index += 1
+
     def _get_memory(self, addr):
         """Retrieve the value at an emulated memory location."""
         try:
             # try if there's a preset value
             return self._peek_values[addr]
-        except KeyError:
-            if addr >= self.rom_segment*0x10:
-                # ROM font
-                return max(0, self._get_rom_memory(addr))
-            elif addr >= self.ram_font_segment*0x10:
-                # RAM font
-                return max(0, self._get_font_memory(addr))
-            elif addr >= self.video_segment*0x10:
-                # graphics and text memory
-                return max(0, self._get_video_memory(addr))
-            elif addr >= self._memory.data_segment*0x10:
-                return max(0, self._memory.get_memory(addr))
-            elif addr >= 0:
-                return max(0, self._get_low_memory(addr))
-            else:
+        except (KeyError, TypeError):
+            if addr < 0:
                 return 0
+            region = self._regions[bisect.bisect_right(self._region_starts, addr) - 1]
+            return region[1](addr, 1)[0]
 
     def _set_memory(self, addr, val):
         """Set the value at an emulated memory location."""
-        if addr >= self.rom_segment*0x10:
-            # ROM includes font memory
-            pass
-        elif addr >= self.ram_font_segment*0x10:
-            # RAM font memory
-            self._set_font_memory(addr, val)
-        elif addr >= self.video_segment*0x10:
-            # graphics and text memory
-            self._set_video_memory(addr, val)
-        elif addr >= self._memory.data_segment*0x10:
-            self._memory.set_memory(addr, val)
-        elif addr >= 0:
-            self._set_low_memory(addr, val)
+        if addr >= 0:
+            region = self._regions[bisect.bisect_right(self._region_starts, addr) - 1]
+            region[2](addr, (val,))
 
     def _get_memory_block(self, addr, length):
         """Retrieve a contiguous block of bytes from memory."""
-        block = bytearray()
-        if addr >= self.video_segment*0x10:
-            video_len = 0x20000 - (addr - self.video_segment*0x10)
-            # graphics and text memory - specialised call
-            block += self._get_video_memory_block(addr, min(length, video_len))
-            addr += video_len
-            length -= video_len
-        for a in range(addr, addr+length):
-            block += chr(max(0, self._get_memory(a)))
+        block = bytearray(min(length, -addr)) if addr < 0 else bytearray()
+        for region, start, run_length in self._split_regions(addr, length):
+            block += region[1](start, run_length)
+        if self._peek_values:
+            # preset values override the emulated memory
+            for a, value in self._peek_values.iteritems():
+                if addr <= a < addr + length:
+                    block[a-addr] = value
         return block
 
     def _set_memory_block(self, addr, buf):
         """Set a contiguous block of bytes in memory."""
-        if addr >= self.video_segment*0x10:
-            video_len = 0x20000 - (addr - self.video_segment*0x10)
-            # graphics and text memory - specialised call
-            self._set_video_memory_block(addr, buf[:video_len])
-            addr += video_len
-            buf = buf[video_len:]
-        for a in range(len(buf)):
-            self._set_memory(addr + a, buf[a])
+        if addr < 0:
+            buf = buf[-addr:]
+            addr = 0
+        for region, start, run_length in self._split_regions(addr, len(buf)):
+            region[2](start, buf[start-addr:start-addr+run_length])
 
+    def _get_data_memory_block(self, addr, length):
+        """Retrieve a contiguous block of bytes from the data segment."""
+        return self._memory.get_memory_block(addr, length)
+
+    def _set_data_memory_block(self, addr, buf):
+        """Set a contiguous block of bytes in the data segment."""
+        self._memory.set_memory_block(addr, buf)
 
     ###############################################################
     # video memory model
@@ -506,13 +552,21 @@ class Memory(object):
         return self.font_8.get_byte(char, addr%8)
 
     def _set_font_memory(self, addr, value):
-        """Retrieve RAM font data."""
+        """Set RAM font data."""
+        self._set_font_memory_block(addr, (value,))
+
+    def _set_font_memory_block(self, addr, buf):
+        """Set a contiguous block of RAM font data."""
         addr -= self.ram_font_segment*0x10 + self.ram_font_addr
-        char = addr // 8 + 128
-        if char < 128 or char > 254:
-            return
-        self.font_8.set_byte(char, addr%8, value)
-        self.screen.rebuild_glyph(char)
+        changed = set()
+        for offset, value in enumerate(buf, addr):
+            char = offset // 8 + 128
+            if 128 <= char <= 254:
+                self.font_8.set_byte(char, offset%8, value)
+                changed.add(char)
+        # rebuild each affected glyph only once
+        for char in sorted(changed):
+            self.screen.rebuild_glyph(char)
 
     #################################################################################
 
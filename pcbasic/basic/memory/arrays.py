@@ -7,6 +7,12 @@ This file is released under the GNU GPL version 3 or later.
 """
 
 import struct
+from bisect import bisect_right
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from ..base import error
 from .. import values
@@ -23,6 +29,17 @@ class Arrays(object):
         # OPTION BASE is unset
         self._base = None
 
+    def __getstate__(self):
+        """Pickle."""
+        pickle_dict = self.__dict__.copy()
+        # offset functions can't be pickled; they are rebuilt on access
+        pickle_dict['_offsets'] = {}
+        return pickle_dict
+
+    def __setstate__(self, pickle_dict):
+        """Unpickle."""
+        self.__dict__.update(pickle_dict)
+
     def __contains__(self, varname):
         """Check if a scalar has been defined."""
         return varname in self._dims
@@ -33,16 +50,28 @@ class Arrays(object):
 
     def __str__(self):
         """Debugging representation of variable dictionary."""
-        return '\n'.join('%s%s: %s' % (n, v, str(self._buffers[n]).encode('hex')) for n, v in self._dims.iteritems())
+        return '\n'.join(
+            '%s%s: %s' % (n, v, memoryview(self._buffers[n]).tobytes().encode('hex'))
+            for n, v in self._dims.iteritems())
 
     def clear(self):
         """Clear arrays."""
         self._dims = {}
         self._buffers = {}
         self._cache = {}
+        # byte offset functions, built on first access
+        self._offsets = {}
         self._array_memory = {}
+        self._build_index()
         self.current = 0
 
+    def _build_index(self):
+        """Build the address index: names in order of address, with their record and data pointers."""
+        order = sorted(self._array_memory, key=self._array_memory.get)
+        self._names = order
+        self._name_ptrs = [self._array_memory[name][0] for name in order]
+        self._array_ptrs = [self._array_memory[name][1] for name in order]
+
     def erase_(self, args):
         """Remove an array from memory."""
         for name in args:
@@ -58,12 +87,14 @@ class Arrays(object):
             del self._dims[name]
             del self._buffers[name]
             del self._cache[name]
+            self._offsets.pop(name, None)
             del self._array_memory[name]
             # update memory model
             for name in self._array_memory:
                 name_ptr, array_ptr = self._array_memory[name]
                 if name_ptr > erased_name_ptr:
                     self._array_memory[name] = name_ptr - freed_bytes, array_ptr - freed_bytes
+            self._build_index()
             self.current -= freed_bytes
 
     def index(self, index, dimensions):
@@ -147,29 +178,87 @@ class Arrays(object):
         self._memory.check_free(total_bytes, error.OUT_OF_MEMORY)
         self.current += total_bytes
         self._array_memory[name] = (name_ptr, array_ptr)
-        self._buffers[name] = bytearray(array_bytes)
+        # new arrays are always allocated at the end, so the index stays sorted
+        self._names.append(name)
+        self._name_ptrs.append(name_ptr)
+        self._array_ptrs.append(array_ptr)
+        self._buffers[name] = _new_buffer(name, array_bytes)
         self._dims[name] = dimensions
         self._cache[name] = None
+        self._offsets.pop(name, None)
 
     def check_dim(self, name, index):
         """Check if an array has been allocated. If not, auto-allocate if indices are <= 10; raise error otherwise."""
+        self._get_offset(name)(index)
+        return self._dims[name], self._buffers[name]
+
+    def _get_offset(self, name):
+        """Retrieve the byte offset function for an array, auto-allocating if necessary."""
         try:
-            dimensions = self._dims[name]
+            return self._offsets[name]
         except KeyError:
+            pass
+        if name not in self._dims:
+            # the offset function auto-allocates on its first call
+            return self._auto_dim(name)
+        self._offsets[name] = offset = self._build_offset(name)
+        return offset
+
+    def _auto_dim(self, name):
+        """Return an offset function that auto-dimensions the array first."""
+        def offset(index):
             # auto-dimension - 0..10 or 1..10
             # this even fixes the dimensions if the index turns out to be out of range
-            dimensions = [10] * len(index)
-            self.allocate(name, dimensions)
-        lst = self._buffers[name]
-        if len(index) != len(dimensions):
-            raise error.BASICError(error.SUBSCRIPT_OUT_OF_RANGE)
-        for i, d in zip(index, dimensions):
-            if i < 0:
-                raise error.BASICError(error.IFC)
-            elif i < self._base or i > d:
-                # dimensions is the *maximum index number*, regardless of self._base
-                raise error.BASICError(error.SUBSCRIPT_OUT_OF_RANGE)
-        return dimensions, lst
+            self.allocate(name, [10] * len(index))
+            return self._get_offset(name)(index)
+        return offset
+
+    def _build_offset(self, name):
+        """Build a function to convert an index to a byte offset, checking bounds."""
+        dimensions = self._dims[name]
+        base = self._base
+        size = values.size_bytes(name)
+        # strides in bytes; the first index runs fastest
+        strides = []
+        stride = size
+        for d in dimensions:
+            strides.append(stride)
+            stride *= d + 1 - base
+        if len(dimensions) == 1:
+            max0, = dimensions
+            def offset(index):
+                try:
+                    i, = index
+                except ValueError:
+                    raise error.BASICError(error.SUBSCRIPT_OUT_OF_RANGE)
+                if base <= i <= max0:
+                    return (i - base) * size
+                _raise_index_error(i)
+        elif len(dimensions) == 2:
+            max0, max1 = dimensions
+            stride1 = strides[1]
+            def offset(index):
+                try:
+                    i, j = index
+                except ValueError:
+                    raise error.BASICError(error.SUBSCRIPT_OUT_OF_RANGE)
+                if not base <= i <= max0:
+                    _raise_index_error(i)
+                if not base <= j <= max1:
+                    _raise_index_error(j)
+                return (i - base) * size + (j - base) * stride1
+        else:
+            bounds = zip(dimensions, strides)
+            def offset(index):
+                if len(index) != len(bounds):
+                    raise error.BASICError(error.SUBSCRIPT_OUT_OF_RANGE)
+                total = 0
+                for i, (max_i, stride_i) in zip(index, bounds):
+                    if not base <= i <= max_i:
+                        _raise_index_error(i)
+                    total += (i - base) * stride_i
+                return total
+        return offset
 
     def clear_base(self):
         """Unset the array base."""
@@ -183,13 +272,13 @@ class Arrays(object):
             # duplicate definition
             raise error.BASICError(error.DUPLICATE_DEFINITION)
         self._base = base
+        # offsets depend on the base
+        self._offsets.clear()
 
     def view_buffer(self, name, index):
         """Return a memoryview to an array element."""
-        dimensions, lst = self.check_dim(name, index)
-        bigindex = self.index(index, dimensions)
-        bytesize = values.size_bytes(name)
-        return memoryview(lst)[bigindex*bytesize:(bigindex+1)*bytesize]
+        offset = self._get_offset(name)(index)
+        return memoryview(self._buffers[name])[offset:offset+values.size_bytes(name)]
 
     def get(self, name, index):
         """Retrieve a view of the value of an array element."""
@@ -202,7 +291,9 @@ class Arrays(object):
         if isinstance(value, values.String):
             self._memory.strings.fix_temporaries()
         # copy value into array
-        self.view_buffer(name, index)[:] = values.to_type(name[-1], value).to_bytes()
+        offset = self._get_offset(name)(index)
+        memoryview(self._buffers[name])[offset:offset+values.size_bytes(name)] = (
+                values.to_type(name[-1], value).to_bytes())
         # drop cache
         self._cache[name] = None
 
@@ -215,38 +306,29 @@ class Arrays(object):
 
     def dereference(self, address):
         """Get a value for an array given its pointer address."""
-        found_addr = -1
-        found_name = None
-        for name, data in self._array_memory.iteritems():
-            addr = self._memory.var_current() + data[1]
-            if addr > found_addr and addr <= address:
-                found_addr = addr
-                found_name = name
-        if not found_name:
+        # pointers in the index are relative to the start of array space
+        index = bisect_right(self._array_ptrs, address - self._memory.var_current()) - 1
+        if index < 0:
             return None
-        lst = self._buffers[name]
-        offset = address - found_addr
-        return self._values.from_bytes(lst[offset : offset+values.size_bytes(name)])
+        name = self._names[index]
+        offset = address - self._memory.var_current() - self._array_ptrs[index]
+        lst = memoryview(self._buffers[name])
+        return self._values.from_bytes(lst[offset : offset+values.size_bytes(name)].tobytes())
 
     def get_memory(self, address):
         """Retrieve data from data memory: array space """
-        name_addr = -1
-        arr_addr = -1
-        the_arr = None
-        for name in self._array_memory:
-            name_try, arr_try = self._array_memory[name]
-            if name_try <= address and name_try > name_addr:
-                name_addr, arr_addr = name_try, arr_try
-                the_arr = name
-        if the_arr is None:
-            return -1
         var_current = self._memory.var_current()
+        index = bisect_right(self._name_ptrs, address - var_current) - 1
+        if index < 0:
+            return -1
+        the_arr = self._names[index]
+        name_addr, arr_addr = self._name_ptrs[index], self._array_ptrs[index]
         if address >= var_current + arr_addr:
             offset = address - arr_addr - var_current
             if offset >= self.array_size_bytes(the_arr):
                 return -1
             byte_array = self._buffers[the_arr]
-            return byte_array[offset]
+            return int(byte_array[offset])
         else:
             offset = address - name_addr - var_current
             if offset < max(3, len(the_arr))+1:
@@ -254,11 +336,55 @@ class Arrays(object):
             else:
                 offset -= max(3, len(the_arr))+1
                 dimensions = self._dims[the_arr]
-                data_rep = struct.pack('<HB', self.array_size_bytes(the_arr) + 1 + 2*len(dimensions), len(dimensions))
+                data_rep = bytearray(struct.pack(
+                    '<HB', self.array_size_bytes(the_arr) + 1 + 2*len(dimensions), len(dimensions)))
                 for d in dimensions:
                     data_rep += struct.pack('<H', d + 1 - self._base)
                 return data_rep[offset]
 
+    def set_memory(self, address, value):
+        """Change data in data memory: array space """
+        self.set_memory_block(address, (value,))
+
+    def _find_blocks(self, address, length):
+        """Split a range of array space into (name, start, stop, data offset) for each array record."""
+        var_current = self._memory.var_current()
+        end = address + length
+        index = max(0, bisect_right(self._name_ptrs, address - var_current) - 1)
+        for name, array_ptr in zip(self._names[index:], self._array_ptrs[index:]):
+            if address >= end:
+                break
+            data_start = var_current + array_ptr
+            stop = min(end, data_start + self.array_size_bytes(name))
+            if address < stop:
+                yield name, address, stop, data_start
+                address = stop
+
+    def get_memory_block(self, address, length):
+        """Retrieve a block of data memory from array space."""
+        block = bytearray()
+        for name, start, stop, data_start in self._find_blocks(address, length):
+            data_from = min(stop, max(start, data_start))
+            block.extend(max(0, self.get_memory(addr)) for addr in xrange(start, data_from))
+            if data_from < stop:
+                block += memoryview(self._buffers[name])[data_from-data_start:stop-data_start].tobytes()
+        # beyond the last array
+        block.extend(bytearray(length - len(block)))
+        return block
+
+    def set_memory_block(self, address, buf):
+        """Change a block of data in data memory: array space """
+        for name, start, stop, data_start in self._find_blocks(address, len(buf)):
+            # array headers can't be changed
+            # string pointers can't be changed either, they must point to a stored string
+            start = max(start, data_start)
+            if name[-1] == values.STR or start >= stop:
+                continue
+            memoryview(self._buffers[name])[start-data_start:stop-data_start] = (
+                    bytearray(buf[start-address:stop-address]))
+            # drop sprite cache
+            self._cache[name] = None
+
     def get_strings(self):
         """Return a list of views of string array elements."""
         return [memoryview(buf)[i:i+3]
@@ -270,10 +396,67 @@ class Arrays(object):
     ###########################################################################
     # helper functions for Python interface
 
+    def view_full_array(self, name):
+        """Return a numpy uint8 view of a full array in its memory layout, or None if numpy is not available."""
+        if numpy is None:
+            return None
+        buf = self._buffers[name]
+        if isinstance(buf, numpy.ndarray):
+            # numeric arrays are stored in numpy arrays
+            return buf
+        return numpy.frombuffer(buf, numpy.uint8)
+
+    def _decode_array(self, name):
+        """Decode a numeric array with numpy, in index order (first index runs fastest)."""
+        raw = self.view_full_array(name)
+        sigil = name[-1]
+        if sigil == values.INT:
+            decoded = raw.view('<i2').astype(numpy.int64)
+        else:
+            cls = values.Single if sigil == values.SNG else values.Double
+            records = raw.reshape(-1, cls.size).astype(numpy.uint64)
+            exp_byte = records[:, -1].astype(numpy.int64)
+            man = numpy.zeros(len(records), numpy.uint64)
+            for i in range(cls.size-1):
+                man |= records[:, i] << numpy.uint64(8*i)
+            neg = (man & numpy.uint64(cls._signmask)) != 0
+            # the sign bit takes the place of the assumed leading bit
+            man |= numpy.uint64(cls._signmask)
+            decoded = numpy.ldexp(man.astype(numpy.float64), exp_byte - cls._bias)
+            decoded[neg] *= -1.
+            decoded[exp_byte == 0] = 0.
+        shape = [d + 1 - self._base for d in self._dims[name]]
+        return decoded.reshape(shape, order='F')
+
     def from_list(self, python_list, name):
         """Convert Python list to BASIC array."""
+        if numpy is not None and name[-1] == values.INT and self._from_list_numpy(python_list, name):
+            return
         self._from_list(python_list, name, [])
 
+    def _from_list_numpy(self, python_list, name):
+        """Convert a rectangular Python list of ints to an Integer array in one go. Return False if not possible."""
+        if not python_list:
+            return True
+        data = numpy.array(python_list)
+        # ragged lists give object arrays; floats and other types need element-wise conversion
+        if data.dtype.kind not in 'iu' or data.size == 0:
+            return False
+        base = (self._base or 0)
+        try:
+            # allocates if needed and checks that the top corner fits
+            self.check_dim(name, [base + n - 1 for n in data.shape])
+        except error.BASICError:
+            return False
+        if data.min() < -0x8000 or data.max() > 0x7fff:
+            return False
+        target = self.view_full_array(name).view('<i2').reshape(
+            [d + 1 - self._base for d in self._dims[name]], order='F')
+        target[tuple(slice(0, n) for n in data.shape)] = data
+        # drop cache
+        self._cache[name] = None
+        return True
+
     def _from_list(self, python_list, name, index):
         """Convert Python list to BASIC array."""
         if not python_list:
@@ -289,6 +472,9 @@ class Arrays(object):
         """Convert BASIC array to Python list."""
         if name in self._dims:
             indices = self._dims[name]
+            if numpy is not None and name[-1] != values.STR:
+                # as the element-wise conversion, take indices[i] elements along each axis
+                return self._decode_array(name)[tuple(slice(0, d) for d in indices)].tolist()
             return self._to_list(name, [], indices)
         else:
             return []
@@ -301,3 +487,19 @@ class Arrays(object):
             return [self.get(name, index+[i+(self._base or 0)]).to_value() for i in xrange(remaining_dimensions[0])]
         else:
             return [self._to_list(name, index+[i+(self._base or 0)], remaining_dimensions[1:]) for i in xrange(remaining_dimensions[0])]
+
+
+def _new_buffer(name, size):
+    """Create zeroed storage for an array; numeric arrays are held in numpy arrays if available."""
+    # both types expose their bytes in GW-BASIC memory layout through memoryview
+    if numpy is not None and name[-1] != values.STR:
+        return numpy.zeros(size, numpy.uint8)
+    return bytearray(size)
+
+
+def _raise_index_error(i):
+    """Raise the error for an out-of-range array index."""
+    if i < 0:
+        raise error.BASICError(error.IFC)
+    # dimensions is the *maximum index number*, regardless of base
+    raise error.BASICError(error.SUBSCRIPT_OUT_OF_RANGE)
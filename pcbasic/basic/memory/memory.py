@@ -41,6 +41,10 @@ from . import arrays
 # 65534                 total size (determined by CLEAR)
 
 
+# size of the data segment
+SEGMENT_SIZE = 0x10000
+
+
 ############################################################################
 # FIELD buffers
 
@@ -84,7 +88,9 @@ class DataSegment(object):
     # protection flag
     protection_flag_addr = 1450
 
-    def __init__(self, total_memory, reserved_memory, max_reclen, max_files, double):
+    def __init__(
+            self, total_memory, reserved_memory, max_reclen, max_files, double,
+            fast_float=False, string_gc_budget=0):
         """Initialise memory."""
         # BASIC stack (determined by CLEAR)
         # Initially, the stack space should be set to 512 bytes,
@@ -109,10 +115,12 @@ class DataSegment(object):
         self.max_files = max_files
         self.max_reclen = max_reclen
         self.fields = {}
+        # backing store for variables: scalars and strings live in the data segment at their address
+        self.segment = bytearray(SEGMENT_SIZE)
         # string space
-        self.strings = values.StringSpace(self)
+        self.strings = values.StringSpace(self, string_gc_budget, self.segment)
         # prepare string and number handler
-        self.values = values.Values(self.strings, double)
+        self.values = values.Values(self.strings, double, fast_float=fast_float)
         # scalar space
         self.scalars = scalars.Scalars(self, self.values)
         # array space
@@ -198,8 +206,9 @@ class DataSegment(object):
             preserve_sc, preserve_ar = set(), set()
         string_store = values.StringSpace(self)
         # preserve scalars
+        # take copies, as the variables' storage will be reused
         common_scalars = {
-                name: self.scalars.get(name)
+                name: self.scalars.get(name).clone()
                 for name in preserve_sc if name in self.scalars}
         for name, value in common_scalars.iteritems():
             if name[-1] == values.STR:
@@ -241,19 +250,31 @@ class DataSegment(object):
         """Return the amount of memory available to variables, arrays, strings and code."""
         return self.strings.current - self.var_current() - self.arrays.current
 
+    def _get_string_ptrs(self):
+        """Find the pointers to all strings that are actually referenced."""
+        stack_strings = [value.view() for stack in self._stack for value in stack if isinstance(value, values.String)]
+        return self.scalars.get_strings() + self.arrays.get_strings() + stack_strings
+
     def _collect_garbage(self):
         """Collect garbage from string space. Compactify string storage."""
-        # find all strings that are actually referenced
-        stack_strings = [value.view() for stack in self._stack for value in stack if isinstance(value, values.String)]
-        string_ptrs = self.scalars.get_strings() + self.arrays.get_strings() + stack_strings
-        self.strings.collect_garbage(string_ptrs)
+        self.strings.collect_garbage(self._get_string_ptrs())
 
     def check_free(self, size, err):
         """Check if sufficient free memory is avilable, raise error if not."""
-        if self._get_free() <= size:
+        free = self._get_free()
+        if free <= size:
+            # compact fully, completing any incremental collection, before giving up
             self._collect_garbage()
             if self._get_free() <= size:
                 raise error.BASICError(err)
+        elif self.strings.gc_step_due(size, free - size):
+            # with a pause budget, collect incrementally while there is still room
+            # strings held by a statement in progress may not be referenced yet, so wait until it ends
+            self.strings.gc_step_pending = True
+
+    def collect_garbage_step(self):
+        """Take an incremental garbage collection step; return True if the collection is complete."""
+        return self.strings.collect_garbage_step(self._get_string_ptrs())
 
     def var_start(self):
         """Start of variable data."""
@@ -304,7 +325,7 @@ class DataSegment(object):
         addr -= self.data_segment*0x10
         if addr >= self.var_start():
             # POKING in variables
-            self._not_implemented_pass(addr, val)
+            self._set_var_memory(addr, val)
         elif addr >= self.code_start:
             # code memory
             self.program.set_memory(addr, val)
@@ -314,6 +335,49 @@ class DataSegment(object):
         elif addr >= 0:
             self._set_basic_memory(addr, val)
 
+    def get_memory_block(self, addr, length):
+        """Retrieve a contiguous block of bytes from data memory."""
+        addr -= self.data_segment*0x10
+        block = bytearray()
+        for start, stop, reader, _ in self._split_memory(addr, addr+length):
+            block += reader(start, stop-start)
+        return block
+
+    def set_memory_block(self, addr, buf):
+        """Set a contiguous block of bytes in data memory."""
+        addr -= self.data_segment*0x10
+        for start, stop, _, writer in self._split_memory(addr, addr+len(buf)):
+            writer(start, buf[start-addr:stop-addr])
+
+    def _split_memory(self, addr, end):
+        """Split a range of data memory into (start, stop, block reader, block writer) runs."""
+        # variables and strings are read and written in bulk; other memory byte by byte
+        var_start, var_current = self.var_start(), self.var_current()
+        areas = (
+            (var_start, self._get_memory_bytes, self._set_memory_bytes),
+            (var_current, self.scalars.get_memory_block, self.scalars.set_memory_block),
+            (var_current + self.arrays.current, self.arrays.get_memory_block, self.arrays.set_memory_block),
+            # unallocated var space
+            (self.strings.current + 1, lambda start, length: bytearray(length), lambda start, buf: None),
+            (None, self.strings.get_memory_block, self.strings.set_memory_block),
+        )
+        for area_end, reader, writer in areas:
+            stop = end if area_end is None else min(end, area_end)
+            if addr < stop:
+                yield addr, stop, reader, writer
+                addr = stop
+
+    def _get_memory_bytes(self, addr, length):
+        """Retrieve a block of data memory one byte at a time."""
+        offset = self.data_segment*0x10
+        return bytearray(self.get_memory(offset + a) for a in xrange(addr, addr+length))
+
+    def _set_memory_bytes(self, addr, buf):
+        """Set a block of data memory one byte at a time."""
+        offset = self.data_segment*0x10
+        for a, value in enumerate(buf, addr):
+            self.set_memory(offset + a, value)
+
     ###############################################################################
     # File buffer access
 
@@ -345,6 +409,15 @@ class DataSegment(object):
             # unallocated var space
             return -1
 
+    def _set_var_memory(self, address, value):
+        """Change data in data memory."""
+        if address < self.var_current():
+            self.scalars.set_memory(address, value)
+        elif address < self.var_current() + self.arrays.current:
+            self.arrays.set_memory(address, value)
+        elif address > self.strings.current:
+            self.strings.set_memory(address, value)
+
     def _get_basic_memory(self, addr):
         """Retrieve data from BASIC memory."""
         if addr < 4:
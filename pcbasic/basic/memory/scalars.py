@@ -7,6 +7,7 @@ This file is released under the GNU GPL version 3 or later.
 """
 
 import struct
+from bisect import bisect_right
 
 from ..base import error
 from .. import values
@@ -19,8 +20,28 @@ class Scalars(object):
         """Initialise scalars."""
         self._memory = memory
         self._values = values
+        # variable records and values are stored in the data segment
+        self._segment = memory.segment
         self.clear()
 
+    def __getstate__(self):
+        """Pickle."""
+        pickle_dict = self.__dict__.copy()
+        # views can't be pickled; they are recreated from the data segment
+        pickle_dict['_vars'] = None
+        return pickle_dict
+
+    def __setstate__(self, pickle_dict):
+        """Unpickle."""
+        self.__dict__.update(pickle_dict)
+        self._vars = {
+            name: self._view(name, var_ptr)
+            for name, (_, var_ptr) in self._var_memory.iteritems()}
+
+    def _view(self, name, var_ptr):
+        """Create a view of a variable's value in the data segment."""
+        return memoryview(self._segment)[var_ptr:var_ptr+self._buffer_size(name)]
+
     def __contains__(self, varname):
         """Check if a scalar has been defined."""
         return varname in self._vars
@@ -37,6 +58,9 @@ class Scalars(object):
         """Clear scalar variables."""
         self._vars = {}
         self._var_memory = {}
+        # address index: sorted name pointers and the corresponding names
+        self._name_ptrs = []
+        self._names = []
         self.current = 0
 
     @staticmethod
@@ -74,19 +98,18 @@ class Scalars(object):
             var_ptr = name_ptr + self._record_size(name)
             self.current += size
             self._var_memory[name] = (name_ptr, var_ptr)
+            self._segment[name_ptr:var_ptr] = bytearray(
+                get_name_in_memory(name, offset) for offset in range(var_ptr - name_ptr))
+            # variable starts out with a zero value
+            self._vars[name] = self._view(name, var_ptr)
+            self._vars[name][:] = b'\0' * self._buffer_size(name)
+            # new variables are always allocated at the end, so the index stays sorted
+            self._name_ptrs.append(name_ptr)
+            self._names.append(name)
         # don't change the value if just checking allocation
-        if value is None:
-            if name in self._vars:
-                return
-            else:
-                value = self._values.new(type_char)
-        # copy buffers
-        try:
+        if value is not None:
             # in-place copy is crucial for FOR
-            self._vars[name][:] = value.to_bytes()[:]
-        except KeyError:
-            # copy into new buffer if not existing
-            self._vars[name] = value.to_bytes()[:]
+            self._vars[name][:] = value.to_bytes()
 
     def get(self, name):
         """Retrieve the value of a scalar variable."""
@@ -109,34 +132,49 @@ class Scalars(object):
         _, var_ptr = self._var_memory[name]
         return var_ptr
 
+    def _find(self, address):
+        """Find the name of the variable whose record contains the address, or None."""
+        index = bisect_right(self._name_ptrs, address) - 1
+        if index < 0:
+            return None
+        return self._names[index]
+
     def dereference(self, address):
         """Get a value for a scalar given its pointer address."""
-        for name, data in self._var_memory.iteritems():
-            if data[1] == address:
-                return self.get(name)
+        name = self._find(address)
+        if name is not None and self._var_memory[name][1] == address:
+            return self.get(name)
         return None
 
     def get_memory(self, address):
         """Retrieve data from data memory: variable space """
-        name_addr = -1
-        var_addr = -1
-        the_var = None
-        for name in self._var_memory:
-            name_try, var_try = self._var_memory[name]
-            if name_try <= address and name_try > name_addr:
-                name_addr, var_addr = name_try, var_try
-                the_var = name
-        if the_var is None:
+        if not self._name_ptrs or address < self._name_ptrs[0]:
             return -1
-        if address >= var_addr:
-            offset = address - var_addr
-            if offset >= values.size_bytes(the_var):
-                return -1
-            var_rep = self._vars[the_var]
-            return var_rep[offset]
-        else:
-            offset = address - name_addr
-            return get_name_in_memory(the_var, offset)
+        return self._segment[address]
+
+    def set_memory(self, address, value):
+        """Change data in data memory: variable space """
+        self.set_memory_block(address, (value,))
+
+    def get_memory_block(self, address, length):
+        """Retrieve a block of data memory from variable space."""
+        return self._segment[address:address+length]
+
+    def set_memory_block(self, address, buf):
+        """Change a block of data in data memory: variable space """
+        end = address + len(buf)
+        index = max(0, bisect_right(self._name_ptrs, address) - 1)
+        for name in self._names[index:]:
+            _, var_ptr = self._var_memory[name]
+            if var_ptr >= end:
+                break
+            # only values can be changed, not names
+            # string pointers can't be changed either, they must point to a stored string
+            if name[-1] == values.STR:
+                continue
+            start, stop = max(address, var_ptr), min(end, var_ptr + self._buffer_size(name))
+            if start < stop:
+                self._segment[start:stop] = buf[start-address:stop-address]
 
     def get_strings(self):
         """Return a list of views of string scalars."""
@@ -99,3 +99,124 @@ class MLParser(codestream.CodeStream):
                     break
             self.require_read((']', ')'))
         return indices
+
+
+# maximum number of macro-language strings for which parse results are kept
+ML_CACHE_SIZE = 256
+
+
+class MLCache(object):
+    """Parse results of macro-language strings, keyed by string content."""
+
+    def __init__(self, data_memory, values):
+        """Initialise the cache."""
+        self._memory = data_memory
+        self._values = values
+        self._records = {}
+
+    def __getstate__(self):
+        """Pickle."""
+        pickle_dict = self.__dict__.copy()
+        # records are rebuilt on use
+        pickle_dict['_records'] = {}
+        return pickle_dict
+
+    def __setstate__(self, pickle_dict):
+        """Unpickle."""
+        self.__dict__.update(pickle_dict)
+
+    def get_parser(self, mls):
+        """Get a parser for a macro-language string."""
+        record = self._records.get(mls)
+        if record is None:
+            if len(self._records) >= ML_CACHE_SIZE:
+                self._records.clear()
+            record = self._records[mls] = []
+        return CachedMLParser(mls, record, self._memory, self._values)
+
+
+class _Reference(object):
+    """Variable or VARPTR$ reference in a macro-language string, evaluated on use."""
+
+    def __init__(self, segment, method, args):
+        """Store the text of the reference and how to parse it."""
+        self._segment = segment
+        self._method = method
+        self._args = args
+
+    def evaluate(self, data_memory, values):
+        """Parse the reference and return its current value."""
+        parser = MLParser(self._segment, data_memory, values)
+        return getattr(parser, self._method)(*self._args)
+
+
+class CachedMLParser(object):
+    """Macro Language parser that replays and extends a record of earlier parses."""
+
+    def __init__(self, mls, record, data_memory, values):
+        """Initialise macro-language parser."""
+        self._mls = mls
+        # list of (call, result, position after call)
+        self._record = record
+        self._memory = data_memory
+        self._values = values
+        self._index = 0
+        self._pos = 0
+        self._live = None
+        self._recording = True
+
+    def _call(self, method, *args):
+        """Replay a parser call if recorded, otherwise parse and record it."""
+        call = (method,) + args
+        if self._live is None:
+            if self._index < len(self._record):
+                recorded, result, pos = self._record[self._index]
+                if recorded == call:
+                    self._index += 1
+                    self._pos = pos
+                    if isinstance(result, _Reference):
+                        return result.evaluate(self._memory, self._values)
+                    return result
+                # the statement has taken another path, don't add it to the record
+                self._recording = False
+            self._live = MLParser(self._mls, self._memory, self._values)
+            self._live.seek(self._pos)
+        start = self._live.tell()
+        result = getattr(self._live, method)(*args)
+        # only extend the record if no other parser on the same string has done so
+        if self._recording and self._index == len(self._record):
+            self._pos = self._live.tell()
+            segment = self._mls[start:self._pos]
+            if method == 'parse_string' or (method == 'parse_number' and b'=' in segment):
+                entry = _Reference(segment, method, args)
+            else:
+                entry = result
+            self._record.append((call, entry, self._pos))
+            self._index += 1
+        else:
+            self._recording = False
+        return result
+
+    def skip_blank_read(self, n=1):
+        """Skip whitespace, then read next."""
+        return self._call('skip_blank_read', n)
+
+    def skip_blank(self, n=1):
+        """Skip whitespace, then peek next."""
+        return self._call('skip_blank', n)
+
+    def skip_blank_read_if(self, in_range, n=1):
+        """Skip whitespace, then read if next char is in range."""
+        return self._call('skip_blank_read_if', in_range, n)
+
+    def read(self, n=-1):
+        """Read n chars, or the rest of the string."""
+        return self._call('read', n)
+
+    def parse_number(self, default=None):
+        """Parse a value in a macro-language string."""
+        return self._call('parse_number', default)
+
+    def parse_string(self):
+        """Parse a string value in a macro-language string."""
+        return self._call('parse_string')
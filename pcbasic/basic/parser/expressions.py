@@ -341,8 +341,16 @@ class ExpressionParser(object):
             if precedence > operations[-1][2]:
                 break
             oper, narity, _ = operations.pop()
-            args = reversed([units.pop() for _ in range(narity)])
-            units.append(oper(*args))
+            args = [units.pop() for _ in range(narity)]
+            args.reverse()
+            result = oper(*args)
+            units.append(result)
+            # operands are no longer referenced once consumed; recycle numeric temporaries
+            if narity == 2 and args[0] is args[1]:
+                args.pop()
+            for arg in args:
+                if arg is not result and isinstance(arg, values.Number):
+                    self._values.release(arg)
 
     def read_string_literal(self, ins):
         """Read a quoted string literal (no leading blanks), return as String."""
@@ -56,6 +56,8 @@ class Sound(object):
         self._queues = queues
         self._values = values
         self._memory = memory
+        # parse results of PLAY strings
+        self._mml_cache = mlparser.MLCache(memory, values)
         # Tandy/PCjr noise generator
         # frequency for noise sources
         self._noise_freq = list(NOISE_FREQ)
@@ -275,7 +277,7 @@ class Sound(object):
         # this takes up one spot in the buffer and thus affects timings
         self._synch = True
         mml_list += [b''] * (3 - len(mml_list))
-        ml_parser_list = [mlparser.MLParser(mml, self._memory, self._values) for mml in mml_list]
+        ml_parser_list = [self._mml_cache.get_parser(mml) for mml in mml_list]
         next_oct = 0
         voices = range(3)
         while True:
@@ -293,13 +295,8 @@ class Sound(object):
                 elif c == b'X':
                     # insert substring
                     sub = mmls.parse_string()
-                    pos = mmls.tell()
-                    rest = mmls.read()
-                    mmls.seek(pos)
-                    mmls.truncate()
-                    mmls.write(sub)
-                    mmls.write(rest)
-                    mmls.seek(pos)
+                    # continue parsing the substring followed by the rest of the string
+                    ml_parser_list[voice] = self._mml_cache.get_parser(sub + mmls.read())
                 elif c == b'N':
                     note = mmls.parse_number()
                     error.range_check(0, 84, note)
@@ -9,9 +9,11 @@ This file is released under the GNU GPL version 3 or later.
 from . import numbers
 from . import strings
 from . import values
+from . import fastfloat
 from . import randomiser
 
 from .numbers import *
 from .strings import *
 from .values import *
+from .fastfloat import *
 from .randomiser import *
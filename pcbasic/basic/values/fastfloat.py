@@ -0,0 +1,304 @@
+"""
+PC-BASIC - fastfloat.py
+Floating-point values backed by native Python floats
+
+(c) 2013--2018 Rob Hagemans
+This file is released under the GNU GPL version 3 or later.
+"""
+
+# In fast-float mode, Single and Double values do their arithmetic on a native Python float
+# and only produce their Microsoft Binary Format representation when the bytes are observed:
+# stored in a variable, written through VARPTR, converted with MKS$/MKD$, formatted for output
+# or pickled. This is considerably faster but *not* bit-exact with GW-BASIC:
+# - results are rounded to IEEE precision (24-bit singles, 53-bit doubles) with
+#   round-half-even, not with the MBF rounding quirks
+# - double-precision values have 53 rather than 56 bits of mantissa
+# Overflow and division by zero are reported in the same way as in MBF mode.
+
+import struct
+
+from .numbers import Single, Double
+
+
+# smallest power of two that can't be represented in MBF
+_MBF_LIMIT = 2.**127
+# smallest positive number that can be represented in MBF
+_MBF_TINY = 2.**-129
+
+
+class _NativeFloat(object):
+    """Mixin for Float classes that keep a native float and materialise MBF lazily."""
+
+    __slots__ = ()
+
+    def _get_buffer(self):
+        """Materialise the MBF representation and return a view of it."""
+        if self._stale:
+            # clear the flag first: from_value writes through this property
+            self._stale = False
+            self._from_native(self._value)
+        # the caller may write to the buffer, so the native value can no longer be trusted
+        self._value = None
+        return self._mbf
+
+    def _set_buffer(self, buffer):
+        """Replace the MBF representation."""
+        self._mbf = buffer
+        self._value = None
+        self._stale = False
+
+    # replaces the slot in Value
+    _buffer = property(_get_buffer, _set_buffer)
+
+    def __getstate__(self):
+        """Pickle."""
+        # reading _buffer materialises the MBF bytes, which hold the whole state
+        pickle_dict = super(_NativeFloat, self).__getstate__()
+        # can't pickle memoryview; the native value is recalculated from the bytes
+        for name in ('_mbf', '_value', '_stale'):
+            pickle_dict.pop(name, None)
+        return pickle_dict
+
+    def __setstate__(self, pickle_dict):
+        """Unpickle."""
+        # sets _mbf; the native value is recalculated when needed
+        self._buffer = memoryview(pickle_dict['_buffer'])
+        for name, value in pickle_dict.iteritems():
+            if name != '_buffer':
+                setattr(self, name, value)
+
+    def _round(self, in_float):
+        """Round to the precision of the type."""
+        return in_float
+
+    def _to_native(self):
+        """Convert the MBF representation to a native float."""
+        return super(_NativeFloat, self).to_value()
+
+    def _from_native(self, in_float):
+        """Store a native float in MBF format."""
+        super(_NativeFloat, self).from_value(in_float)
+
+    def _set(self, in_float):
+        """Set the native value, raise OverflowError if out of range."""
+        in_float = self._round(in_float)
+        if in_float >= _MBF_LIMIT or in_float <= -_MBF_LIMIT:
+            self.from_bytes(self.neg_max if in_float < 0 else self.pos_max)
+            raise OverflowError(self)
+        elif -_MBF_TINY < in_float < _MBF_TINY:
+            in_float = 0.
+        self._value = in_float
+        self._stale = True
+        return self
+
+    # conversions
+
+    def to_value(self):
+        """Return value as Python float."""
+        if self._value is None:
+            # _buffer is not stale if _value is None
+            self._value = self._to_native()
+        return self._value
+
+    def from_value(self, in_float):
+        """Set to value of Python float."""
+        return self._set(in_float)
+
+    def from_bytes(self, in_bytes):
+        """Copy a new byte representation into the value."""
+        self._mbf[:] = in_bytes
+        self._value = None
+        self._stale = False
+        return self
+
+    def from_int(self, in_int):
+        """Set value to Python int."""
+        if -self._max_exact <= in_int <= self._max_exact:
+            return self._set(float(in_int))
+        # keep conversion of long decimal mantissas exact
+        return super(_NativeFloat, self).from_int(in_int)
+
+    def from_integer(self, in_integer):
+        """Convert Integer to Float."""
+        return self._set(float(in_integer.to_int()))
+
+    def to_int(self):
+        """Return value rounded to Python int, halves away from zero."""
+        value = self.to_value()
+        if value < 0:
+            return -int(0.5 - value)
+        return int(value + 0.5)
+
+    def to_int_truncate(self):
+        """Truncate float to integer."""
+        return int(self.to_value())
+
+    def clone(self):
+        """Create a copy."""
+        other = self._values.new(self.sigil)
+        if self._stale:
+            other._value = self._value
+            other._stale = True
+        else:
+            other._mbf[:] = self._mbf
+            other._value = self._value
+        return other
+
+    # properties
+
+    def is_zero(self):
+        """Value is zero."""
+        return self.to_value() == 0.
+
+    def is_negative(self):
+        """Value is negative."""
+        value = self.to_value()
+        if value == 0.:
+            # MBF has a negative zero, which is kept in byte form
+            return super(_NativeFloat, self).is_negative()
+        return value < 0.
+
+    def sign(self):
+        """Sign of value."""
+        value = self.to_value()
+        return (value > 0.) - (value < 0.)
+
+    # in-place operations
+
+    def ineg(self):
+        """Negate in-place."""
+        value = self.to_value()
+        if value == 0.:
+            # flip the sign bit of the MBF zero
+            return super(_NativeFloat, self).ineg()
+        self._value = -value
+        self._stale = True
+        return self
+
+    def iabs(self):
+        """Absolute value in-place."""
+        value = self.to_value()
+        if value == 0.:
+            return super(_NativeFloat, self).iabs()
+        self._value = abs(value)
+        self._stale = True
+        return self
+
+    def iadd(self, right):
+        """Add in-place."""
+        return self._set(self.to_value() + right.to_value())
+
+    def isub(self, right):
+        """Subtract in-place."""
+        return self._set(self.to_value() - right.to_value())
+
+    def imul(self, right_in):
+        """Multiply in-place."""
+        return self._set(self.to_value() * right_in.to_value())
+
+    def idiv(self, right_in):
+        """Divide in-place."""
+        divisor = right_in.to_value()
+        if divisor == 0.:
+            # division by zero - return max float with the type and sign of self
+            self.from_bytes(self.neg_max if self.is_negative() else self.pos_max)
+            raise ZeroDivisionError(self)
+        return self._set(self.to_value() / divisor)
+
+    # relations
+
+    def gt(self, rhs):
+        """Greater than."""
+        return self.to_value() > rhs.to_value()
+
+    def eq(self, rhs):
+        """Equals."""
+        return self.to_value() == rhs.to_value()
+
+
+class FastSingle(_NativeFloat, Single):
+    """Single-precision float backed by a native float."""
+
+    __slots__ = ('_mbf', '_value', '_stale')
+
+    # largest integer range that converts exactly
+    _max_exact = 2**24
+
+    def _round(self, in_float):
+        """Round to single precision."""
+        try:
+            return struct.unpack('<f', struct.pack('<f', in_float))[0]
+        except OverflowError:
+            # out of range for IEEE single, so certainly out of range for MBF
+            return in_float
+
+    def _to_native(self):
+        """Convert the MBF representation to a native float."""
+        mbf, = struct.unpack('<L', self._mbf)
+        exp = mbf >> 24
+        if exp == 0:
+            return 0.
+        elif exp < 3:
+            # subnormal in IEEE
+            return _NativeFloat._to_native(self)
+        # MBF has the sign bit where IEEE has the lowest exponent bit
+        # the IEEE exponent is biased by 127 relative to 1.f, MBF's by 128 relative to 0.1f
+        ieee = ((mbf & 0x800000) << 8) | ((exp - 2) << 23) | (mbf & 0x7fffff)
+        return struct.unpack('<f', struct.pack('<L', ieee))[0]
+
+    def _from_native(self, in_float):
+        """Store a native float in MBF format."""
+        ieee, = struct.unpack('<L', struct.pack('<f', in_float))
+        exp = (ieee >> 23) & 0xff
+        if exp == 0:
+            # zero or subnormal in IEEE
+            _NativeFloat._from_native(self, in_float)
+            return
+        mbf = ((exp + 2) << 24) | ((ieee >> 8) & 0x800000) | (ieee & 0x7fffff)
+        struct.pack_into('<L', self._mbf, 0, mbf)
+
+    def to_double(self):
+        """Convert single to double."""
+        return self._values.new_double().from_value(self.to_value())
+
+
+class FastDouble(_NativeFloat, Double):
+    """Double-precision float backed by a native float."""
+
+    __slots__ = ('_mbf', '_value', '_stale')
+
+    # largest integer range that converts exactly
+    _max_exact = 2**53
+
+    def _to_native(self):
+        """Convert the MBF representation to a native float."""
+        mbf, = struct.unpack('<Q', self._mbf)
+        exp = mbf >> 56
+        if exp == 0:
+            return 0.
+        # drop three bits of mantissa, rounding halves to even; carry may spill into exponent
+        ieee = ((exp + 894) << 52) | ((mbf & 0x7fffffffffffff) >> 3)
+        rest = mbf & 0x7
+        if rest > 4 or (rest == 4 and ieee & 1):
+            ieee += 1
+        ieee |= (mbf & 0x80000000000000) << 8
+        return struct.unpack('<d', struct.pack('<Q', ieee))[0]
+
+    def _from_native(self, in_float):
+        """Store a native float in MBF format."""
+        ieee, = struct.unpack('<Q', struct.pack('<d', in_float))
+        exp = ((ieee >> 52) & 0x7ff) - 894
+        if exp <= 0:
+            # zero or too small for MBF
+            _NativeFloat._from_native(self, in_float)
+            return
+        mbf = (exp << 56) | ((ieee >> 8) & 0x80000000000000) | ((ieee & 0xfffffffffffff) << 3)
+        struct.pack_into('<Q', self._mbf, 0, mbf)
+
+    def from_single(self, in_single):
+        """Convert Single to Double in-place."""
+        return self._set(in_single.to_value())
+
+    def to_single(self):
+        """Round double to single."""
+        return self._values.new_single().from_value(self.to_value())
@@ -43,15 +43,21 @@ SEPARATORS = b'\x1c\x1d\x1f'
 class Value(object):
     """Abstract base class for value types."""
 
+    # no per-instance __dict__: values are created for every intermediate result
+    __slots__ = ('_buffer', '_values', '_owned')
+
     sigil = None
     size = None
 
     def __init__(self, buffer, values):
         """Initialise the value."""
+        # only values that own their buffer can be recycled
+        self._owned = buffer is None
         if buffer is None:
             buffer = bytearray(self.size)
         self._buffer = memoryview(buffer)
         self._values = values
+        values.allocated += 1
 
     def __str__(self):
         """String representation for debugging."""
@@ -64,13 +70,20 @@ class Value(object):
 
 
     def __getstate__(self):
+        """Pickle."""
+        pickle_dict = {
+            name: getattr(self, name)
+            for cls in type(self).__mro__ for name in getattr(cls, '__slots__', ())
+        }
         # can't pickle memoryview
-        self._buffer = bytearray(self._buffer)
-        return self.__dict__
+        pickle_dict['_buffer'] = bytearray(self._buffer)
+        return pickle_dict
 
     def __setstate__(self, pickle_dict):
+        """Unpickle."""
+        for name, value in pickle_dict.iteritems():
+            setattr(self, name, value)
         # can't pickle memoryview
-        self.__dict__ = pickle_dict
         self._buffer = memoryview(self._buffer)
 
     def to_value(self):
@@ -78,11 +91,11 @@ class Value(object):
 
     def clone(self):
         """Create a copy."""
-        return self.__class__(None, self._values).from_bytes(self._buffer)
+        return self._values.new(self.sigil).from_bytes(self._buffer)
 
     def new(self):
         """Create a new null value."""
-        return self.__class__(None, self._values)
+        return self._values.new(self.sigil)
 
     def copy_from(self, other):
         """Copy another value into this one."""
@@ -109,6 +122,8 @@ class Value(object):
 class Number(Value):
     """Abstract base class for numeric value."""
 
+    __slots__ = ('error_handler',)
+
     zero = None
     pos_max = None
     neg_max = None
@@ -141,6 +156,8 @@ class Number(Value):
 class Integer(Number):
     """16-bit signed little-endian integer."""
 
+    __slots__ = ()
+
     sigil = b'%'
     size = 2
 
@@ -188,15 +205,15 @@ class Integer(Number):
 
     def to_double(self):
         """Convert to double."""
-        return Double(None, self._values).from_integer(self)
+        return self._values.new_double().from_integer(self)
 
     def to_single(self):
         """Convert to single."""
-        return Single(None, self._values).from_integer(self)
+        return self._values.new_single().from_integer(self)
 
     def to_float(self, allow_double=True):
         """Convert to float."""
-        return Single(None, self._values).from_integer(self)
+        return self._values.new_single().from_integer(self)
 
     to_value = to_int
     from_value = from_int
@@ -335,9 +352,9 @@ class Integer(Number):
         if rhs.is_zero():
             # division by zero - return single-precision maximum
             if self.is_negative():
-                max_val = Single(None, self._values).from_bytes(Single.neg_max)
+                max_val = self._values.new_single().from_bytes(Single.neg_max)
             else:
-                max_val = Single(None, self._values).from_bytes(Single.pos_max)
+                max_val = self._values.new_single().from_bytes(Single.pos_max)
             raise ZeroDivisionError(max_val)
         dividend = self.to_int()
         divisor = rhs.to_int()
@@ -352,9 +369,9 @@ class Integer(Number):
         if rhs.is_zero():
             # division by zero - return single-precision maximum
             if self.is_negative():
-                max_val = Single(None, self._values).from_bytes(Single.neg_max)
+                max_val = self._values.new_single().from_bytes(Single.neg_max)
             else:
-                max_val = Single(None, self._values).from_bytes(Single.pos_max)
+                max_val = self._values.new_single().from_bytes(Single.pos_max)
             raise ZeroDivisionError(max_val)
         dividend = self.to_int()
         divisor = rhs.to_int()
@@ -397,6 +414,8 @@ class Integer(Number):
 class Float(Number):
     """Abstract base class for floating-point value."""
 
+    __slots__ = ()
+
     digits = None
     pos_max = None
     neg_max = None
@@ -425,7 +444,7 @@ class Float(Number):
 
     def to_integer(self, unsigned=False):
         """Convert Float to Integer."""
-        return Integer(None, self._values).from_int(self.to_int(), unsigned)
+        return self._values.new_integer().from_int(self.to_int(), unsigned)
 
     # Python float conversions
 
@@ -534,7 +553,7 @@ class Float(Number):
             return self.gt(self.new().from_integer(rhs))
         elif isinstance(rhs, Double) and isinstance(self, Single):
             # upgrade to Double
-            return Double(None, self._values).from_single(self).gt(rhs)
+            return self._values.new_double().from_single(self).gt(rhs)
         rhsneg = rhs.is_negative()
         # treat zero separately to avoid comparing different mantissas
         # zero is only greater than negative
@@ -554,7 +573,7 @@ class Float(Number):
             return self.eq(self.new().from_integer(rhs))
         elif isinstance(rhs, Double) and isinstance(self, Single):
             # upgrade to Double
-            return Double(None, self._values).from_single(self).eq(rhs)
+            return self._values.new_double().from_single(self).eq(rhs)
         # all zeroes are equal
         if self.is_zero():
             return rhs.is_zero()
@@ -1023,6 +1042,8 @@ class Float(Number):
 class Single(Float):
     """Single-precision MBF float."""
 
+    __slots__ = ()
+
     sigil = b'!'
     size = 4
 
@@ -1067,7 +1088,7 @@ class Single(Float):
 
     def to_double(self):
         """Convert single to double."""
-        return Double(None, self._values).from_single(self)
+        return self._values.new_double().from_single(self)
 
     def to_float(self, allow_double=True):
         """Convert single to float."""
@@ -1080,6 +1101,8 @@ class Single(Float):
 class Double(Float):
     """Double-precision MBF float."""
 
+    __slots__ = ()
+
     sigil = b'#'
     size = 8
 
@@ -1127,7 +1150,7 @@ class Double(Float):
     def to_single(self):
         """Round double to single."""
         mybytes = self.to_bytes()
-        single = Single(None, self._values).from_bytes(mybytes[4:])
+        single = self._values.new_single().from_bytes(mybytes[4:])
         exp, man, neg = single._denormalise()
         # carry byte
         man += mybytes[3]
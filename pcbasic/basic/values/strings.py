@@ -6,6 +6,7 @@ String values
 This file is released under the GNU GPL version 3 or later.
 """
 
+import time
 import struct
 import logging
 from operator import itemgetter
@@ -14,9 +15,15 @@ from ..base import error
 from . import numbers
 
 
+# size of the string heap; string addresses are offsets in the 64K data segment
+ARENA_SIZE = 0x10000
+
+
 class String(numbers.Value):
     """String pointer."""
 
+    __slots__ = ('_stringspace',)
+
     sigil = '$'
     size = 3
 
@@ -130,13 +137,13 @@ class String(numbers.Value):
 
     def len(self):
         """LEN: length of string."""
-        return numbers.Integer(None, self._values).from_int(self.length())
+        return self._values.new_integer().from_int(self.length())
 
     def asc(self):
         """ASC: ordinal ASCII value of a character."""
         s = self.to_str()
         error.throw_if(not s)
-        return numbers.Integer(None, self._values).from_int(ord(s[0]))
+        return self._values.new_integer().from_int(ord(s[0]))
 
     def space(self, num):
         """SPACE$: repeat spaces."""
@@ -148,37 +155,79 @@ class String(numbers.Value):
 class StringSpace(object):
     """Table of strings accessible by their length and address."""
 
-    def __init__(self, memory):
+    def __init__(self, memory, gc_budget=0, heap=None):
         """Initialise empty string space."""
         self._memory = memory
+        # maximum number of bytes to move in a bounded garbage collection; 0 means no bound
+        self._gc_budget = gc_budget
+        # garbage collection statistics; pause times in seconds
+        self.gc_count = 0
+        self.gc_bytes_moved = 0
+        self.gc_pause_last = 0.
+        self.gc_pause_max = 0.
+        self.gc_pause_total = 0.
+        # string heap, indexed by address; strings are stored from the top downwards
+        # this may be the whole data segment, shared with other variable storage
+        self._own_heap = heap is None
+        self._heap = bytearray(ARENA_SIZE) if heap is None else heap
+        # descriptor table: address -> length of stored strings
         self._strings = {}
         self._temp = None
+        # incremental collection in progress: strings below the cursor are still to be moved
+        # and the compacted strings start at dest; None if no collection is in progress
+        self._gc_cursor, self._gc_dest = None, None
+        # bytes allocated since the last incremental step
+        self._gc_debt = 0
+        # an incremental step is due at the next statement boundary
+        self.gc_step_pending = False
         self.clear()
 
+    def __getstate__(self):
+        """Pickle."""
+        pickle_dict = self.__dict__.copy()
+        # a shared heap is stored by its owner
+        if self._own_heap:
+            # only store the part of the heap that is in use
+            pickle_dict['_heap'] = bytes(self._heap[self.current+1:self._top+1])
+        return pickle_dict
+
+    def __setstate__(self, pickle_dict):
+        """Unpickle."""
+        self.__dict__.update(pickle_dict)
+        if self._own_heap:
+            heap = bytearray(ARENA_SIZE)
+            heap[self.current+1:self._top+1] = self._heap
+            self._heap = heap
+
     def __str__(self):
         """Debugging representation of string table."""
-        return '\n'.join('%x: %s' % (n, repr(v)) for n, v in self._strings.iteritems())
+        return '\n'.join(
+            '%x: %s' % (n, repr(self._heap[n:n+length])) for n, length in self._strings.iteritems())
 
     def clear(self):
         """Empty string space."""
         self._strings.clear()
         # strings are placed at the top of string memory, just below the stack
-        self.current = self._memory.stack_start()
+        self._top = self._memory.stack_start()
+        self.current = self._top
+        self._gc_cursor, self._gc_dest = None, None
+        self.gc_step_pending = False
 
     def rebuild(self, stringspace):
         """Rebuild from stored copy."""
         self.clear()
         self._strings.update(stringspace._strings)
+        # only copy the strings, the heap may be shared with other storage
+        self._heap[stringspace.current+1:stringspace._top+1] = (
+            stringspace._heap[stringspace.current+1:stringspace._top+1])
+        self._top = stringspace._top
         self.current = stringspace.current
 
     def copy_to(self, string_space, length, address):
         """Copy a string to another string space."""
-        return string_space.store(self.view(length, address).tobytes())
-
-    def _retrieve(self, length, address):
-        """Retrieve a string by its pointer."""
-        # if string length == 0, return empty string
-        return bytearray() if length == 0 else self._strings[address]
+        # don't collect garbage here, it would move the strings still to be copied
+        # the caller checks if the copies fit
+        return string_space.store(self.view(length, address).tobytes(), check_free=False)
 
     def view(self, length, address):
         """Return a writeable view of a string from its string pointer."""
@@ -187,7 +236,7 @@ class StringSpace(object):
             return memoryview(bytearray())
         if address >= self._memory.var_start():
             # string stored in string space
-            return memoryview(self._retrieve(length, address))
+            return memoryview(self._heap)[address:address+length]
         elif address >= self._memory.code_start:
             # get string stored in code as bytearray
             codestr = self._memory.program.get_memory_block(address, length)
@@ -226,36 +275,35 @@ class StringSpace(object):
             address = self.current + 1
             # don't store empty strings
             if length > 0:
-                # copy and convert to bytearray
-                self._strings[address] = bytearray(in_str)
+                self._heap[address:address+length] = in_str
+                self._strings[address] = length
         return length, address
 
     def _delete_last(self):
         """Delete the string provided if it is at the top of string space."""
         last_address = self.current + 1
         try:
-            length = len(self._strings[last_address])
-            self.current += length
-            del self._strings[last_address]
+            self.current += self._strings.pop(last_address)
         except KeyError:
             # happens if we're called before an out-of-memory exception is handled
             # and the string wasn't allocated
             pass
 
-    def collect_garbage(self, string_ptrs):
-        """Re-store the strings referenced in string_ptrs, delete the rest."""
+    def _find_strings(self, string_ptrs, below=None):
+        """Read string pointers; return (view, address, length) for stored strings and the sentinel."""
         # string_ptrs should be a list of memoryviews to the original pointers
-        # retrieve addresses and copy strings
         string_list = []
         # find last non-temporary string
         last_permanent = self._memory.stack_start()
         last_perm_view = None
+        var_start = self._memory.var_start()
         for view in string_ptrs:
             length, addr = struct.unpack('<BH', view.tobytes())
             # exclude empty elements of string arrays (len==0 and addr==0)
             # exclude strings is not located in memory (FIELD or code strings)
-            if addr >= self._memory.var_start():
-                string_list.append((view, addr, self._retrieve(length, addr)))
+            if addr >= var_start:
+                if below is None or (length and addr < below):
+                    string_list.append((view, addr, length))
                 # set sentinel string (lowest-address permanent string)
                 # don't use zero-length strings as sentinel:
                 # they share an address with allocated strings and may get swapped on sorting
@@ -265,27 +313,170 @@ class StringSpace(object):
                         last_permanent, last_perm_view = addr, view
         # sort by address, largest first (maintain order of storage)
         string_list.sort(key=itemgetter(1), reverse=True)
-        # clear the string buffer and re-store all referenced strings
-        self.clear()
-        for view, _, string in string_list:
-            # re-allocate string space
-            # update the original pointers supplied (these are memoryviews)
-            view[:] = struct.pack('<BH', *self.store(string, check_free=False))
-        # readdress  start of temporary strings
+        return string_list, last_perm_view
+
+    def _readdress_temporaries(self, last_perm_view):
+        """Put the start of temporary strings just below the lowest permanent string."""
         if last_perm_view is None:
             self._temp = None
         elif self._temp is not None and self._temp != self._memory.stack_start():
             self._temp = -1 + struct.unpack_from('<H', last_perm_view.tobytes(), 1)[0]
 
+    def _record_pause(self, start_time, moved):
+        """Keep garbage collection statistics."""
+        pause = time.time() - start_time
+        self.gc_count += 1
+        self.gc_bytes_moved += moved
+        self.gc_pause_last = pause
+        self.gc_pause_max = max(self.gc_pause_max, pause)
+        self.gc_pause_total += pause
+
+    def collect_garbage(self, string_ptrs):
+        """Re-store the strings referenced in string_ptrs, delete the rest."""
+        start_time = time.time()
+        string_list, last_perm_view = self._find_strings(string_ptrs)
+        # a string referenced twice is stored twice, which may overwrite strings not yet moved
+        # so in that case we need to take copies first
+        nonempty = [addr for _, addr, length in string_list if length]
+        if len(set(nonempty)) < len(nonempty):
+            string_list = [
+                (view, self._heap[addr:addr+length], length)
+                for view, addr, length in string_list]
+        # compactify: move strings upwards, highest first, so no string is overwritten before it moves
+        # this also completes any incremental collection in progress
+        self._strings.clear()
+        self._top = self._memory.stack_start()
+        self.current = self._top
+        self._gc_cursor, self._gc_dest = None, None
+        self.gc_step_pending = False
+        moved = 0
+        for view, source, length in string_list:
+            self.current -= length
+            address = self.current + 1
+            if length > 0:
+                if isinstance(source, bytearray):
+                    self._heap[address:address+length] = source
+                    moved += length
+                elif address != source:
+                    self._heap[address:address+length] = self._heap[source:source+length]
+                    moved += length
+                self._strings[address] = length
+            # update the original pointers supplied (these are memoryviews)
+            view[:] = struct.pack('<BH', length, address)
+        self._readdress_temporaries(last_perm_view)
+        self._record_pause(start_time, moved)
+
+    def gc_step_due(self, size, free):
+        """Check if an incremental collection step is due before allocating size bytes."""
+        if not self._gc_budget:
+            return False
+        if self._gc_cursor is None:
+            # start a collection while there is as much room left as there is string data to move
+            return free < self._top - self.current
+        # pace the steps so that the collection completes before the free memory runs out
+        self._gc_debt += size
+        steps_left = 1 + (self._gc_cursor - self.current - 1) // self._gc_budget
+        return self._gc_debt * (steps_left + 1) >= free
+
+    def _group_strings(self, string_list):
+        """Group string pointers by address, so that shared strings are moved once."""
+        group = None
+        for view, addr, length in string_list:
+            if group and group[0] == addr:
+                group[1].append((view, length))
+                group[2] = max(group[2], length)
+            else:
+                if group:
+                    yield group
+                group = [addr, [(view, length)], length]
+        if group:
+            yield group
+
+    def collect_garbage_step(self, string_ptrs):
+        """Compact the next part of string space, moving at most the budget. Return True if complete."""
+        start_time = time.time()
+        self._gc_debt = 0
+        self.gc_step_pending = False
+        if self._gc_cursor is None:
+            # start a new collection at the top of string space
+            # strings below the cursor are still to be moved; the compacted strings start at dest
+            self._gc_cursor = self._gc_dest = self._top + 1
+        string_list, last_perm_view = self._find_strings(string_ptrs, below=self._gc_cursor)
+        groups = self._group_strings(string_list)
+        group = next(groups, None)
+        upper = self._gc_dest
+        moved, complete = 0, True
+        last_perm_moved = False
+        while group is not None:
+            addr, views, extent = group
+            if moved and moved + extent > self._gc_budget:
+                complete = False
+                break
+            next_group = next(groups, None)
+            if addr + extent > upper or (next_group and next_group[0] + next_group[2] > addr):
+                # overlapping strings can't be moved one by one; compact fully instead
+                self.collect_garbage(string_ptrs)
+                return True
+            # move the string upwards against the strings already compacted
+            self._gc_dest -= extent
+            if self._gc_dest != addr:
+                self._heap[self._gc_dest:self._gc_dest+extent] = self._heap[addr:addr+extent]
+                moved += extent
+            self._strings.pop(addr, None)
+            self._strings[self._gc_dest] = extent
+            for view, length in views:
+                last_perm_moved = last_perm_moved or view is last_perm_view
+                view[:] = struct.pack('<BH', length, self._gc_dest)
+            self._gc_cursor = upper = addr
+            group = next_group
+        if complete:
+            # everything below the compacted strings is garbage now
+            for addr in [addr for addr in self._strings if addr < self._gc_dest]:
+                del self._strings[addr]
+            self.current = self._gc_dest - 1
+            self._gc_cursor, self._gc_dest = None, None
+            self._readdress_temporaries(last_perm_view)
+        elif last_perm_moved:
+            self._readdress_temporaries(last_perm_view)
+        self._record_pause(start_time, moved)
+        return complete
+
+    def get_stats(self):
+        """Return garbage collection statistics."""
+        return {
+            'gc_count': self.gc_count,
+            'gc_bytes_moved': self.gc_bytes_moved,
+            'gc_pause_last': self.gc_pause_last,
+            'gc_pause_max': self.gc_pause_max,
+            'gc_pause_total': self.gc_pause_total,
+        }
+
+    def set_memory(self, address, value):
+        """Change data in string space."""
+        if self.current < address <= self._top:
+            self._heap[address] = value
+
     def get_memory(self, address):
         """Retrieve data from data memory: string space """
-        # find the variable we're in
-        for try_address, value in self._strings.iteritems():
-            length = len(value)
-            if try_address <= address < try_address + length:
-                return value[address - try_address]
+        # all bytes between current and top belong to a stored string
+        if self.current < address <= self._top:
+            return self._heap[address]
         return -1
 
+    def set_memory_block(self, address, buf):
+        """Change a block of data in string space."""
+        start, stop = max(address, self.current+1), min(address+len(buf), self._top+1)
+        if start < stop:
+            self._heap[start:stop] = buf[start-address:stop-address]
+
+    def get_memory_block(self, address, length):
+        """Retrieve a block of data memory from string space; zero outside stored strings."""
+        block = bytearray(length)
+        start, stop = max(address, self.current+1), min(address+length, self._top+1)
+        if start < stop:
+            block[start-address:stop-address] = self._heap[start:stop]
+        return block
+
     def fix_temporaries(self):
         """Make all temporary strings permanent."""
         self._temp = self.current
@@ -15,6 +15,7 @@ from ..base import error
 from ..base import tokens as tk
 from . import numbers
 from . import strings
+from . import fastfloat
 
 
 # BASIC type sigils:
@@ -34,6 +35,17 @@ SIZE_TO_TYPE = {2: INT, 3: STR, 4: SNG, 8: DBL}
 # type classes
 SIZE_TO_CLASS = {2: numbers.Integer, 3: strings.String, 4: numbers.Single, 8: numbers.Double}
 TYPE_TO_CLASS = {INT: numbers.Integer, STR: strings.String, SNG: numbers.Single, DBL: numbers.Double}
+# type classes for new values in fast-float mode
+FAST_TYPE_TO_CLASS = {
+    INT: numbers.Integer, STR: strings.String, SNG: fastfloat.FastSingle, DBL: fastfloat.FastDouble
+}
+
+
+# maximum number of recycled temporaries kept per numeric type
+POOL_SIZE = 32
+
+# maximum number of transcendental function results kept
+FLOAT_CACHE_SIZE = 1024
 
 
 def size_bytes(name):
@@ -113,17 +125,39 @@ def _call_float_function(fn, *args):
         args = [arg.to_float(arg._values.double_math) for arg in args]
         floatcls = args[0].__class__
         args = [arg.to_value() for arg in args]
-        return floatcls(None, values).from_value(fn(*args))
+        return values.new(floatcls.sigil).from_value(fn(*args))
     except (ValueError, ArithmeticError) as e:
         # create positive infinity of the appropriate class
         if arg._values.double_math and isinstance(args[0], numbers.Double):
             floatcls = numbers.Double
         else:
             floatcls = numbers.Single
-        infty = floatcls(None, values).from_bytes(floatcls.pos_max)
+        infty = values.new(floatcls.sigil).from_bytes(floatcls.pos_max)
         # attach as exception payload for float error handler to deal with
         return feh.handle(e.__class__(infty))
 
+def _call_cached_float_function(fn, x):
+    """Apply unary float function, reusing the result for previously seen arguments."""
+    values = pass_number(x)._values
+    # the Values object fixes the precision of the result, the input bytes fix the type
+    key = (fn, x._buffer.tobytes())
+    cache = values._float_cache
+    result_bytes = cache.get(key)
+    if result_bytes is not None:
+        values.float_cache_hits += 1
+        return values.new(SIZE_TO_TYPE[len(result_bytes)]).from_bytes(result_bytes)
+    values.float_cache_misses += 1
+    try:
+        fx = x.to_float(values.double_math)
+        result = values.new(fx.sigil).from_value(fn(fx.to_value()))
+    except (ValueError, ArithmeticError):
+        # errors are not cached; the full path reports them each time
+        return _call_float_function(fn, x)
+    if len(cache) >= FLOAT_CACHE_SIZE:
+        cache.clear()
+    cache[key] = result._buffer.tobytes()
+    return result
+
 
 class FloatErrorHandler(object):
     """Handles floating point errors."""
@@ -175,11 +209,36 @@ class FloatErrorHandler(object):
 class Values(object):
     """Handles BASIC strings and numbers."""
 
-    def __init__(self, string_space, double_math):
+    def __init__(self, string_space, double_math, pool_size=POOL_SIZE, fast_float=False):
         """Setup values."""
         self.stringspace = string_space
         # double-precision EXP, SIN, COS, TAN, ATN, LOG
         self.double_math = double_math
+        # fast-float mode: new floats calculate natively, results are not bit-exact
+        self.fast_float = fast_float
+        self._classes = FAST_TYPE_TO_CLASS if fast_float else TYPE_TO_CLASS
+        # free lists of recycled numeric temporaries; pool_size 0 disables recycling
+        self._pool_size = pool_size
+        self._pool = {INT: [], SNG: [], DBL: []}
+        # number of Value objects constructed and taken from the free lists
+        self.allocated = 0
+        self.recycled = 0
+        # results of transcendental functions, keyed by function and argument bytes
+        self._float_cache = {}
+        self.float_cache_hits = 0
+        self.float_cache_misses = 0
+
+    def __getstate__(self):
+        """Pickle."""
+        pickle_dict = self.__dict__.copy()
+        # don't bother storing temporaries
+        pickle_dict['_pool'] = {INT: [], SNG: [], DBL: []}
+        pickle_dict['_float_cache'] = {}
+        return pickle_dict
+
+    def __setstate__(self, pickle_dict):
+        """Unpickle."""
+        self.__dict__.update(pickle_dict)
 
     def set_handler(self, handler):
         """Initialise the error message screen."""
@@ -192,7 +251,13 @@ class Values(object):
 
     def new(self, sigil):
         """Return newly allocated value of the given type with zeroed buffer."""
-        return TYPE_TO_CLASS[sigil](None, self)
+        pool = self._pool.get(sigil)
+        if not pool:
+            return self._classes[sigil](None, self)
+        value = pool.pop()
+        value._buffer[:] = b'\0' * value.size
+        self.recycled += 1
+        return value
 
     def new_string(self):
         """Return newly allocated null string."""
@@ -200,15 +265,37 @@ class Values(object):
 
     def new_integer(self):
         """Return newly allocated zero integer."""
-        return numbers.Integer(None, self)
+        return self.new(INT)
 
     def new_single(self):
         """Return newly allocated zero single."""
-        return numbers.Single(None, self)
+        return self.new(SNG)
 
     def new_double(self):
         """Return newly allocated zero double."""
-        return numbers.Double(None, self)
+        return self.new(DBL)
+
+    def release(self, value):
+        """Return a numeric temporary to the free list; it must not be referenced elsewhere."""
+        # views on variable buffers and strings are never recycled
+        if value._owned and value._values is self:
+            try:
+                pool = self._pool[value.sigil]
+            except KeyError:
+                return
+            if len(pool) < self._pool_size:
+                pool.append(value)
+
+    def get_stats(self):
+        """Return value allocation and function cache counters."""
+        return {
+            'allocated': self.allocated,
+            'recycled': self.recycled,
+            'pooled': sum(len(_pool) for _pool in self._pool.itervalues()),
+            'float_cache_hits': self.float_cache_hits,
+            'float_cache_misses': self.float_cache_misses,
+            'float_cache_size': len(self._float_cache),
+        }
 
     ###########################################################################
     # convert between BASIC and Python values
@@ -216,7 +303,7 @@ class Values(object):
     @float_safe
     def from_value(self, python_val, typechar):
         """Convert Python value to BASIC value."""
-        return TYPE_TO_CLASS[typechar](None, self).from_value(python_val)
+        return self.new(typechar).from_value(python_val)
 
     def from_str_at(self, python_str, address):
         """Convert str to String at given address."""
@@ -226,8 +313,8 @@ class Values(object):
     def from_bool(self, boo):
         """Convert Python boolean to Integer."""
         if boo:
-            return numbers.Integer(None, self).from_bytes('\xff\xff')
-        return numbers.Integer(None, self)
+            return self.new_integer().from_bytes('\xff\xff')
+        return self.new_integer()
 
     ###########################################################################
     # convert to and from internal representation
@@ -235,7 +322,7 @@ class Values(object):
     def from_bytes(self, token_bytes):
         """Convert internal byte representation to BASIC value."""
         # make a copy, not a view
-        return SIZE_TO_CLASS[len(token_bytes)](None, self).from_bytes(token_bytes)
+        return self.new(SIZE_TO_TYPE[len(token_bytes)]).from_bytes(token_bytes)
 
     def from_token(self, token):
         """Convert number token to new Number temporary"""
@@ -243,11 +330,11 @@ class Values(object):
             raise ValueError('Token must not be empty')
         lead = bytes(token)[0]
         if lead == tk.T_SINGLE:
-            return numbers.Single(None, self).from_token(token)
+            return self.new_single().from_token(token)
         elif lead == tk.T_DOUBLE:
-            return numbers.Double(None, self).from_token(token)
+            return self.new_double().from_token(token)
         elif lead in tk.NUMBER:
-            return numbers.Integer(None, self).from_token(token)
+            return self.new_integer().from_token(token)
         raise ValueError('%s is not a number token' % repr(token))
 
     ###########################################################################
@@ -482,7 +569,7 @@ def neg(inp):
 def sgn_(args):
     """Sign."""
     x, = args
-    return numbers.Integer(None, x._values).from_int(pass_number(x).sign())
+    return x._values.new_integer().from_int(pass_number(x).sign())
 
 def int_(args):
     """Truncate towards negative infinity (INT)."""
@@ -500,37 +587,37 @@ def fix_(args):
 def sqr_(args):
     """Square root."""
     x, = args
-    return _call_float_function(math.sqrt, x)
+    return _call_cached_float_function(math.sqrt, x)
 
 def exp_(args):
     """Exponential."""
     x, = args
-    return _call_float_function(math.exp, x)
+    return _call_cached_float_function(math.exp, x)
 
 def sin_(args):
     """Sine."""
     x, = args
-    return _call_float_function(math.sin, x)
+    return _call_cached_float_function(math.sin, x)
 
 def cos_(args):
     """Cosine."""
     x, = args
-    return _call_float_function(math.cos, x)
+    return _call_cached_float_function(math.cos, x)
 
 def tan_(args):
     """Tangent."""
     x, = args
-    return _call_float_function(math.tan, x)
+    return _call_cached_float_function(math.tan, x)
 
 def atn_(args):
     """Inverse tangent."""
     x, = args
-    return _call_float_function(math.atan, x)
+    return _call_cached_float_function(math.atan, x)
 
 def log_(args):
     """Logarithm."""
     x, = args
-    return _call_float_function(math.log, x)
+    return _call_cached_float_function(math.log, x)
 
 
 ######################################################################
@@ -653,7 +740,7 @@ def instr_(args):
         big = pass_string(arg0)
     small = pass_string(next(args))
     list(args)
-    new_int = numbers.Integer(None, big._values)
+    new_int = big._values.new_integer()
     big = big.to_str()
     small = small.to_str()
     if big == '' or start > len(big):
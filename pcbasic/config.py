@@ -220,7 +220,7 @@ class Settings(object):
         u'interface': {
             u'type': u'string', u'default': u'',
             u'choices': (u'', u'none', u'cli', u'text', u'graphical',
-                        u'ansi', u'curses', u'pygame', u'sdl2'), },
+                        u'ansi', u'curses', u'pygame', u'sdl2', u'image'), },
         u'sound': {
             u'type': u'string', u'default': u'',
             u'choices': (u'', u'none', u'beep', u'portaudio', u'interface'), },
@@ -232,6 +232,7 @@ class Settings(object):
         u'exec': {u'type': u'string', u'default': u'', },
         u'quit': {u'type': u'bool', u'default': False,},
         u'double': {u'type': u'bool', u'default': False,},
+        u'fast-float': {u'type': u'bool', u'default': False,},
         u'max-files': {u'type': u'int', u'default': 3,},
         u'max-reclen': {u'type': u'int', u'default': 128,},
         u'serial-buffer-size': {u'type': u'int', u'default': 256,},
@@ -282,9 +283,13 @@ class Settings(object):
         u'max-memory': {u'type': u'int', u'list': -2, u'default': [65534, 4096]},
         u'allow-code-poke': {u'type': u'bool', u'default': False,},
         u'reserved-memory': {u'type': u'int', u'default': 3429,},
+        u'string-gc-budget': {u'type': u'int', u'default': 0,},
         u'caption': {u'type': u'string', u'default': NAME,},
         u'text-width': {u'type': u'int', u'choices':(40, 80), u'default': 80,},
         u'video-memory': {u'type': u'int', u'default': 262144,},
+        u'shared-pixels': {u'type': u'bool', u'default': False,},
+        u'capture': {u'type': u'string', u'default': u'',},
+        u'capture-rate': {u'type': u'int', u'default': 0,},
         u'shell': {u'type': u'string', u'default': u'',},
         u'ctrl-c-break': {u'type': u'bool', u'default': True,},
         u'wait': {u'type': u'bool', u'default': False,},
@@ -499,6 +504,8 @@ class Settings(object):
             'aspect_ratio': (3072, 2000) if self.get('video') == 'tandy' else (4, 3),
             'text_width': self.get('text-width'),
             'video_memory': self.get('video-memory'),
+            # interface reads the graphics pixel buffers directly
+            'shared_pixels': self.get('shared-pixels'),
             'low_intensity': cga_low,
             'font': data.read_fonts(codepage_dict, self.get('font'), warn=self.get('debug')),
             # inserted keystrokes
@@ -508,6 +515,8 @@ class Settings(object):
             'term': self.get('term'),
             'shell': self.get('shell'),
             'double': self.get('double'),
+            # native floating-point arithmetic; not bit-exact
+            'fast_float': self.get('fast-float'),
             # device settings
             'devices': device_params,
             'current_device': current_device,
@@ -531,6 +540,8 @@ class Settings(object):
             'max_files': self.get('max-files'),
             # first field buffer address (workspace size; 3429 for gw-basic)
             'reserved_memory': self.get('reserved-memory'),
+            # bytes moved in a bounded string garbage collection; 0 for full collections
+            'string_gc_budget': max(0, self.get('string-gc-budget')),
             'peek_values': peek_values,
             'extension': self.get('extension'),
             # ignore key buffer in console-based interfaces, to allow pasting text in console
@@ -553,6 +564,8 @@ class Settings(object):
             'mouse_clipboard': self.get('mouse-clipboard'),
             'icon': ICON,
             'wait': self.get('wait'),
+            'capture': self.get('capture'),
+            'capture_rate': self.get('capture-rate'),
             }
 
     def _get_audio_parameters(self):
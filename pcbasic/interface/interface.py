@@ -99,6 +99,17 @@ class Interface(object):
                     else:
                         # tiny delay; significantly reduces cpu load when playing audio or blinking
                         self._video.sleep(1)
+        self._log_stats()
+
+    def _log_stats(self):
+        """Write the video plugin's performance counters to the log."""
+        stats = self._video.get_stats()
+        if 'glyph_cache_hits' in stats:
+            lookups = stats['glyph_cache_hits'] + stats['glyph_cache_misses']
+            logging.debug(
+                'glyph cache: %d hits, %d misses, %d entries; %.1f%% hit rate',
+                stats['glyph_cache_hits'], stats['glyph_cache_misses'],
+                stats['glyph_cache_size'], 100. * stats['glyph_cache_hits'] / max(1, lookups))
 
     def pause(self, message):
         """Pause and wait for a key."""
@@ -21,9 +21,13 @@ class VideoPlugin(object):
         self.busy = False
         self._input_queue = input_queue
         self._video_queue = video_queue
+        # pixel buffer shared by the interpreter, if any
+        self._shared_pixels = None
+        self._pixel_generations = []
         self._handlers = {
             signals.VIDEO_SET_MODE: self.set_mode,
             signals.VIDEO_PUT_GLYPH: self.put_glyph,
+            signals.VIDEO_PUT_TEXT: self.put_text,
             signals.VIDEO_CLEAR_ROWS: self.clear_rows,
             signals.VIDEO_SCROLL_UP: self.scroll_up,
             signals.VIDEO_SCROLL_DOWN: self.scroll_down,
@@ -42,6 +46,7 @@ class VideoPlugin(object):
             signals.VIDEO_FILL_INTERVAL: self.fill_interval,
             signals.VIDEO_PUT_RECT: self.put_rect,
             signals.VIDEO_FILL_RECT: self.fill_rect,
+            signals.VIDEO_SHARE_PIXELS: self._share_pixels,
             signals.VIDEO_SET_CAPTION: self.set_caption_message,
             signals.VIDEO_SET_CLIPBOARD_TEXT: self.set_clipboard_text,
         }
@@ -53,6 +58,7 @@ class VideoPlugin(object):
         if self.alive:
             self._drain_queue()
         if self.alive:
+            self._sync_pixels()
             self._work()
             self._check_input()
 
@@ -60,6 +66,10 @@ class VideoPlugin(object):
         """Sleep a tick"""
         time.sleep(ms/1000.)
 
+    def get_stats(self):
+        """Return performance counters."""
+        return {}
+
     # private methods
 
     def _drain_queue(self):
@@ -75,11 +85,35 @@ class VideoPlugin(object):
                 # close thread
                 self.alive = False
             else:
+                if signal.event_type == signals.VIDEO_SET_MODE:
+                    # the old buffer doesn't fit the new mode; a new one follows if shared
+                    self._shared_pixels = None
                 try:
                     self._handlers[signal.event_type](*signal.params)
                 except KeyError:
                     pass
 
+    def _share_pixels(self, pixels):
+        """Read the interpreter's pixel buffer directly instead of receiving pixels."""
+        self._shared_pixels = pixels
+        if pixels:
+            self._pixel_generations = [None] * len(pixels.pages)
+
+    def _sync_pixels(self):
+        """Copy changed areas of the shared pixel buffer."""
+        if not self._shared_pixels:
+            return
+        for pagenum, page in enumerate(self._shared_pixels.pages):
+            # read the generation first, so that later changes are picked up next time
+            generation = page.generation
+            if generation == self._pixel_generations[pagenum]:
+                continue
+            self._pixel_generations[pagenum] = generation
+            dirty = page.take_dirty()
+            if dirty:
+                x0, y0, x1, y1 = dirty
+                self.put_rect(pagenum, x0, y0, x1, y1, page.buffer[y0:y1+1, x0:x1+1])
+
     # plugin overrides
 
     def __exit__(self, type, value, traceback):
@@ -142,6 +176,12 @@ class VideoPlugin(object):
     def put_glyph(self, pagenum, row, col, char, is_fullwidth, fore, back, blink, underline):
         """Put a character at a given position."""
 
+    def put_text(self, pagenum, row, col, glyphs):
+        """Put a run of characters on a row, given as a list of put_glyph arguments."""
+        for char, is_fullwidth, fore, back, blink, underline in glyphs:
+            self.put_glyph(pagenum, row, col, char, is_fullwidth, fore, back, blink, underline)
+            col += 2 if is_fullwidth else 1
+
     def build_glyphs(self, new_dict):
         """Build a dict of glyphs for use in text mode."""
 
@@ -0,0 +1,319 @@
+"""
+PC-BASIC - video_image.py
+Headless interface that renders frames to image files
+
+(c) 2013--2018 Rob Hagemans
+This file is released under the GNU GPL version 3 or later.
+"""
+
+import os
+import time
+import zlib
+import struct
+import signal
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .video import VideoPlugin
+from .base import video_plugins, InitFailed
+from . import window
+
+
+# maximum size of the coloured glyph cache
+GLYPH_CACHE_SIZE = 4096
+
+
+def write_png(outfile, rgb):
+    """Write a numpy array [y][x][rgb] of bytes to a PNG file."""
+    height, width, _ = rgb.shape
+    # each scanline starts with filter type 0 (no filtering)
+    scanlines = numpy.zeros((height, 1 + 3*width), dtype=numpy.uint8)
+    scanlines[:, 1:] = rgb.reshape((height, 3*width))
+    def _chunk(tag, data):
+        """PNG chunk with length and checksum."""
+        return (
+            struct.pack('>I', len(data)) + tag + data +
+            struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+    outfile.write(b'\x89PNG\r\n\x1a\n')
+    # 8 bits per channel, colour type 2 (truecolour)
+    outfile.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+    outfile.write(_chunk(b'IDAT', zlib.compress(scanlines.tostring())))
+    outfile.write(_chunk(b'IEND', b''))
+
+def write_raw(outfile, rgb):
+    """Write a numpy array [y][x][rgb] of bytes to a raw file of RGB triplets."""
+    outfile.write(rgb.astype(numpy.uint8).tostring())
+
+
+@video_plugins.register('image')
+class VideoImage(VideoPlugin):
+    """Headless interface that composes frames and writes them to image files."""
+
+    def __init__(
+            self, input_queue, video_queue, border_width=0, capture=u'', capture_rate=0,
+            **kwargs):
+        """Initialise headless interface."""
+        if not numpy:
+            raise InitFailed('Module `numpy` not found')
+        VideoPlugin.__init__(self, input_queue, video_queue)
+        # image file for the final frame; numbered frames are derived from its name
+        self._capture = capture
+        # minimum time between numbered frames in seconds; zero for no timed frames
+        self._frame_interval = 1. / capture_rate if capture_rate > 0 else 0
+        self._last_frame_time = 0
+        self._frame_number = 0
+        # a frame has been requested from outside, through SIGUSR1
+        self._frame_requested = False
+        self._old_handler = None
+        self._window_sizer = window.WindowSizer(0, 0, border_width=border_width)
+        self._border_attr = 0
+        # composite colour artifacts are active
+        self._composite = False
+        self._composite_cache = window.CompositeCache()
+        self._composite_palette = None
+        # rgb palette for the attributes of each blink state
+        self._palette = [numpy.zeros((256, 3), dtype=numpy.uint8)] * 2
+        # visible page has changed since the last frame
+        self._dirty = False
+        self._has_window = False
+        self.vpagenum, self.apagenum = 0, 0
+        self.num_fore_attrs = 16
+        # coloured glyph tiles by (code point, attribute, background)
+        self._glyph_cache = {}
+        self.glyph_dict = {}
+
+    def __enter__(self):
+        """Complete headless interface initialisation."""
+        # only the main thread can set signal handlers
+        if self._capture and hasattr(signal, 'SIGUSR1'):
+            try:
+                self._old_handler = signal.signal(signal.SIGUSR1, self._request_frame)
+            except ValueError:
+                logging.warning('Could not set signal handler for frame requests.')
+        return VideoPlugin.__enter__(self)
+
+    def __exit__(self, type, value, traceback):
+        """Write the final frame and close the headless interface."""
+        VideoPlugin.__exit__(self, type, value, traceback)
+        if self._old_handler is not None:
+            signal.signal(signal.SIGUSR1, self._old_handler)
+        if self._capture and self._has_window:
+            self.save_frame(self._capture)
+
+    def _request_frame(self, signum, frame):
+        """Signal handler: write a numbered frame on the next cycle."""
+        self._frame_requested = True
+
+    def _work(self):
+        """Write numbered frames if requested or due."""
+        if not self._has_window:
+            return
+        if self._frame_requested:
+            self._frame_requested = False
+            self._save_numbered_frame()
+        elif self._frame_interval and self._dirty:
+            tock = time.time()
+            if tock - self._last_frame_time >= self._frame_interval:
+                self._last_frame_time = tock
+                self._save_numbered_frame()
+
+    def _save_numbered_frame(self):
+        """Write the current frame to a numbered file."""
+        self._frame_number += 1
+        root, ext = os.path.splitext(self._capture)
+        self.save_frame(u'%s-%04d%s' % (root, self._frame_number, ext))
+
+    def save_frame(self, name):
+        """Write the current frame to a PNG file, or a raw RGB file for other extensions."""
+        rgb = self.compose_frame()
+        writer = write_png if name.lower().endswith(u'.png') else write_raw
+        try:
+            with open(name, 'wb') as outfile:
+                writer(outfile, rgb)
+        except EnvironmentError as e:
+            logging.warning(u'Could not write frame to %s: %s', name, e.strerror)
+        self._dirty = False
+
+    def compose_frame(self):
+        """Compose the visible page with border as a numpy array [y][x][rgb] of bytes."""
+        canvas = self.pixels[self.vpagenum]
+        if self._composite:
+            canvas = self._composite_cache.get(self.vpagenum, canvas, 4//self.bitsperpixel)
+            palette = self._composite_palette
+        else:
+            # the cursor and blinking are not drawn, so that frames are reproducible
+            palette = self._palette[0]
+        border_x, border_y = self._window_sizer.border_start()
+        canvas_width, canvas_height = self.size
+        work = numpy.full(
+                (canvas_width + 2*border_x, canvas_height + 2*border_y),
+                self._border_attr, dtype=numpy.uint8)
+        work[border_x:border_x+canvas_width, border_y:border_y+canvas_height] = canvas
+        # canvas is [x][y]; images are stored by row
+        return palette[work.T]
+
+    def _mark_dirty(self, pagenum, y0, y1):
+        """Record a changed range of rows of a page; bounds are exclusive."""
+        self._composite_cache.mark_dirty(pagenum, y0, y1)
+        if pagenum == self.vpagenum:
+            self._dirty = True
+
+    # signal handlers
+
+    def set_mode(self, mode_info):
+        """Initialise a given text or graphics mode."""
+        self.text_mode = mode_info.is_text_mode
+        self.font_height = mode_info.font_height
+        self.font_width = mode_info.font_width
+        # glyphs in [x][y] format, like the pages
+        self.glyph_dict = {u'\0': numpy.zeros((self.font_width, self.font_height))}
+        self._glyph_cache.clear()
+        self.num_pages = mode_info.num_pages
+        if not self.text_mode:
+            self.bitsperpixel = mode_info.bitsperpixel
+        self._composite_cache.reset()
+        self.size = (mode_info.pixel_width, mode_info.pixel_height)
+        self._window_sizer.size = self.size
+        self.pixels = [numpy.zeros(self.size, dtype=numpy.uint8) for _ in range(self.num_pages)]
+        self._has_window = True
+        self._dirty = True
+
+    def set_palette(self, rgb_palette_0, rgb_palette_1):
+        """Build the palette."""
+        self.num_fore_attrs = min(16, len(rgb_palette_0))
+        num_back_attrs = min(8, self.num_fore_attrs)
+        rgb_palette_1 = rgb_palette_1 or rgb_palette_0
+        # bottom 128 are non-blink, top 128 blink to background
+        show_palette_0 = rgb_palette_0[:self.num_fore_attrs] * (256//self.num_fore_attrs)
+        show_palette_1 = rgb_palette_1[:self.num_fore_attrs] * (128//self.num_fore_attrs)
+        for b in rgb_palette_1[:num_back_attrs] * (128 // self.num_fore_attrs // num_back_attrs):
+            show_palette_1 += [b]*self.num_fore_attrs
+        self._palette = [
+            numpy.array(show_palette_0, dtype=numpy.uint8),
+            numpy.array(show_palette_1, dtype=numpy.uint8)]
+        self._dirty = True
+
+    def set_border_attr(self, attr):
+        """Change the border attribute."""
+        self._border_attr = attr
+        self._dirty = True
+
+    def set_composite(self, on, composite_colors):
+        """Enable/disable composite artifacts."""
+        if on:
+            self._composite_palette = numpy.zeros((256, 3), dtype=numpy.uint8)
+            self._composite_palette[:len(composite_colors)] = composite_colors
+        self._composite = on
+        self._dirty = True
+
+    def clear_rows(self, back_attr, start, stop):
+        """Clear a range of screen rows."""
+        y0, y1 = (start-1)*self.font_height, stop*self.font_height
+        self.pixels[self.apagenum][:, y0:y1] = back_attr
+        self._mark_dirty(self.apagenum, y0, y1)
+
+    def set_page(self, vpage, apage):
+        """Set the visible and active page."""
+        self.vpagenum, self.apagenum = vpage, apage
+        self._dirty = True
+
+    def copy_page(self, src, dst):
+        """Copy source to destination page."""
+        self.pixels[dst][:] = self.pixels[src]
+        self._mark_dirty(dst, 0, self.size[1])
+
+    def scroll_up(self, from_line, scroll_height, back_attr):
+        """Scroll the screen up between from_line and scroll_height."""
+        pixels = self.pixels[self.apagenum]
+        new_y0, new_y1 = (from_line-1)*self.font_height, (scroll_height-1)*self.font_height
+        old_y0, old_y1 = from_line*self.font_height, scroll_height*self.font_height
+        pixels[:, new_y0:new_y1] = pixels[:, old_y0:old_y1]
+        pixels[:, new_y1:old_y1] = back_attr
+        self._mark_dirty(self.apagenum, new_y0, old_y1)
+
+    def scroll_down(self, from_line, scroll_height, back_attr):
+        """Scroll the screen down between from_line and scroll_height."""
+        pixels = self.pixels[self.apagenum]
+        old_y0, old_y1 = (from_line-1)*self.font_height, (scroll_height-1)*self.font_height
+        new_y0, new_y1 = from_line*self.font_height, scroll_height*self.font_height
+        pixels[:, new_y0:new_y1] = pixels[:, old_y0:old_y1]
+        pixels[:, old_y0:new_y0] = back_attr
+        self._mark_dirty(self.apagenum, old_y0, new_y1)
+
+    def put_glyph(self, pagenum, row, col, cp, is_fullwidth, fore, back, blink, underline):
+        """Put a character at a given position."""
+        if not self.text_mode:
+            # in graphics mode, a put_rect call does the actual drawing
+            return
+        attr = fore + self.num_fore_attrs*back + 128*blink
+        x0, y0 = (col-1)*self.font_width, (row-1)*self.font_height
+        try:
+            tile = self._glyph_cache[(cp, attr, back)]
+        except KeyError:
+            tile = self._build_tile(cp, attr, back)
+            if tile is None:
+                return
+        glyph_width = tile.shape[0]
+        self.pixels[pagenum][x0:x0+glyph_width, y0:y0+self.font_height] = tile
+        if underline:
+            self.pixels[pagenum][x0:x0+glyph_width, y0+self.font_height-1] = attr
+        self._mark_dirty(pagenum, y0, y0 + self.font_height)
+
+    def _build_tile(self, cp, attr, back):
+        """Colour a glyph and keep it in the glyph cache."""
+        try:
+            glyph = self.glyph_dict[cp]
+        except KeyError:
+            logging.warning('No glyph received for code point %s', hex(ord(cp)))
+            try:
+                glyph = self.glyph_dict['\0']
+            except KeyError:
+                logging.error('No glyph received for code point 0')
+                return None
+            # don't cache the replacement, the glyph may still arrive
+            return glyph*(attr-back) + back
+        tile = (glyph*(attr-back) + back).astype(numpy.uint8)
+        if len(self._glyph_cache) >= GLYPH_CACHE_SIZE:
+            self._glyph_cache.clear()
+        self._glyph_cache[(cp, attr, back)] = tile
+        return tile
+
+    def build_glyphs(self, new_dict):
+        """Build a dict of glyphs for use in text mode."""
+        # redefined glyphs invalidate their coloured tiles
+        if any(char in self.glyph_dict for char in new_dict):
+            self._glyph_cache.clear()
+        for char, glyph in new_dict.iteritems():
+            # transpose to the [x][y] format of the pages
+            self.glyph_dict[char] = numpy.asarray(glyph).T
+
+    def put_pixel(self, pagenum, x, y, index):
+        """Put a pixel on the screen; callback to empty character buffer."""
+        self.pixels[pagenum][x, y] = index
+        self._mark_dirty(pagenum, y, y+1)
+
+    def fill_rect(self, pagenum, x0, y0, x1, y1, index):
+        """Fill a rectangle in a solid attribute."""
+        self.pixels[pagenum][x0:x1+1, y0:y1+1] = index
+        self._mark_dirty(pagenum, y0, y1+1)
+
+    def fill_interval(self, pagenum, x0, x1, y, index):
+        """Fill a scanline interval in a solid attribute."""
+        self.pixels[pagenum][x0:x1+1, y] = index
+        self._mark_dirty(pagenum, y, y+1)
+
+    def put_interval(self, pagenum, x, y, colours):
+        """Write a list of attributes to a scanline interval."""
+        self.pixels[pagenum][x:x+len(colours), y] = colours
+        self._mark_dirty(pagenum, y, y+1)
+
+    def put_rect(self, pagenum, x0, y0, x1, y1, array):
+        """Apply numpy array [y][x] of attribytes to an area."""
+        if (x1 < x0) or (y1 < y0):
+            return
+        self.pixels[pagenum][x0:x1+1, y0:y1+1] = numpy.array(array).T
+        self._mark_dirty(pagenum, y0, y1+1)
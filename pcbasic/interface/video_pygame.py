@@ -35,6 +35,8 @@ BLINK_CYCLES = 5
 # ms duration of a blink
 BLINK_TIME = 120
 CYCLE_TIME = BLINK_TIME // BLINK_CYCLES
+# maximum number of coloured glyph surfaces kept
+GLYPH_CACHE_SIZE = 4096
 
 
 @video_plugins.register('pygame')
@@ -110,6 +112,10 @@ class VideoPygame(VideoPlugin):
         # fonts
         # prebuilt glyphs
         self.glyph_dict = {}
+        # glyph surfaces with palette set, by (code point, attribute, background)
+        self._glyph_cache = {}
+        self.glyph_cache_hits = 0
+        self.glyph_cache_misses = 0
         # joystick and mouse
         # available joysticks
         self.joysticks = []
@@ -168,6 +174,14 @@ class VideoPygame(VideoPlugin):
         # put environment variables back as they were
         self._env.close()
 
+    def get_stats(self):
+        """Return glyph cache counters."""
+        return {
+            'glyph_cache_hits': self.glyph_cache_hits,
+            'glyph_cache_misses': self.glyph_cache_misses,
+            'glyph_cache_size': len(self._glyph_cache),
+        }
+
     def _set_icon(self, mask):
         """Set the window icon."""
         height, width = len(mask), len(mask[0])
@@ -570,24 +584,45 @@ class VideoPygame(VideoPlugin):
             self.canvas[pagenum].fill(bg, (x0, y0, self.font_width, self.font_height))
         else:
             try:
-                glyph = self.glyph_dict[cp]
+                glyph = self._glyph_cache[(cp, color, bg)]
+                self.glyph_cache_hits += 1
             except KeyError:
-                if '\0' not in self.glyph_dict:
-                    logging.error('No glyph received for code point 0')
+                glyph = self._build_tile(cp, color, bg)
+                if glyph is None:
                     return
-                logging.warning('No glyph received for code point %s', hex(ord(cp)))
-                glyph = self.glyph_dict['\0']
-            if glyph.get_palette_at(0) != bg:
-                glyph.set_palette_at(0, bg)
-            if glyph.get_palette_at(1) != color:
-                glyph.set_palette_at(1, color)
             self.canvas[pagenum].blit(glyph, (x0, y0))
         if underline:
             self.canvas[pagenum].fill(color, (x0, y0 + self.font_height - 1, self.font_width, 1))
         self.busy = True
 
+    def _build_tile(self, cp, color, bg):
+        """Colour a glyph and keep it in the glyph cache."""
+        self.glyph_cache_misses += 1
+        try:
+            glyph = self.glyph_dict[cp]
+        except KeyError:
+            if '\0' not in self.glyph_dict:
+                logging.error('No glyph received for code point 0')
+                return None
+            logging.warning('No glyph received for code point %s', hex(ord(cp)))
+            glyph = self.glyph_dict['\0']
+            # don't cache the replacement, the glyph may still arrive
+            glyph.set_palette_at(0, bg)
+            glyph.set_palette_at(1, color)
+            return glyph
+        tile = glyph.copy()
+        tile.set_palette_at(0, bg)
+        tile.set_palette_at(1, color)
+        if len(self._glyph_cache) >= GLYPH_CACHE_SIZE:
+            self._glyph_cache.clear()
+        self._glyph_cache[(cp, color, bg)] = tile
+        return tile
+
     def build_glyphs(self, new_dict):
         """Build a dict of glyphs for use in text mode."""
+        # redefined glyphs invalidate their coloured surfaces
+        if any(char in self.glyph_dict for char in new_dict):
+            self._glyph_cache.clear()
         for char, glyph in new_dict.iteritems():
             self.glyph_dict[char] = glyph_to_surface(glyph)
 
@@ -80,6 +80,10 @@ BLINK_CYCLES = 5
 # ms duration of a blink
 BLINK_TIME = 120
 CYCLE_TIME = BLINK_TIME // BLINK_CYCLES
+# maximum number of separate dirty rectangles before they are merged into one
+MAX_DIRTY_RECTS = 64
+# maximum number of coloured glyph tiles kept
+GLYPH_CACHE_SIZE = 4096
 
 
 ###############################################################################
@@ -420,9 +424,24 @@ class VideoSDL2(VideoPlugin):
         # palette and colours
         # composite colour artifacts are active
         self._composite = False
+        # artifacted pages, updated for changed rows only
+        self._composite_cache = window.CompositeCache()
         # update cycle
         self._cycle = 0
         self._last_tick = 0
+        self.blink_state = 0
+        # changed areas of the visible page as (x0, y0, x1, y1) with exclusive bounds
+        # a full redraw is done if busy is set
+        self._dirty_rects = []
+        # cursor has moved or blinked
+        self._cursor_dirty = False
+        # converted copy of the work surface, for partial updates
+        self._conv = None
+        # coloured glyph tiles by (code point, attribute, background)
+        # these hold attribute indices, so they remain valid when the palette changes
+        self._glyph_cache = {}
+        self.glyph_cache_hits = 0
+        self.glyph_cache_misses = 0
         # cursor
         # current cursor location
         self._last_row, self._last_col = 1, 1
@@ -513,6 +532,7 @@ class VideoSDL2(VideoPlugin):
             for s in self.canvas:
                 sdl2.SDL_FreeSurface(s)
             sdl2.SDL_FreeSurface(self._work_surface)
+            sdl2.SDL_FreeSurface(self._conv)
             sdl2.SDL_FreeSurface(self.overlay)
             # free palettes
             for p in self._palette + self._saved_palette:
@@ -522,6 +542,14 @@ class VideoSDL2(VideoPlugin):
             # close SDL2
             sdl2.SDL_Quit()
 
+    def get_stats(self):
+        """Return glyph cache counters."""
+        return {
+            'glyph_cache_hits': self.glyph_cache_hits,
+            'glyph_cache_misses': self.glyph_cache_misses,
+            'glyph_cache_size': len(self._glyph_cache),
+        }
+
     def _set_icon(self):
         """Set the icon on the SDL window."""
         mask = numpy.array(self._icon).T.repeat(2, 0).repeat(2, 1)
@@ -548,6 +576,7 @@ class VideoSDL2(VideoPlugin):
         self._set_icon()
         self._display_surface = sdl2.SDL_GetWindowSurface(self._display)
         self._window_sizer.window_size = width, height
+        self._free_conv()
         self.busy = True
 
 
@@ -753,30 +782,64 @@ class VideoSDL2(VideoPlugin):
         """Check screen and blink events; update screen if necessary."""
         if not self._has_window:
             return
+        last_blink_state = self.blink_state
         self.blink_state = 0
         if self.mode_has_blink:
             self.blink_state = 0 if self._cycle < BLINK_CYCLES * 2 else 1
             if self._cycle % BLINK_CYCLES == 0:
-                self.busy = True
+                # blinking characters only need a redraw if there are any on screen
+                if self.blink_state != last_blink_state and self._has_blinking_chars():
+                    self.busy = True
+                else:
+                    self._cursor_dirty = True
         if self._cursor_visible and (
                 (self.cursor_row != self._last_row) or (self.cursor_col != self._last_col)):
-            self.busy = True
+            self._cursor_dirty = True
         tock = sdl2.SDL_GetTicks()
         if tock - self._last_tick >= CYCLE_TIME:
             self._last_tick = tock
             self._cycle += 1
             if self._cycle == BLINK_CYCLES * 4:
                 self._cycle = 0
-            if self.busy:
-                self._do_flip()
-                self.busy = False
+            if self.busy or self._smooth or self._clipboard_interface.active():
+                # these need a full redraw, if anything changed
+                if self.busy or self._dirty_rects or self._cursor_dirty:
+                    self._do_flip()
+            elif self._dirty_rects or self._cursor_dirty:
+                self._do_flip_rects()
+            self.busy = False
+            self._cursor_dirty = False
+            self._dirty_rects = []
+
+    def _has_blinking_chars(self):
+        """Check if the visible page may have any blinking attributes."""
+        # in graphics modes, blinking is implemented through the palette
+        return not self.text_mode or (self.pixels[self.vpagenum] >= 128).any()
+
+    def _mark_dirty(self, pagenum, x0, y0, x1, y1):
+        """Record a changed area of a page; bounds are exclusive."""
+        self._composite_cache.mark_dirty(pagenum, y0, y1)
+        if pagenum != self.vpagenum:
+            return
+        self._dirty_rects.append((x0, y0, x1, y1))
+        if len(self._dirty_rects) > MAX_DIRTY_RECTS:
+            # too many small rects: replace with their bounding box
+            x0s, y0s, x1s, y1s = zip(*self._dirty_rects)
+            self._dirty_rects = [(min(x0s), min(y0s), max(x1s), max(y1s))]
+
+    def _mark_cursor_cells(self):
+        """Record the old and new cursor cells as changed."""
+        width = max(self.cursor_width, self.font_width)
+        for row, col in ((self._last_row, self._last_col), (self.cursor_row, self.cursor_col)):
+            left, top = (col-1) * self.font_width, (row-1) * self.font_height
+            self._mark_dirty(self.vpagenum, left, top, left + width, top + self.font_height)
 
     def _do_flip(self):
         """Draw the canvas to the screen."""
         sdl2.SDL_FillRect(self._work_surface, None, self._border_attr)
         if self._composite:
-            self._work_pixels[:] = window.apply_composite_artifacts(
-                            self.pixels[self.vpagenum], 4//self.bitsperpixel)
+            self._work_pixels[:] = self._composite_cache.get(
+                            self.vpagenum, self.pixels[self.vpagenum], 4//self.bitsperpixel)
         else:
             self._work_pixels[:] = self.pixels[self.vpagenum]
         sdl2.SDL_SetSurfacePalette(self._work_surface, self._palette[self.blink_state])
@@ -815,6 +878,56 @@ class VideoSDL2(VideoPlugin):
         # destroy the temporary surface
         sdl2.SDL_FreeSurface(conv)
 
+    def _do_flip_rects(self):
+        """Draw the changed areas of the canvas to the screen."""
+        canvas_width, canvas_height = self.size
+        canvas = self.pixels[self.vpagenum]
+        if self._composite:
+            # artifacts are computed for groups of pixels, so rects must cover whole groups
+            group = 4 // self.bitsperpixel
+            canvas = self._composite_cache.get(self.vpagenum, canvas, group)
+        else:
+            group = 1
+        # the cursor is drawn on the work surface, so its old and new cells must be refreshed
+        if self._cursor_visible and self.vpagenum == self.apagenum:
+            self._mark_cursor_cells()
+        rects = []
+        for x0, y0, x1, y1 in self._dirty_rects:
+            # add a one-pixel margin to hide rounding differences in scaling
+            x0, y0 = max(0, x0-1), max(0, y0-1)
+            x1, y1 = min(canvas_width, x1+1), min(canvas_height, y1+1)
+            x0, x1 = x0 - x0 % group, min(canvas_width, -(-x1 // group) * group)
+            if x1 > x0 and y1 > y0:
+                self._work_pixels[x0:x1, y0:y1] = canvas[x0:x1, y0:y1]
+                rects.append((x0, y0, x1, y1))
+        if not rects:
+            return
+        sdl2.SDL_SetSurfacePalette(self._work_surface, self._palette[self.blink_state])
+        self._show_cursor(True)
+        pixelformat = self._display_surface.contents.format
+        if not self._conv:
+            self._conv = sdl2.SDL_ConvertSurface(self._work_surface, pixelformat, 0)
+        work_width, work_height = self._work_surface.contents.w, self._work_surface.contents.h
+        display_width = self._display_surface.contents.w
+        display_height = self._display_surface.contents.h
+        update_rects = (sdl2.SDL_Rect * len(rects))()
+        for i, (x0, y0, x1, y1) in enumerate(rects):
+            x0, x1 = x0 + self.border_x, x1 + self.border_x
+            y0, y1 = y0 + self.border_y, y1 + self.border_y
+            # convert the 8-bit area to the display surface format
+            sdl2.SDL_BlitSurface(
+                    self._work_surface, sdl2.SDL_Rect(x0, y0, x1-x0, y1-y0),
+                    self._conv, sdl2.SDL_Rect(x0, y0, x1-x0, y1-y0))
+            # scale onto the display, rounding outwards
+            dx0, dy0 = x0 * display_width // work_width, y0 * display_height // work_height
+            dx1 = -(-x1 * display_width // work_width)
+            dy1 = -(-y1 * display_height // work_height)
+            sdl2.SDL_BlitScaled(
+                    self._conv, sdl2.SDL_Rect(x0, y0, x1-x0, y1-y0),
+                    self._display_surface, sdl2.SDL_Rect(dx0, dy0, dx1-dx0, dy1-dy0))
+            update_rects[i] = sdl2.SDL_Rect(dx0, dy0, dx1-dx0, dy1-dy0)
+        sdl2.SDL_UpdateWindowSurfaceRects(self._display, update_rects, len(rects))
+
     def _show_cursor(self, do_show):
         """Draw or remove the cursor on the visible page."""
         if not self._cursor_visible or self.vpagenum != self.apagenum:
@@ -844,6 +957,11 @@ class VideoSDL2(VideoPlugin):
         self._last_row = self.cursor_row
         self._last_col = self.cursor_col
 
+    def _free_conv(self):
+        """Discard the converted work surface, e.g. if the display surface has changed."""
+        sdl2.SDL_FreeSurface(self._conv)
+        self._conv = None
+
     def _resize_display(self, width, height):
         """Change the display size."""
         maximised = sdl2.SDL_GetWindowFlags(self._display) & sdl2.SDL_WINDOW_MAXIMIZED
@@ -866,6 +984,7 @@ class VideoSDL2(VideoPlugin):
         sdl2.SDL_GetWindowSize(self._display, ctypes.byref(w), ctypes.byref(h))
         self._window_sizer.window_size = w.value, h.value
         self._display_surface = sdl2.SDL_GetWindowSurface(self._display)
+        self._free_conv()
         self.busy = True
 
 
@@ -881,10 +1000,12 @@ class VideoSDL2(VideoPlugin):
         # prebuilt glyphs
         # NOTE: [x][y] format - change this if we change _pixels2d
         self.glyph_dict = {u'\0': numpy.zeros((self.font_width, self.font_height))}
+        self._glyph_cache.clear()
         self.num_pages = mode_info.num_pages
         self.mode_has_blink = mode_info.has_blink
         if not self.text_mode:
             self.bitsperpixel = mode_info.bitsperpixel
+        self._composite_cache.reset()
         # logical size
         self.size = (mode_info.pixel_width, mode_info.pixel_height)
         self._window_sizer.size = self.size
@@ -910,6 +1031,8 @@ class VideoSDL2(VideoPlugin):
         pixelformat = self._display_surface.contents.format
         self.overlay = sdl2.SDL_ConvertSurface(self._work_surface, pixelformat, 0)
         sdl2.SDL_SetSurfaceBlendMode(self.overlay, sdl2.SDL_BLENDMODE_ADD)
+        # converted work surface is created on the first partial update
+        self._free_conv()
         # initialise clipboard
         self._clipboard_interface = clipboard.ClipboardInterface(
                 self._clipboard_handler, self._input_queue,
@@ -969,7 +1092,8 @@ class VideoSDL2(VideoPlugin):
         scroll_area = sdl2.SDL_Rect(
                 0, (start-1)*self.font_height, self.size[0], (stop-start+1)*self.font_height)
         sdl2.SDL_FillRect(self.canvas[self.apagenum], scroll_area, back_attr)
-        self.busy = True
+        self._mark_dirty(self.apagenum,
+                0, (start-1)*self.font_height, self.size[0], stop*self.font_height)
 
     def set_page(self, vpage, apage):
         """Set the visible and active page."""
@@ -981,7 +1105,7 @@ class VideoSDL2(VideoPlugin):
         self.pixels[dst][:] = self.pixels[src][:]
         # alternative:
         # sdl2.SDL_BlitSurface(self.canvas[src], None, self.canvas[dst], None)
-        self.busy = True
+        self._mark_dirty(dst, 0, 0, self.size[0], self.size[1])
 
     def show_cursor(self, cursor_on):
         """Change visibility of cursor."""
@@ -1005,7 +1129,7 @@ class VideoSDL2(VideoPlugin):
         old_y0, old_y1 = from_line*self.font_height, scroll_height*self.font_height
         pixels[x0:x1, new_y0:new_y1] = pixels[x0:x1, old_y0:old_y1]
         pixels[x0:x1, new_y1:old_y1] = numpy.full((x1-x0, old_y1-new_y1), back_attr, dtype=int)
-        self.busy = True
+        self._mark_dirty(self.apagenum, x0, new_y0, x1, old_y1)
 
     def scroll_down(self, from_line, scroll_height, back_attr):
         """Scroll the screen down between from_line and scroll_height."""
@@ -1016,7 +1140,7 @@ class VideoSDL2(VideoPlugin):
         new_y0, new_y1 = from_line*self.font_height, scroll_height*self.font_height
         pixels[x0:x1, new_y0:new_y1] = pixels[x0:x1, old_y0:old_y1]
         pixels[x0:x1, old_y0:new_y0] = numpy.full((x1-x0, new_y0-old_y0), back_attr, dtype=int)
-        self.busy = True
+        self._mark_dirty(self.apagenum, x0, old_y0, x1, new_y1)
 
     def put_glyph(self, pagenum, row, col, cp, is_fullwidth, fore, back, blink, underline):
         """Put a character at a given position."""
@@ -1025,32 +1149,49 @@ class VideoSDL2(VideoPlugin):
             return
         attr = fore + self.num_fore_attrs*back + 128*blink
         x0, y0 = (col-1)*self.font_width, (row-1)*self.font_height
-        # NOTE: in pygame plugin we used a surface fill for the NUL character
-        # which was an optimisation early on -- consider if we need speedup.
         try:
-            glyph = self.glyph_dict[cp]
+            tile = self._glyph_cache[(cp, attr, back)]
+            self.glyph_cache_hits += 1
         except KeyError:
-            logging.warning('No glyph received for code point %s', hex(ord(cp)))
-            try:
-                glyph = self.glyph_dict['\0']
-            except KeyError:
-                logging.error('No glyph received for code point 0')
+            tile = self._build_tile(cp, attr, back)
+            if tile is None:
                 return
         # _pixels2d uses column-major mode and hence [x][y] indexing (we can change this)
-        glyph_width = glyph.shape[0]
-        # changle glyph color by numpy scalar mult (is there a better way?)
-        self.pixels[pagenum][
-            x0:x0+glyph_width, y0:y0+self.font_height] = (
-                                                    glyph*(attr-back) + back)
+        glyph_width = tile.shape[0]
+        self.pixels[pagenum][x0:x0+glyph_width, y0:y0+self.font_height] = tile
         if underline:
             sdl2.SDL_FillRect(
                 self.canvas[self.apagenum],
                 sdl2.SDL_Rect(x0, y0 + self.font_height - 1, glyph_width, 1),
                 attr)
-        self.busy = True
+        self._mark_dirty(pagenum, x0, y0, x0 + glyph_width, y0 + self.font_height)
+
+    def _build_tile(self, cp, attr, back):
+        """Colour a glyph and keep it in the glyph cache."""
+        self.glyph_cache_misses += 1
+        try:
+            glyph = self.glyph_dict[cp]
+        except KeyError:
+            logging.warning('No glyph received for code point %s', hex(ord(cp)))
+            try:
+                glyph = self.glyph_dict['\0']
+            except KeyError:
+                logging.error('No glyph received for code point 0')
+                return None
+            # don't cache the replacement, the glyph may still arrive
+            return glyph*(attr-back) + back
+        # changle glyph color by numpy scalar mult (is there a better way?)
+        tile = (glyph*(attr-back) + back).astype(numpy.uint8)
+        if len(self._glyph_cache) >= GLYPH_CACHE_SIZE:
+            self._glyph_cache.clear()
+        self._glyph_cache[(cp, attr, back)] = tile
+        return tile
 
     def build_glyphs(self, new_dict):
         """Build a dict of glyphs for use in text mode."""
+        # redefined glyphs invalidate their coloured tiles
+        if any(char in self.glyph_dict for char in new_dict):
+            self._glyph_cache.clear()
         for char, glyph in new_dict.iteritems():
             # transpose because _pixels2d uses column-major mode and hence [x][y] indexing
             # (we can change this)
@@ -1065,25 +1206,25 @@ class VideoSDL2(VideoPlugin):
     def put_pixel(self, pagenum, x, y, index):
         """Put a pixel on the screen; callback to empty character buffer."""
         self.pixels[pagenum][x, y] = index
-        self.busy = True
+        self._mark_dirty(pagenum, x, y, x+1, y+1)
 
     def fill_rect(self, pagenum, x0, y0, x1, y1, index):
         """Fill a rectangle in a solid attribute."""
         rect = sdl2.SDL_Rect(x0, y0, x1-x0+1, y1-y0+1)
         sdl2.SDL_FillRect(self.canvas[pagenum], rect, index)
-        self.busy = True
+        self._mark_dirty(pagenum, x0, y0, x1+1, y1+1)
 
     def fill_interval(self, pagenum, x0, x1, y, index):
         """Fill a scanline interval in a solid attribute."""
         rect = sdl2.SDL_Rect(x0, y, x1-x0+1, 1)
         sdl2.SDL_FillRect(self.canvas[pagenum], rect, index)
-        self.busy = True
+        self._mark_dirty(pagenum, x0, y, x1+1, y+1)
 
     def put_interval(self, pagenum, x, y, colours):
         """Write a list of attributes to a scanline interval."""
         # reference the interval on the canvas
         self.pixels[pagenum][x:x+len(colours), y] = numpy.array(colours).astype(int)
-        self.busy = True
+        self._mark_dirty(pagenum, x, y, x+len(colours), y+1)
 
     def put_rect(self, pagenum, x0, y0, x1, y1, array):
         """Apply numpy array [y][x] of attribytes to an area."""
@@ -1091,4 +1232,4 @@ class VideoSDL2(VideoPlugin):
             return
         # reference the destination area
         self.pixels[pagenum][x0:x1+1, y0:y1+1] = numpy.array(array).T
-        self.busy = True
+        self._mark_dirty(pagenum, x0, y0, x1+1, y1+1)
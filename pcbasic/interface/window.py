@@ -34,6 +34,45 @@ def apply_composite_artifacts(src_array, pixels=4):
     return numpy.repeat(s[0], pixels, axis=0)
 
 
+class CompositeCache(object):
+    """Composite colour artifacts of canvas pages, recomputed only for changed rows."""
+
+    def __init__(self):
+        """Initialise the cache."""
+        # artifacted copies of the pages, [x][y]
+        self._pages = {}
+        # rows changed since the last update, as (y0, y1) with exclusive bound
+        self._dirty = {}
+
+    def reset(self):
+        """Forget all pages, e.g. on a mode change."""
+        self._pages = {}
+        self._dirty = {}
+
+    def mark_dirty(self, pagenum, y0, y1):
+        """Record changed rows of a page; bounds are exclusive."""
+        if pagenum not in self._pages:
+            return
+        if pagenum in self._dirty:
+            old_y0, old_y1 = self._dirty[pagenum]
+            y0, y1 = min(y0, old_y0), max(y1, old_y1)
+        self._dirty[pagenum] = y0, y1
+
+    def get(self, pagenum, src_array, pixels=4):
+        """Get the artifacted page, updating the rows that have changed."""
+        result = self._pages.get(pagenum)
+        if result is None or result.shape != src_array.shape:
+            result = self._pages[pagenum] = apply_composite_artifacts(src_array, pixels)
+            self._dirty.pop(pagenum, None)
+        elif pagenum in self._dirty:
+            # artifacts only extend along a row, so rows can be updated separately
+            y0, y1 = self._dirty.pop(pagenum)
+            y0, y1 = max(0, y0), min(src_array.shape[1], y1)
+            if y1 > y0:
+                result[:, y0:y1] = apply_composite_artifacts(src_array[:, y0:y1], pixels)
+        return result
+
+
 class WindowSizer(object):
     """Graphical video plugin, base class."""
 
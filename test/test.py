@@ -13,6 +13,7 @@ import filecmp
 import contextlib
 import traceback
 import time
+import unittest
 from copy import copy, deepcopy
 
 
@@ -50,6 +51,7 @@ def suppress_stdio(do_suppress):
 
 args = sys.argv[1:]
 basedir = os.path.join('.', 'correctness')
+unitdir = os.path.join('.', 'unit')
 
 do_suppress = '--loud' not in args
 
@@ -66,7 +68,15 @@ if '--coverage' in args:
 else:
     cov = None
 
-if not args or '--all' in args:
+try:
+    args.remove('--unit')
+    do_unit = True
+except ValueError:
+    do_unit = False
+
+if (not args and not do_unit) or '--all' in args:
+    # the full set includes the unit tests
+    do_unit = True
     args = [f for f in sorted(os.listdir(basedir))
             if os.path.isdir(os.path.join(basedir, f)) and os.path.isdir(os.path.join(basedir, f, 'model'))]
 
@@ -168,6 +178,27 @@ for name in args:
         shutil.rmtree(output_dir)
     numtests += 1
 
+numunit = 0
+unitfailed = []
+if do_unit:
+    os.chdir(startdir)
+    os.environ = deepcopy(save_env)
+    sys.path = copy(pythonpath)
+    print '\033[00;37mRunning \033[01munit tests \033[00;37m.. ',
+    sys.stdout.flush()
+    suite = unittest.defaultTestLoader.discover(os.path.abspath(unitdir), top_level_dir=os.path.abspath('.'))
+    result = unittest.TestResult()
+    with suppress_stdio(do_suppress):
+        suite.run(result)
+    numunit = result.testsRun
+    if result.errors or result.failures:
+        print '\033[01;31mfailed.\033[00;37m'
+        for test, trace in result.errors + result.failures:
+            print '    %s: %s' % (test.id(), trace.strip().splitlines()[-1])
+            unitfailed.append(test.id())
+    else:
+        print '\033[00;32mpassed.\033[00;37m'
+
 print
 print '\033[00mRan %d tests in %.2fs (wall) %.2fs (cpu):' % (numtests, time.time() - start_time, time.clock() - start_clock)
 if failed:
@@ -177,6 +208,8 @@ if knowfailed:
 numpass = numtests - len(failed) - len(knowfailed)
 if numpass:
     print '    %d passes' % numpass
+if numunit:
+    print '    %d unit tests, %d failures' % (numunit, len(unitfailed))
 
 if cov:
     cov.stop()
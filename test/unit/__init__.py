@@ -0,0 +1,14 @@
+"""
+PC-BASIC tests.unit
+Unit tests, run by test.py alongside the correctness tests
+
+(c) 2013--2018 Rob Hagemans
+This file is released under the GNU GPL version 3 or later.
+"""
+
+from collections import namedtuple
+
+
+# mode description as sent to video plugins with VIDEO_SET_MODE
+ModeInfo = namedtuple('ModeInfo', (
+    'is_text_mode', 'font_height', 'font_width', 'num_pages', 'bitsperpixel', 'pixel_width', 'pixel_height'))
@@ -0,0 +1,71 @@
+"""
+PC-BASIC tests.unit.test_arrays
+Tests for array storage
+
+(c) 2013--2018 Rob Hagemans
+This file is released under the GNU GPL version 3 or later.
+"""
+
+import unittest
+
+from pcbasic import Session
+from pcbasic.basic.memory import arrays
+
+
+class ArrayStorageTest(unittest.TestCase):
+    """Tests for numeric array storage."""
+
+    def tearDown(self):
+        """Restore numpy if a test has disabled it."""
+        reload(arrays)
+
+    def _fill(self, session):
+        """Dimension and fill arrays of all types."""
+        session.execute(b'DIM A%(3, 2), B!(4), C#(2), D$(2)')
+        session.execute(b'FOR I = 0 TO 3: FOR J = 0 TO 2: A%(I, J) = 10*I - J: NEXT: NEXT')
+        session.execute(b'B!(1) = 1.5: B!(4) = -1/3: C#(2) = 1D+30: D$(1) = "abc"')
+
+    def _peek_array(self, session, name, size):
+        """Read an array's memory through VARPTR and PEEK."""
+        start = session.evaluate(b'VARPTR(%s)' % (name,))
+        return bytearray(session.evaluate(b'PEEK(%d)' % (start + i,)) for i in range(size))
+
+    @unittest.skipIf(arrays.numpy is None, 'numpy not available')
+    def test_numpy_storage(self):
+        """Numeric arrays are held in numpy arrays that show the memory layout."""
+        with Session() as session:
+            self._fill(session)
+            impl_arrays = session._impl.arrays
+            for name, size in ((b'A%', 24), (b'B!', 20), (b'C#', 24)):
+                storage = impl_arrays.view_full_array(name)
+                self.assertIsInstance(storage, arrays.numpy.ndarray)
+                self.assertEqual(bytearray(storage.tobytes()), self._peek_array(session, name + b'(0)', size))
+            # the view is the storage: changes show up in BASIC
+            impl_arrays.view_full_array(b'A%')[2:4] = [0x34, 0x12]
+            self.assertEqual(session.evaluate(b'A%(1, 0)'), 0x1234)
+            # POKE writes through to the storage
+            session.execute(b'POKE VARPTR(A%(1, 0)), 0')
+            self.assertEqual(impl_arrays.view_full_array(b'A%')[2], 0)
+            # string arrays hold pointers in a bytearray
+            self.assertIsInstance(impl_arrays._buffers[b'D$'], bytearray)
+
+    def test_same_without_numpy(self):
+        """Storage without numpy gives the same memory, values and lists."""
+        results = []
+        for use_numpy in (True, False):
+            if not use_numpy:
+                arrays.numpy = None
+            with Session() as session:
+                self._fill(session)
+                results.append((
+                    self._peek_array(session, b'A%(0, 0)', 24),
+                    self._peek_array(session, b'B!(0)', 20),
+                    self._peek_array(session, b'C#(0)', 24),
+                    session.get_variable(b'A%()'),
+                    session.get_variable(b'B!()'),
+                    session.get_variable(b'D$()'),
+                ))
+                session.set_variable(b'A%()', [[1, 2], [3, 4]])
+                session.execute(b'ERASE B!: DIM B!(1)')
+                results.append((session.get_variable(b'A%()'), session.evaluate(b'A%(1, 1) + B!(1)')))
+        self.assertEqual(results[:2], results[2:])
@@ -0,0 +1,56 @@
+"""
+PC-BASIC tests.unit.test_fastfloat
+Tests for floating-point values backed by native floats
+
+(c) 2013--2018 Rob Hagemans
+This file is released under the GNU GPL version 3 or later.
+"""
+
+import pickle
+import unittest
+
+from pcbasic import Session
+from pcbasic.basic.values import values
+
+
+class FastFloatTest(unittest.TestCase):
+    """Tests for fast-float mode."""
+
+    def setUp(self):
+        """Create a Values object in fast-float mode."""
+        self.vm = values.Values(None, double_math=True, fast_float=True)
+        self.vm.error_handler = values.FloatErrorHandler(None)
+
+    def _round_trip(self, value):
+        """Pickle and unpickle a value with all protocols."""
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copy = pickle.loads(pickle.dumps(value, protocol))
+            self.assertEqual(type(copy), type(value))
+            self.assertEqual(copy.to_bytes(), value.to_bytes())
+            self.assertEqual(copy.to_value(), value.to_value())
+
+    def test_pickle_native(self):
+        """Values holding a native float survive pickling."""
+        self._round_trip(self.vm.new_single().from_value(1/3.))
+        self._round_trip(self.vm.new_double().from_value(-2/3.))
+
+    def test_pickle_mbf(self):
+        """Values holding MBF bytes survive pickling."""
+        self._round_trip(self.vm.new_single().from_bytes(bytearray(b'\x01\x02\x03\x84')))
+        self._round_trip(self.vm.new_double().from_bytes(bytearray(b'\x01\x02\x03\x04\x05\x06\x87\x84')))
+
+    def test_pickle_unpickled(self):
+        """Unpickled values can be calculated with and pickled again."""
+        value = pickle.loads(pickle.dumps(self.vm.new_single().from_value(0.1), 2))
+        value.iadd(self.vm.new_single().from_value(0.2))
+        self._round_trip(value)
+        self.assertAlmostEqual(value.to_value(), 0.3, places=6)
+
+    def test_pickle_session(self):
+        """A fast-float session can be saved and resumed."""
+        with Session(fast_float=True, input_streams=None, output_streams=None) as session:
+            session.execute(b'A! = 1/3: B# = 2/3#')
+            resumed = pickle.loads(pickle.dumps(session, 2)).attach()
+            self.assertEqual(resumed.get_variable(b'A!'), session.get_variable(b'A!'))
+            self.assertEqual(resumed.get_variable(b'B#'), session.get_variable(b'B#'))
+            self.assertEqual(resumed.evaluate(b'A! * 3'), 1.)
@@ -0,0 +1,118 @@
+"""
+PC-BASIC tests.unit.test_shared_pixels
+Tests for the pixel buffer shared between interpreter and interface
+
+(c) 2013--2018 Rob Hagemans
+This file is released under the GNU GPL version 3 or later.
+"""
+
+import Queue
+import unittest
+
+import numpy
+
+from pcbasic.basic.base import signals
+from pcbasic.basic.display.pixels import PixelBuffer
+from pcbasic.interface.video import VideoPlugin
+from pcbasic.interface.video_image import VideoImage
+
+from . import ModeInfo
+
+
+class RecordingPlugin(VideoPlugin):
+    """Video plugin that records the areas it receives."""
+
+    def __init__(self, input_queue, video_queue):
+        """Initialise the record."""
+        VideoPlugin.__init__(self, input_queue, video_queue)
+        self.rects = []
+
+    def put_rect(self, pagenum, x0, y0, x1, y1, array):
+        """Record an area and a copy of its pixels."""
+        self.rects.append((pagenum, (x0, y0, x1, y1), numpy.array(array)))
+
+
+class SharedPixelsTest(unittest.TestCase):
+    """Tests for interfaces reading the interpreter's pixel buffer."""
+
+    def setUp(self):
+        """Create a shared pixel buffer and a plugin reading it."""
+        self.video_queue = Queue.Queue()
+        self.pixels = PixelBuffer(16, 8, 2, 2, shared=True)
+        self.plugin = RecordingPlugin(Queue.Queue(), self.video_queue)
+        self.video_queue.put(signals.Event(signals.VIDEO_SHARE_PIXELS, (self.pixels,)))
+        self.plugin.cycle()
+
+    def _draw(self, pagenum, x0, y0, x1, y1, attr):
+        """Draw into the buffer as the interpreter does: write first, then mark."""
+        page = self.pixels.pages[pagenum]
+        page.fill_rect(x0, y0, x1, y1, attr)
+        page.mark_dirty(x0, y0, x1, y1)
+
+    def test_initial_pages(self):
+        """New pages are sent whole, once."""
+        self.assertEqual([(rect[0], rect[1]) for rect in self.plugin.rects], [(0, (0, 0, 15, 7)), (1, (0, 0, 15, 7))])
+        del self.plugin.rects[:]
+        self.plugin.cycle()
+        self.assertEqual(self.plugin.rects, [])
+
+    def test_changed_area(self):
+        """Changes are sent as their bounding rect, with the current pixels."""
+        del self.plugin.rects[:]
+        generation = self.pixels.pages[0].generation
+        self._draw(0, 2, 1, 5, 3, 3)
+        self._draw(0, 10, 6, 10, 6, 1)
+        self.assertEqual(self.pixels.pages[0].generation, generation + 2)
+        self.plugin.cycle()
+        self.assertEqual(len(self.plugin.rects), 1)
+        pagenum, rect, array = self.plugin.rects[0]
+        self.assertEqual((pagenum, rect), (0, (2, 1, 10, 6)))
+        numpy.testing.assert_array_equal(array, self.pixels.pages[0].buffer[1:7, 2:11])
+        self.assertEqual(array[0, 0], 3)
+        self.assertEqual(array[5, 8], 1)
+        # picked up: nothing left to send
+        self.assertIsNone(self.pixels.pages[0].take_dirty())
+
+    def test_clipped(self):
+        """Areas outside the page are clipped or ignored."""
+        del self.plugin.rects[:]
+        page = self.pixels.pages[1]
+        generation = page.generation
+        page.mark_dirty(20, 0, 30, 3)
+        self.assertEqual(page.generation, generation)
+        page.mark_dirty(-5, 6, 3, 12)
+        self.plugin.cycle()
+        self.assertEqual([(rect[0], rect[1]) for rect in self.plugin.rects], [(1, (0, 6, 3, 7))])
+
+    def test_not_shared(self):
+        """An unshared buffer does not track changes."""
+        page = PixelBuffer(16, 8, 1, 2).pages[0]
+        page.mark_dirty(0, 0, 3, 3)
+        self.assertEqual(page.generation, 0)
+        self.assertIsNone(page.take_dirty())
+
+    def test_set_mode(self):
+        """A mode change stops reading the old buffer."""
+        self.video_queue.put(signals.Event(signals.VIDEO_SET_MODE, (None,)))
+        del self.plugin.rects[:]
+        self._draw(0, 0, 0, 3, 3, 2)
+        self.plugin.cycle()
+        self.assertEqual(self.plugin.rects, [])
+
+    def test_image_plugin(self):
+        """The image plugin shows the shared pixels."""
+        video_queue = Queue.Queue()
+        plugin = VideoImage(Queue.Queue(), video_queue)
+        palette = [(0, 0, 0), (0, 255, 255), (255, 0, 255), (255, 255, 255)]
+        video_queue.put(signals.Event(signals.VIDEO_SET_MODE, (ModeInfo(False, 8, 8, 2, 2, 16, 8),)))
+        video_queue.put(signals.Event(signals.VIDEO_SET_PALETTE, (palette, None)))
+        video_queue.put(signals.Event(signals.VIDEO_SHARE_PIXELS, (self.pixels,)))
+        self._draw(0, 2, 1, 5, 3, 3)
+        plugin.cycle()
+        self._draw(0, 4, 2, 12, 7, 1)
+        self._draw(1, 0, 0, 15, 7, 2)
+        plugin.cycle()
+        expected = numpy.array(palette, dtype=numpy.uint8)[self.pixels.pages[0].buffer]
+        numpy.testing.assert_array_equal(plugin.compose_frame(), expected)
+        self.assertEqual(tuple(plugin.compose_frame()[1, 2]), (255, 255, 255))
+        self.assertEqual(tuple(plugin.compose_frame()[7, 12]), (0, 255, 255))
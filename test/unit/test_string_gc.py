@@ -0,0 +1,73 @@
+"""
+PC-BASIC tests.unit.test_string_gc
+Tests for incremental string garbage collection
+
+(c) 2013--2018 Rob Hagemans
+This file is released under the GNU GPL version 3 or later.
+"""
+
+import io
+import unittest
+
+from pcbasic import Session
+
+
+class StringGarbageTest(unittest.TestCase):
+    """Tests for string garbage collection with a pause budget."""
+
+    def _fill(self, session):
+        """Store live strings interleaved with garbage."""
+        session.execute(b'DIM A$(200)')
+        session.execute(b'FOR I = 0 TO 200: G$ = STRING$(30, 33): A$(I) = STRING$(10, 65 + I MOD 26): NEXT')
+
+    def _check(self, session):
+        """Check that the live strings are intact."""
+        strings = session.get_variable(b'A$()')
+        self.assertEqual(strings, [chr(65 + i % 26) * 10 for i in range(len(strings))])
+
+    def test_steps_bounded(self):
+        """Each step moves at most the budget; the collection completes over several steps."""
+        with Session(string_gc_budget=64) as session:
+            self._fill(session)
+            strings = session._impl.strings
+            before = strings.current
+            steps = 0
+            complete = False
+            while not complete:
+                moved = strings.gc_bytes_moved
+                complete = session._impl.memory.collect_garbage_step()
+                self.assertLessEqual(strings.gc_bytes_moved - moved, 64)
+                steps += 1
+            self.assertGreater(steps, 1)
+            # garbage has been reclaimed
+            self.assertGreater(strings.current, before)
+            self._check(session)
+            # nothing left to collect
+            free = session.evaluate(b'FRE(0)')
+            self.assertEqual(session.evaluate(b'FRE("")'), free)
+
+    def test_same_as_full(self):
+        """A running program with a budget ends up with the same strings and free memory."""
+        frees = []
+        for budget in (0, 64):
+            with Session(string_gc_budget=budget) as session:
+                self._fill(session)
+                session.execute(b'FOR J = 1 TO 20: FOR I = 0 TO 200: A$(I) = STRING$(10, 65 + I MOD 26): NEXT: NEXT')
+                self._check(session)
+                frees.append(session.evaluate(b'FRE("")'))
+                if budget:
+                    self.assertGreater(session._impl.strings.gc_count, 1)
+        self.assertEqual(frees[0], frees[1])
+
+    def test_chain_merge_all(self):
+        """Strings survive CHAIN MERGE ... ALL with string space nearly full."""
+        frees = []
+        for budget in (0, 64):
+            with Session(string_gc_budget=budget) as session:
+                session.execute(b'DIM C$(240): FOR I = 0 TO 222: C$(I) = STRING$(250, 65 + I MOD 26): NEXT')
+                name = session.bind_file(io.BytesIO(b'10 REM\r\n\x1a'))
+                session.execute(b'CHAIN MERGE "%s", 10, ALL' % (name,))
+                strings = session.get_variable(b'C$()')[:223]
+                self.assertEqual(strings, [chr(65 + i % 26) * 250 for i in range(223)])
+                frees.append(session.evaluate(b'FRE(0)'))
+        self.assertEqual(frees[0], frees[1])
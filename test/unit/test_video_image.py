@@ -0,0 +1,143 @@
+"""
+PC-BASIC tests.unit.test_video_image
+Tests for the headless image interface
+
+(c) 2013--2018 Rob Hagemans
+This file is released under the GNU GPL version 3 or later.
+"""
+
+import os
+import zlib
+import Queue
+import struct
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from pcbasic.basic.base import signals
+from pcbasic.interface.video_image import VideoImage
+
+from . import ModeInfo
+
+
+PALETTE = [(0, 0, 0), (0, 170, 170), (170, 0, 170), (255, 255, 255)]
+
+
+class VideoImageTest(unittest.TestCase):
+    """Tests for the image interface."""
+
+    def setUp(self):
+        """Create a temporary directory for frames."""
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the frames."""
+        shutil.rmtree(self.tempdir)
+
+    def _start(self, mode_info, **kwargs):
+        """Create an image interface in the given mode."""
+        video_queue = Queue.Queue()
+        plugin = VideoImage(Queue.Queue(), video_queue, **kwargs)
+        video_queue.put(signals.Event(signals.VIDEO_SET_MODE, (mode_info,)))
+        video_queue.put(signals.Event(signals.VIDEO_SET_PALETTE, (PALETTE, None)))
+        plugin.cycle()
+        return plugin, video_queue
+
+    def _send(self, plugin, video_queue, *events):
+        """Send events to the interface and process them."""
+        for event_type, params in events:
+            video_queue.put(signals.Event(event_type, params))
+        plugin.cycle()
+
+    def _read_png(self, name):
+        """Read the size and pixels of a PNG file written by the interface."""
+        with open(name, 'rb') as png:
+            data = png.read()
+        self.assertEqual(data[:8], b'\x89PNG\r\n\x1a\n')
+        chunks = {}
+        pos = 8
+        while pos < len(data):
+            length, = struct.unpack('>I', data[pos:pos+4])
+            tag, body = data[pos+4:pos+8], data[pos+8:pos+8+length]
+            crc, = struct.unpack('>I', data[pos+8+length:pos+12+length])
+            self.assertEqual(zlib.crc32(tag + body) & 0xffffffff, crc)
+            chunks[tag] = body
+            pos += 12 + length
+        width, height, depth, colour_type = struct.unpack('>IIBB', chunks[b'IHDR'][:10])
+        self.assertEqual((depth, colour_type), (8, 2))
+        rows = numpy.frombuffer(zlib.decompress(chunks[b'IDAT']), numpy.uint8).reshape(height, 1 + 3*width)
+        # filter type 0 on every scanline
+        self.assertFalse(rows[:, 0].any())
+        return width, height, rows[:, 1:].reshape(height, width, 3)
+
+    def test_graphics(self):
+        """Pixel events show up in the composed frame."""
+        plugin, queue = self._start(ModeInfo(False, 8, 8, 2, 2, 32, 16))
+        self._send(
+            plugin, queue,
+            (signals.VIDEO_FILL_RECT, (0, 4, 2, 9, 5, 2)),
+            (signals.VIDEO_PUT_PIXEL, (0, 31, 15, 3)),
+            (signals.VIDEO_PUT_RECT, (0, 0, 10, 1, 11, [[1, 2], [3, 0]])),
+            # not on the visible page
+            (signals.VIDEO_FILL_RECT, (1, 0, 0, 31, 15, 1)),
+        )
+        frame = plugin.compose_frame()
+        self.assertEqual(frame.shape, (16, 32, 3))
+        attrs = numpy.zeros((16, 32), dtype=numpy.uint8)
+        attrs[2:6, 4:10] = 2
+        attrs[15, 31] = 3
+        attrs[10:12, 0:2] = [[1, 2], [3, 0]]
+        numpy.testing.assert_array_equal(frame, numpy.array(PALETTE, dtype=numpy.uint8)[attrs])
+        # show the other page
+        self._send(plugin, queue, (signals.VIDEO_SET_PAGE, (1, 1)))
+        self.assertTrue((plugin.compose_frame() == PALETTE[1]).all())
+
+    def test_text(self):
+        """Glyphs are drawn in their attributes."""
+        plugin, queue = self._start(ModeInfo(True, 2, 2, 1, 4, 6, 4))
+        glyph = [[1, 0], [0, 1]]
+        self._send(
+            plugin, queue,
+            (signals.VIDEO_BUILD_GLYPHS, ({u'A': glyph},)),
+            (signals.VIDEO_PUT_GLYPH, (0, 2, 3, u'A', False, 3, 1, 0, False)),
+        )
+        frame = plugin.compose_frame()
+        self.assertEqual(frame.shape, (4, 6, 3))
+        self.assertEqual([tuple(frame[y, x]) for y, x in ((2, 4), (2, 5), (3, 4), (3, 5))], [
+            PALETTE[3], PALETTE[1], PALETTE[1], PALETTE[3]])
+        self.assertTrue((frame[:2] == 0).all())
+
+    def test_border(self):
+        """The border surrounds the page in the border attribute."""
+        plugin, queue = self._start(ModeInfo(False, 8, 8, 1, 2, 100, 50), border_width=10)
+        self._send(plugin, queue, (signals.VIDEO_SET_BORDER_ATTR, (2,)))
+        frame = plugin.compose_frame()
+        height, width, _ = frame.shape
+        self.assertGreater(width, 100)
+        self.assertGreater(height, 50)
+        self.assertEqual(tuple(frame[0, 0]), PALETTE[2])
+        self.assertEqual(tuple(frame[height//2, width//2]), PALETTE[0])
+
+    def test_save_png(self):
+        """The final frame is written to a PNG file on exit."""
+        name = os.path.join(self.tempdir, u'frame.png')
+        with VideoImage(Queue.Queue(), Queue.Queue(), capture=name) as plugin:
+            plugin.set_mode(ModeInfo(False, 8, 8, 1, 2, 32, 16))
+            plugin.set_palette(PALETTE, None)
+            plugin.fill_rect(0, 8, 4, 15, 7, 3)
+        width, height, rgb = self._read_png(name)
+        self.assertEqual((width, height), (32, 16))
+        numpy.testing.assert_array_equal(rgb, plugin.compose_frame())
+        self.assertEqual(tuple(rgb[4, 8]), PALETTE[3])
+
+    def test_save_raw(self):
+        """Other extensions give raw RGB triplets; numbered frames follow the final frame's name."""
+        name = os.path.join(self.tempdir, u'frame.rgb')
+        plugin, queue = self._start(ModeInfo(False, 8, 8, 1, 2, 32, 16), capture=name)
+        plugin._request_frame(None, None)
+        self._send(plugin, queue, (signals.VIDEO_PUT_PIXEL, (0, 1, 1, 1)))
+        with open(os.path.join(self.tempdir, u'frame-0001.rgb'), 'rb') as raw:
+            self.assertEqual(raw.read(), plugin.compose_frame().tostring())
+        self.assertEqual(os.path.getsize(os.path.join(self.tempdir, u'frame-0001.rgb')), 32*16*3)